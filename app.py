@@ -1,341 +1,197 @@
-import sys
-import os
-import pickle
-import joblib
-import pandas as pd
+import time
+STARTED_AT = time.perf_counter()
+
 import traceback
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from fastapi import FastAPI, Form, HTTPException
+from typing import List
+from functools import lru_cache
+from fastapi import FastAPI, Form, HTTPException, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
-import uvicorn
-from src.pipeline.predict_pipeline import CustomData, PredictPipeline
-from models import LoanRequest
-
-templates = Jinja2Templates(directory="templates")
+from src.logger import RequestLogMiddleware, logging
+from src.metrics import CONTENT_TYPE, MetricsMiddleware, STAGE_SECONDS, metrics, stage_timer
+from src.pipeline.micro_batcher import MicroBatcher
+from src.pipeline.process_executor import ExecutorBusy, PoolUnavailable, ProcessExecutor, VersionMismatch
+from src.pipeline.startup import ServiceLoader
+from src.web_assets import PrecompressedPage, compressed_response
+from models import LoanRequest, BatchPredictionResponse
 
-# Instantiate PredictPipeline 
-pipeline = PredictPipeline()
+# pandas, sklearn and the model libraries are imported by the loader, not here,
+# so the server starts answering liveness checks before they are loaded
+loader = ServiceLoader(started_at=STARTED_AT)
 
 app = FastAPI()
+# Request counts, errors and latency per route, exported on /metrics
+app.add_middleware(MetricsMiddleware)
+# Request IDs, attached to every log record, and one access record per request with its latency
+app.add_middleware(RequestLogMiddleware)
+loader.timings.record("app_import", time.perf_counter() - STARTED_AT)
 
-# Load the model
-try:
-    model = joblib.load("artifacts/models/xgboost_model.pkl")
-    print("Model loaded successfully.")
-except Exception as e:
-    model = None
-    print(f"Error loading model: {e}")
 
-# Define the categorical columns and their encoders
-categorical_columns = ['loan_limit', 'Gender', 'approv_in_adv', 'loan_type', 'loan_purpose',
-    'Credit_Worthiness', 'open_credit', 'business_or_commercial',
-    'Neg_ammortization', 'interest_only', 'lump_sum_payment',
-    'construction_type', 'occupancy_type', 'Secured_by', 'total_units',
-    'credit_type', 'co_applicant_credit_type', 'age',
-    'submission_of_application', 'Region', 'Security_Type']
+@app.on_event("startup")
+def load_artifacts():
+    # PREDICT_STARTUP_MODE=eager loads and warms up the pipeline here; the default does it in the background
+    loader.start()
+    # Picks up newly activated releases without a restart (PREDICT_RELEASE_POLL_SECONDS=0 disables)
+    loader.watch_releases()
 
 
+# Optional pool of scoring processes, enabled with PREDICT_PROCESS_POOL=1
+executor = ProcessExecutor()
 
 
+@app.on_event("startup")
+def start_executor():
+    # Workers load and warm up in the background; requests are scored in process until they are ready
+    executor.start()
 
-def generate_html(input_data, prediction):
-    input_items = list(input_data.items())
-    num_columns = 4  # Number of columns in the table
-    num_rows = (len(input_items) + num_columns - 1) // num_columns  # Calculate the required number of rows
-
-    results_html = """
-    <html>
-        <head></head>
-        <body style="background-color: #f5f5f5;"> <!-- Light grey background for the whole page -->
-            <h1 style='text-align: center;'>Client Data</h1>
-            <table style="border-collapse: collapse; width: 75%; margin: 0 auto;"> <!-- Light blue/green background color for table header -->
-                <tr style="background-color: #e0f7fa;">
+
+@app.on_event("shutdown")
+def stop_executor():
+    executor.stop()
+
+
+def score_records(records):
     """
-    
-    # Create table headers
-    for col in range(num_columns):
-        results_html += "<th style='border: 1px solid black; padding: 8px;'>Field</th><th style='border: 1px solid black; padding: 8px;'>Value</th>"
-    results_html += "</tr>"
-    
-    # Fill the table with input data
-    for row in range(num_rows):
-        results_html += "<tr>"
-        for col in range(num_columns):
-            index = row * num_columns + col
-            if index < len(input_items):
-                field, value = input_items[index]
-                results_html += f"<td style='border: 1px solid black; padding: 8px; background-color: #e0f7fa;'>{field}</td><td style='border: 1px solid black; padding: 8px; background-color: #e0f7fa;'>{value}</td>"
-            else:
-                results_html += "<td style='border: 1px solid black; padding: 8px;'></td><td style='border: 1px solid black; padding: 8px;'></td>"  # Empty cells for remaining spaces
-        results_html += "</tr>"
-
-    # Determine the prediction statement based on the prediction value
-    if prediction == 1:
-        prediction_heading = "<h2 style='text-align: center;'>Prediction Result</h2>"
-        prediction_statement = "<div style='border: 1px solid black; background-color: #d4edda; padding: 10px; margin: 20px auto; width: 65%; text-align: center;'>Client qualifies for the loan.</div>"
-    else:
-        prediction_heading = "<h2 style='text-align: center;'>Prediction Result</h2>"
-        prediction_statement = "<div style='border: 1px solid black; background-color: #f8d7da; padding: 10px; margin: 20px auto; width: 65%; text-align: center;'>Unfortunately, the client does not qualify for the loan.</div>"
-    
-    # Add the prediction statement and form link
-    form_link = "<p style='text-align: center;'><a href=\"/\" style='color: blue;'>Click here to go back to the client form</a></p>"
-    # Add the prediction statement
-    results_html += f"""
-            </table>
-            {prediction_heading}
-            {prediction_statement}
-            {form_link}
-        </body>
-    </html>
+    Scores a list of single-applicant records with one pipeline call.
     """
-    
-    return results_html
+    if executor.running:
+        try:
+            return list(executor.predict_records_sync(records))
+        except PoolUnavailable:
+            # The pool broke or stopped during the call; this and later calls are scored in process
+            pass
+    return list(loader.get_pipeline().predict_records(records))
+
+
+# Optional coalescing of concurrent /predict calls, enabled with PREDICT_MICRO_BATCHING=1
+batcher = MicroBatcher(score_records)
+
+
+@app.on_event("startup")
+async def start_batcher():
+    if batcher.config.enabled:
+        await batcher.start()
+
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    await batcher.stop()
+
+
+@app.get("/health")
+async def health():
+    # Liveness only: answered from the event loop without touching the pipeline
+    return {"status": "ok"}
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    # Prometheus text format; stage timings of the scoring pool workers are merged into this process's
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/ready")
+def ready():
+    status = loader.status()
+    if executor.config.enabled:
+        status["process_pool"] = executor.status()
+    if not loader.ready:
+        return JSONResponse(status_code=503, content={"ready": False, **status})
+    return {"ready": True, **status}
+
+
+# Upper bound on the number of applicants accepted by one batch request
+MAX_BATCH_RECORDS = 10000
+
+
+def score_batch(requests):
+    import pandas as pd
+
+    pipeline = loader.get_pipeline()
+    # Build one columnar frame so the whole batch is transformed and scored in a single call
+    with stage_timer("dataframe_build"):
+        df = pd.DataFrame({
+            field: [getattr(request, field) for request in requests]
+            for field in LoanRequest.model_fields
+        })
+    labels, probabilities = pipeline.predict_with_proba(df)
+    return labels, probabilities, pipeline.artifacts.model_version
+
+
+@app.post("/v1/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(requests: List[LoanRequest]):
+    if not requests:
+        raise HTTPException(status_code=422, detail="Batch must contain at least one record")
+    if len(requests) > MAX_BATCH_RECORDS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_BATCH_RECORDS} records")
+
+    try:
+        labels = None
+        if executor.running:
+            # Split across the scoring processes
+            records = [request.model_dump() for request in requests]
+            try:
+                labels, probabilities, model_version = await executor.predict_with_proba(records)
+            except PoolUnavailable:
+                logging.info("Process pool unavailable, scoring the batch in process")
+        if labels is None:
+            labels, probabilities, model_version = await run_in_threadpool(score_batch, requests)
+
+        return BatchPredictionResponse(
+            model_version=model_version,
+            predictions=labels.astype(int).tolist(),
+            probabilities=probabilities.tolist(),
+        )
+
+    except VersionMismatch:
+        raise HTTPException(status_code=503, detail="A new model release is being swapped in, retry later")
+    except ExecutorBusy:
+        raise HTTPException(status_code=503, detail="Scoring queue is full, retry later")
+    except Exception as e:
+        tb_str = traceback.format_exception(type(e), e, e.__traceback__)
+        logging.error(f"Batch prediction failed: {''.join(tb_str)}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+# Templates are compiled on first use and cached; they are never re-read from disk while serving
+templates = Jinja2Templates(directory="templates")
+templates.env.auto_reload = False
+
+# Seconds browsers may reuse the form before revalidating it with its ETag
+FORM_MAX_AGE = 3600
+
+
+@lru_cache(maxsize=1)
+def form_page():
+    # The form has no per-request content: render and compress it once per process
+    return PrecompressedPage(templates.get_template("form.html").render(), max_age=FORM_MAX_AGE)
+
+
+# Model label for a loan predicted to default (Status == 1 in Loan_Default)
+DEFAULT_LABEL = 1
+
+
+def generate_html(input_data, prediction):
+    num_columns = 4  # Number of columns in the table
+    input_items = list(input_data.items())
+    rows = [input_items[i:i + num_columns] for i in range(0, len(input_items), num_columns)]
+    return templates.get_template("result.html").render(
+        num_columns=num_columns,
+        rows=rows,
+        # The client qualifies when the model does not predict a default
+        approved=int(prediction) != DEFAULT_LABEL,
+    )
+
 
 @app.get("/", response_class=HTMLResponse)
-def show_form():
-    return """
-    <html>
-        <head>
-            <style>
-                body {
-                    background-color: lightgrey;
-                    font-family: Arial, sans-serif;
-                }
-                .form-section {
-                    display: grid;
-                    grid-template-columns: repeat(4, 1fr);
-                    gap: 10px;
-                    max-width: 80%;
-                    margin: 20px auto;
-                    background-color: lightgrey;
-                    padding: 20px;
-                    border-radius: 10px;
-                }
-                .form-column {
-                    background-color: lightblue;
-                    padding: 10px;
-                    border-radius: 5px;
-                    box-sizing: border-box;
-                }
-                .form-column input, .form-column select {
-                    width: 100%;
-                    margin-bottom: 10px;
-                    padding: 5px;
-                    box-sizing: border-box;
-                }
-                .submit-button {
-                    background-color: orange;
-                    color: white;
-                    padding: 10px 20px;
-                    border: none;
-                    border-radius: 5px;
-                    cursor: pointer;
-                    display: block;
-                    margin: 20px auto;
-                }
-                h2 {
-                    text-align: center;
-                }
-                .form-column:last-child {
-                    grid-row: span 2;
-                }
-            </style>
-        </head>
-        <body>
-            <h2 style="color: navy; text-decoration: underline;">Welcome! Please fill in the form below:</h2>
-            <form action="/predict" method="post">
-                <div class="form-section">
-                    <div class="form-column">
-                        <label for="loan_limit">Loan Limit:</label>
-                        <select name="loan_limit">
-                            <option value="cf">cf</option>
-                            <option value="ncf">ncf</option>
-                        </select>
-                        
-                        <label for="gender">Gender:</label>
-                        <select name="gender">
-                            <option value="Sex Not Available">Sex Not Available</option>
-                            <option value="Male">Male</option>
-                            <option value="Joint">Joint</option>
-                            <option value="Female">Female</option>
-                        </select>
-                        
-                        <label for="approv_in_adv">Approval in Advance:</label>
-                        <select name="approv_in_adv">
-                            <option value="nopre">nopre</option>
-                            <option value="pre">pre</option>
-                        </select>
-                        
-                        <label for="loan_type">Loan Type:</label>
-                        <select name="loan_type">
-                            <option value="type1">type1</option>
-                            <option value="type2">type2</option>
-                            <option value="type3">type3</option>
-                        </select>
-                        
-                        <label for="loan_purpose">Loan Purpose:</label>
-                        <select name="loan_purpose">
-                            <option value="p1">p1</option>
-                            <option value="p4">p4</option>
-                            <option value="p3">p3</option>
-                            <option value="p2">p2</option>
-                        </select>
-                        
-                        <label for="credit_worthiness">Credit Worthiness:</label>
-                        <select name="credit_worthiness">
-                            <option value="l1">l1</option>
-                            <option value="l2">l2</option>
-                        </select>
-                        
-                        <label for="open_credit">Open Credit:</label>
-                        <select name="open_credit">
-                            <option value="nopc">nopc</option>
-                            <option value="opc">opc</option>
-                        </select>
-                        
-                        <label for="business_or_commercial">Business or Commercial:</label>
-                        <select name="business_or_commercial">
-                            <option value="nob/c">nob/c</option>
-                            <option value="b/c">b/c</option>
-                        </select>
-                    </div>
-
-                    <div class="form-column">
-                        <label for="loan_amount">Loan Amount:</label>
-                        <input type="number" name="loan_amount" step="0.01">
-                        
-                        <label for="rate_of_interest">Rate of Interest:</label>
-                        <input type="number" name="rate_of_interest" step="0.01">
-                        
-                        <label for="interest_rate_spread">Interest Rate Spread:</label>
-                        <input type="number" name="interest_rate_spread" step="0.01">
-                        
-                        <label for="upfront_charges">Upfront Charges:</label>
-                        <input type="number" name="upfront_charges" step="0.01">
-                        
-                        <label for="term">Term:</label>
-                        <input type="number" name="term" step="0.01">
-                        
-                        <label for="neg_ammortization">Negative Amortization:</label>
-                        <select name="neg_ammortization">
-                            <option value="not_neg">not_neg</option>
-                            <option value="neg_amm">neg_amm</option>
-                        </select>
-                        
-                        <label for="interest_only">Interest Only:</label>
-                        <select name="interest_only">
-                            <option value="not_int">not_int</option>
-                            <option value="int_only">int_only</option>
-                        </select>
-                        
-                        <label for="lump_sum_payment">Lump Sum Payment:</label>
-                        <select name="lump_sum_payment">
-                            <option value="not_lpsm">not_lpsm</option>
-                            <option value="lpsm">lpsm</option>
-                        </select>
-                    </div>
-
-                    <div class="form-column">
-                        <label for="property_value">Property Value:</label>
-                        <input type="number" name="property_value" step="0.01">
-                        
-                        <label for="construction_type">Construction Type:</label>
-                        <select name="construction_type">
-                            <option value="sb">sb</option>
-                            <option value="mh">mh</option>
-                        </select>
-                        
-                        <label for="occupancy_type">Occupancy Type:</label>
-                        <select name="occupancy_type">
-                            <option value="pr">pr</option>
-                            <option value="sr">sr</option>
-                            <option value="ir">ir</option>
-                        </select>
-                        
-                        <label for="secured_by">Secured By:</label>
-                        <select name="secured_by">
-                            <option value="home">home</option>
-                            <option value="land">land</option>
-                        </select>
-                        
-                        <label for="total_units">Total Units:</label>
-                        <select name="total_units">
-                            <option value="1U">1U</option>
-                            <option value="2U">2U</option>
-                            <option value="3U">3U</option>
-                            <option value="4U">4U</option>
-                        </select>
-                        
-                        <label for="income">Income:</label>
-                        <input type="number" name="income" step="0.01">
-                        
-                        <label for="credit_type">Credit Type:</label>
-                        <select name="credit_type">
-                            <option value="EXP">EXP</option>
-                            <option value="EQUI">EQUI</option>
-                            <option value="CRIF">CRIF</option>
-                            <option value="CIB">CIB</option>
-                        </select>
-
-                        <label for="credit_score">Credit Score:</label>
-                        <input type="number" name="credit_score" step="1">
-
-                    </div>
-
-                    <div class="form-column">
-                        
-                        <label for="co_applicant_credit_type">Co-applicant Credit Type:</label>
-                        <select name="co_applicant_credit_type">
-                            <option value="CIB">CIB</option>
-                            <option value="EXP">EXP</option>
-                        </select>
-                        
-                        <label for="age">Age:</label>
-                        <select name="age">
-                            <option value="25-34">25-34</option>
-                            <option value="55-64">55-64</option>
-                            <option value="35-44">35-44</option>
-                            <option value="45-54">45-54</option>
-                            <option value="65+">65+</option>
-                            <option value="18-24">18-24</option>
-                        </select>
-                        
-                        <label for="submission_of_application">Submission of Application:</label>
-                        <select name="submission_of_application">
-                            <option value="to_inst">nsub</option>
-                            <option value="not_inst">sub</option>
-                        </select>
-                        
-                        <label for="ltv">LTV:</label>
-                        <input type="number" name="ltv" step="0.01">
-                        
-                        <label for="region">Region:</label>
-                        <select name="region">
-                            <option value="south">south</option>
-                            <option value="North">North</option>
-                            <option value="central">central</option>
-                            <option value="North-East">North-East</option>
-                        </select>
-                        
-                        <label for="security_type">Security Type:</label>
-                        <select name="security_type">
-                           <option value="direct">direct</option>
-                            <option value="indirect">indirect</option>
-                        </select>
-                        
-                        <label for="dtir1">DTIR1:</label>
-                        <input type="number" name="dtir1" step="0.01">
-                    </div>
-                </div>
-                <button type="submit" class="submit-button">Submit</button>
-            </form>
-        </body>
-    </html>
-    """
+def show_form(request: Request):
+    return form_page().response(request)
+
 
 @app.post("/predict", response_class=HTMLResponse)
-def predict(
+async def predict(
+    request: Request,
     loan_limit: str = Form(...),
     gender: str = Form(...),
     approv_in_adv: str = Form(...),
@@ -369,6 +225,9 @@ def predict(
     dtir1: int = Form(...)  # int for dtir1
 ):
     
+    # Time from the request arriving to here: reading the body and validating the form fields
+    STAGE_SECONDS.labels("form_parse").observe(time.perf_counter() - request.scope["state"]["received_at"])
+
     try:
         # Prepare input data
         # Prepare input data without using CustomData
@@ -407,37 +266,33 @@ def predict(
         }
 
 
-        # Convert to DataFrame
-        df = pd.DataFrame([input_data])
-        print("Before Prediction and input data converted to df")
-
-        predict_pipeline=PredictPipeline()
-        print("Mid Prediction")
-
-        predictions=predict_pipeline.predict(df)
-        print("after Prediction")
-        prediction = predictions[0]
-        
-    
-        # Generate HTML response
-
-        if prediction == 1:
-            prediction_statement = "<p>Client qualifies for the loan.</p>"
+        if batcher.running:
+            # Scored together with other concurrent requests
+            prediction = await batcher.submit(input_data)
+        elif executor.running:
+            try:
+                prediction = (await executor.predict_records([input_data]))[0]
+            except PoolUnavailable:
+                prediction = (await run_in_threadpool(score_records, [input_data]))[0]
         else:
-            prediction_statement = "<p>Unfortunately, the client does not qualify for the loan.</p>"
+            predictions = await run_in_threadpool(score_records, [input_data])
+            prediction = predictions[0]
         
-        html_response = generate_html(input_data, prediction_statement)
-        return HTMLResponse(content=html_response)
     
-    
-
+        # Generate HTML response
+        with stage_timer("render"):
+            html_response = generate_html(input_data, prediction)
+            return compressed_response(request, html_response)
 
+    except ExecutorBusy:
+        raise HTTPException(status_code=503, detail="Scoring queue is full, retry later")
     except Exception as e:
-        tb_str = traceback.format_exception(etype=type(e), value=e, tb=e.__traceback__)
-        error_message = f"An error occurred: {''.join(tb_str)}"
-        print(error_message)
+        tb_str = traceback.format_exception(type(e), e, e.__traceback__)
+        logging.error(f"Prediction failed: {''.join(tb_str)}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
         
         
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(app, host="0.0.0.0", port=8000)
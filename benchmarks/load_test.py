@@ -0,0 +1,563 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from dataclasses import dataclass, field
+from datetime import datetime
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+from benchmarks.synthetic_data import generate_applicants
+from src.exception import CustomException
+from src.logger import logging
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+ENDPOINTS = {"predict": "/predict", "batch": "/v1/predict/batch"}
+# Form and JSON fields that are integers in app.py and models.py
+INTEGER_FIELDS = {"loan_amount", "term", "credit_score", "dtir1"}
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+@dataclass
+class LoadTestConfig:
+    # Empty starts the app locally on a free port; otherwise an already running server, e.g. http://127.0.0.1:8000
+    url: str = ""
+    # 'uvicorn' runs a single `uvicorn app:app` process, 'serve' runs serve.py with server_workers workers
+    server: str = "uvicorn"
+    server_workers: int = 1
+    # Open connections, i.e. the most requests in flight at once
+    concurrency: int = 16
+    # Requests per second offered (open loop); 0 sends the next request as soon as a connection is free
+    rate: float = 0.0
+    duration: float = 30.0
+    # Seconds of load before measuring starts
+    warmup: float = 5.0
+    # Share of each endpoint in the request mix
+    mix: dict = field(default_factory=lambda: {"predict": 1.0})
+    batch_size: int = 64
+    # Distinct synthetic applicants the payloads are drawn from
+    applicants: int = 2000
+    seed: int = 42
+    sample_seconds: float = 1.0
+    request_timeout: float = 30.0
+    ready_timeout: float = 300.0
+
+
+def parse_mix(spec):
+    mix = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, weight = item.partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r}; choose from {sorted(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentiles(latencies):
+    if not latencies:
+        return {}
+    values = np.asarray(latencies) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3),
+        "mean_ms": round(float(values.mean()), 3),
+    }
+
+
+class Payloads:
+    """
+    Request bodies built from synthetic applicants: URL-encoded forms for /predict and
+    JSON arrays of batch_size applicants for the batch endpoint.
+
+    The API requires every field, so the generator's missing values are filled with
+    the column median or the most frequent category.
+    """
+
+    def __init__(self, n_applicants, batch_size, seed):
+        from models import LoanRequest
+        from src.components.data_transformation import DataTransformation
+
+        df = generate_applicants(n_applicants, seed=seed, with_target=False)
+        df = df.rename(columns=DataTransformation.rename_column)
+        json_names = {name.lower(): name for name in LoanRequest.model_fields}
+        df = df[list(json_names)]
+        for column in df.columns:
+            if df[column].dtype == object:
+                df[column] = df[column].fillna(df[column].mode()[0])
+            else:
+                df[column] = df[column].fillna(df[column].median())
+        records = []
+        for row in df.to_dict(orient="records"):
+            records.append({
+                name: int(value) if name in INTEGER_FIELDS else (float(value) if isinstance(value, (int, float)) else value)
+                for name, value in row.items()
+            })
+
+        self.forms = [urlencode(record).encode() for record in records]
+        json_records = [{json_names[name]: value for name, value in record.items()} for record in records]
+        rng = random.Random(seed)
+        self.batches = [
+            json.dumps(rng.sample(json_records, min(batch_size, len(json_records)))).encode()
+            for _ in range(max(1, min(64, n_applicants // max(1, batch_size))))
+        ]
+
+    def body(self, endpoint, rng):
+        if endpoint == "predict":
+            return "application/x-www-form-urlencoded", rng.choice(self.forms)
+        return "application/json", rng.choice(self.batches)
+
+
+class HttpConnection:
+    """
+    Minimal HTTP/1.1 keep-alive client on asyncio streams.
+
+    It only has to speak to uvicorn, and it keeps the client's own per-request cost far
+    below a general-purpose client's, which matters when client and server share the cores.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, path, content_type, body):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        head = (
+            f"POST {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n\r\n"
+        )
+        self.writer.write(head.encode("latin-1") + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Server closed the connection")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if "content-length" in headers:
+            await self.reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding") == "chunked":
+            while True:
+                size = int((await self.reader.readline()).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status
+
+
+def process_tree(root_pid):
+    """
+    Returns root_pid and all its descendants (server workers, scoring pool processes).
+    """
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as file_obj:
+                stat = file_obj.read()
+        except OSError:
+            continue
+        # The command name is in parentheses and may itself contain spaces
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+    pids, pending = [], [root_pid]
+    while pending:
+        pid = pending.pop()
+        pids.append(pid)
+        pending.extend(children.get(pid, []))
+    return pids
+
+
+def process_usage(pids):
+    """
+    Returns (CPU seconds, resident bytes) summed over pids, skipping processes that exited.
+    """
+    cpu_seconds, rss_bytes = 0.0, 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as file_obj:
+                fields = file_obj.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{pid}/statm") as file_obj:
+                resident_pages = int(file_obj.read().split()[1])
+        except (OSError, IndexError):
+            continue
+        # utime and stime, fields 14 and 15 of /proc/<pid>/stat
+        cpu_seconds += (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        rss_bytes += resident_pages * PAGE_SIZE
+    return cpu_seconds, rss_bytes
+
+
+class ResourceSampler:
+    """
+    Samples CPU use and RSS of the server's process tree and of the load generator.
+    """
+
+    def __init__(self, server_pid):
+        self.server_pid = server_pid
+        self.samples = []
+        self.started = None
+        self._last = None
+
+    def sample(self, completed, errors):
+        now = time.perf_counter()
+        server_pids = process_tree(self.server_pid) if self.server_pid else []
+        server_cpu, server_rss = process_usage(server_pids)
+        client_cpu, client_rss = process_usage([os.getpid()])
+        if self._last is not None:
+            last_time, last_server_cpu, last_client_cpu, last_completed, last_errors = self._last
+            elapsed = now - last_time
+            self.samples.append({
+                "t": round(now - self.started, 2),
+                "requests_per_second": round((completed - last_completed) / elapsed, 1),
+                "errors": errors - last_errors,
+                "server_cpu_percent": round(100 * (server_cpu - last_server_cpu) / elapsed, 1) if server_pids else None,
+                "server_rss_mb": round(server_rss / 2**20, 1) if server_pids else None,
+                "server_processes": len(server_pids),
+                "client_cpu_percent": round(100 * (client_cpu - last_client_cpu) / elapsed, 1),
+                "client_rss_mb": round(client_rss / 2**20, 1),
+            })
+        else:
+            self.started = now
+        self._last = (now, server_cpu, client_cpu, completed, errors)
+
+    def summary(self):
+        if not self.samples:
+            return {}
+        summary = {"client_cpu_percent_mean": round(float(np.mean([s["client_cpu_percent"] for s in self.samples])), 1)}
+        if self.server_pid:
+            cpu = [s["server_cpu_percent"] for s in self.samples]
+            rss = [s["server_rss_mb"] for s in self.samples]
+            summary.update({
+                "server_cpu_percent_mean": round(float(np.mean(cpu)), 1),
+                "server_cpu_percent_max": round(float(np.max(cpu)), 1),
+                "server_rss_mb_start": rss[0],
+                "server_rss_mb_max": round(float(np.max(rss)), 1),
+                "server_rss_mb_end": rss[-1],
+            })
+        return summary
+
+
+class LocalServer:
+    """
+    Starts app.py on a free local port and stops it with its workers afterwards.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.port = free_port()
+        self.process = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def command(self):
+        if self.config.server == "serve":
+            return [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(self.port),
+                    "--workers", str(self.config.server_workers), "--log-level", "warning"]
+        return [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1",
+                "--port", str(self.port), "--log-level", "warning"]
+
+    def start(self):
+        # PREDICT_* and LOG_* settings in the environment are passed through to the server
+        self.process = subprocess.Popen(self.command(), cwd=REPO_ROOT, start_new_session=True)
+        deadline = time.monotonic() + self.config.ready_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited with status {self.process.returncode} before it was ready")
+            try:
+                with urllib.request.urlopen(f"{self.url}/ready", timeout=2) as response:
+                    if response.status == 200:
+                        return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise TimeoutError(f"Server was not ready within {self.config.ready_timeout}s")
+
+    def stop(self):
+        if self.process is None or self.process.poll() is not None:
+            return
+        # The server runs in its own session: signal the whole group, including forked workers
+        os.killpg(self.process.pid, signal.SIGTERM)
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            os.killpg(self.process.pid, signal.SIGKILL)
+            self.process.wait()
+
+
+class LoadTest:
+    """
+    Drives /predict and the batch endpoint with a weighted mix of synthetic requests.
+
+    With rate 0 the test is closed-loop: each of the concurrency connections sends
+    its next request as soon as the previous answer arrives, which measures peak
+    throughput. With a rate it is open-loop: requests are scheduled at exponentially
+    distributed intervals (a Poisson process) and latency is measured from the
+    scheduled time, so time spent waiting for a free connection counts, and an
+    overloaded server shows up as growing latency rather than a lower offered load.
+    """
+
+    def __init__(self, config, url, server_pid=None):
+        self.config = config
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.sampler = ResourceSampler(server_pid)
+        self.payloads = Payloads(config.applicants, config.batch_size, config.seed)
+        self.endpoints = list(config.mix)
+        self.weights = [config.mix[name] for name in self.endpoints]
+        self.latencies = {name: [] for name in self.endpoints}
+        self.statuses = {name: {} for name in self.endpoints}
+        self.failures = {}
+        self.completed = 0
+        self.errors = 0
+        self.measuring = False
+
+    def record(self, endpoint, started, status=None, failure=None):
+        latency = time.perf_counter() - started
+        self.completed += 1
+        if failure is not None or status >= 400:
+            self.errors += 1
+        if not self.measuring:
+            return
+        if failure is not None:
+            self.failures[failure] = self.failures.get(failure, 0) + 1
+            return
+        self.statuses[endpoint][status] = self.statuses[endpoint].get(status, 0) + 1
+        if status < 400:
+            self.latencies[endpoint].append(latency)
+
+    async def send(self, connection, rng, started):
+        endpoint = rng.choices(self.endpoints, self.weights)[0]
+        content_type, body = self.payloads.body(endpoint, rng)
+        try:
+            status = await asyncio.wait_for(
+                connection.request(ENDPOINTS[endpoint], content_type, body), self.config.request_timeout,
+            )
+            self.record(endpoint, started, status=status)
+        except (asyncio.TimeoutError, ConnectionError, OSError, ValueError, asyncio.IncompleteReadError) as e:
+            await connection.close()
+            self.record(endpoint, started, failure=type(e).__name__)
+
+    async def closed_loop_worker(self, index, stop_at):
+        connection = HttpConnection(self.host, self.port)
+        rng = random.Random(self.config.seed + index)
+        while time.perf_counter() < stop_at:
+            await self.send(connection, rng, time.perf_counter())
+        await connection.close()
+
+    async def open_loop_worker(self, index, schedule):
+        connection = HttpConnection(self.host, self.port)
+        rng = random.Random(self.config.seed + index)
+        while True:
+            scheduled = await schedule.get()
+            if scheduled is None:
+                break
+            await self.send(connection, rng, scheduled)
+        await connection.close()
+
+    async def dispatch(self, schedule, stop_at):
+        rng = random.Random(self.config.seed)
+        next_at = time.perf_counter()
+        while next_at < stop_at:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            schedule.put_nowait(next_at)
+            next_at += rng.expovariate(self.config.rate)
+        for _ in range(self.config.concurrency):
+            schedule.put_nowait(None)
+
+    async def sample(self, stop_at):
+        while time.perf_counter() < stop_at:
+            self.sampler.sample(self.completed, self.errors)
+            await asyncio.sleep(self.config.sample_seconds)
+        self.sampler.sample(self.completed, self.errors)
+
+    async def run_async(self):
+        start = time.perf_counter()
+        measure_from = start + self.config.warmup
+        stop_at = measure_from + self.config.duration
+        if self.config.rate > 0:
+            schedule = asyncio.Queue()
+            tasks = [self.dispatch(schedule, stop_at)]
+            tasks += [self.open_loop_worker(i, schedule) for i in range(self.config.concurrency)]
+        else:
+            tasks = [self.closed_loop_worker(i, stop_at) for i in range(self.config.concurrency)]
+
+        async def start_measuring():
+            await asyncio.sleep(self.config.warmup)
+            self.measuring = True
+            await self.sample(stop_at)
+
+        await asyncio.gather(start_measuring(), *tasks)
+        # Requests still in flight at stop_at finish and are counted; the window is measured as it ran
+        return time.perf_counter() - measure_from
+
+    def run(self):
+        try:
+            elapsed = asyncio.run(self.run_async())
+            measured = sum(len(values) for values in self.latencies.values())
+            errors = sum(self.failures.values()) + sum(
+                count for statuses in self.statuses.values() for status, count in statuses.items() if status >= 400
+            )
+            total = measured + errors
+            endpoints = {}
+            for name in self.endpoints:
+                rows_per_request = self.config.batch_size if name == "batch" else 1
+                endpoints[name] = {
+                    "path": ENDPOINTS[name],
+                    "requests": sum(self.statuses[name].values()),
+                    "requests_per_second": round(len(self.latencies[name]) / elapsed, 1),
+                    "applicants_per_second": round(len(self.latencies[name]) * rows_per_request / elapsed, 1),
+                    "status_codes": {str(status): count for status, count in sorted(self.statuses[name].items())},
+                    **percentiles(self.latencies[name]),
+                }
+            return {
+                "seconds": round(elapsed, 2),
+                "requests": total,
+                "requests_per_second": round(measured / elapsed, 1),
+                "errors": errors,
+                "error_rate": round(errors / total, 4) if total else None,
+                "connection_failures": self.failures,
+                "latency": percentiles([value for values in self.latencies.values() for value in values]),
+                "endpoints": endpoints,
+                "resources": self.sampler.summary(),
+                "timeline": self.sampler.samples,
+            }
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+def run_load_test(config):
+    """
+    Starts the app unless config.url is set, runs the load test and returns the report.
+    """
+    server = None
+    try:
+        if config.url:
+            url, server_pid = config.url, None
+        else:
+            server = LocalServer(config)
+            server.start()
+            url, server_pid = server.url, server.process.pid
+        logging.info(f"Load test against {url}: {config}")
+        report = LoadTest(config, url, server_pid).run()
+    finally:
+        if server is not None:
+            server.stop()
+
+    settings = {key: value for key, value in vars(config).items() if key not in ("request_timeout", "ready_timeout")}
+    settings["server_env"] = {key: value for key, value in os.environ.items() if key.startswith(("PREDICT_", "LOG_", "WEB_"))}
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "url": config.url or "local",
+        "config": settings,
+        **report,
+    }
+
+
+def print_report(report):
+    print(f"{report['requests']} requests in {report['seconds']}s: {report['requests_per_second']} req/s, "
+          f"{report['errors']} errors ({(report['error_rate'] or 0):.2%})")
+    for name, endpoint in report["endpoints"].items():
+        if "p50_ms" not in endpoint:
+            print(f"  {endpoint['path']:<20} no successful requests, status codes {endpoint['status_codes']}")
+            continue
+        print(f"  {endpoint['path']:<20} {endpoint['requests_per_second']:>8} req/s  "
+              f"p50 {endpoint['p50_ms']:.1f}ms  p95 {endpoint['p95_ms']:.1f}ms  p99 {endpoint['p99_ms']:.1f}ms  "
+              f"max {endpoint['max_ms']:.1f}ms")
+    resources = report["resources"]
+    if "server_cpu_percent_mean" in resources:
+        print(f"  server CPU {resources['server_cpu_percent_mean']}% mean, {resources['server_cpu_percent_max']}% max; "
+              f"RSS {resources['server_rss_mb_start']} -> {resources['server_rss_mb_end']} MB "
+              f"(max {resources['server_rss_mb_max']} MB)")
+    if resources:
+        print(f"  load generator CPU {resources['client_cpu_percent_mean']}% mean")
+
+
+def parse_args(argv=None):
+    defaults = LoadTestConfig()
+    parser = argparse.ArgumentParser(description="Load-test the loan prediction app on this machine")
+    parser.add_argument("--url", default="", help="test a running server instead of starting one")
+    parser.add_argument("--server", choices=("uvicorn", "serve"), default=defaults.server,
+                        help="start `uvicorn app:app` or serve.py (default uvicorn)")
+    parser.add_argument("--server-workers", type=int, default=defaults.server_workers, help="workers for --server serve")
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency, help="connections (default 16)")
+    parser.add_argument("--rate", type=float, default=defaults.rate,
+                        help="requests per second, Poisson arrivals (default 0: as fast as the server answers)")
+    parser.add_argument("--duration", type=float, default=defaults.duration, help="measured seconds (default 30)")
+    parser.add_argument("--warmup", type=float, default=defaults.warmup, help="unmeasured seconds first (default 5)")
+    parser.add_argument("--mix", default="predict=1", help="endpoint weights, e.g. predict=0.9,batch=0.1")
+    parser.add_argument("--batch-size", type=int, default=defaults.batch_size, help="applicants per batch request")
+    parser.add_argument("--applicants", type=int, default=defaults.applicants, help="distinct synthetic applicants")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--sample-seconds", type=float, default=defaults.sample_seconds)
+    parser.add_argument("--output", help="report file (default: benchmarks/results/load_<timestamp>.json)")
+    args = parser.parse_args(argv)
+    config = LoadTestConfig(
+        url=args.url,
+        server=args.server,
+        server_workers=args.server_workers,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        duration=args.duration,
+        warmup=args.warmup,
+        mix=parse_mix(args.mix),
+        batch_size=args.batch_size,
+        applicants=args.applicants,
+        seed=args.seed,
+        sample_seconds=args.sample_seconds,
+    )
+    return config, args.output
+
+
+if __name__ == "__main__":
+    config, output = parse_args()
+    report = run_load_test(config)
+    output = output or os.path.join(RESULTS_DIR, f"load_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file_obj:
+        json.dump(report, file_obj, indent=2)
+    print_report(report)
+    print(f"Report written to {output}")
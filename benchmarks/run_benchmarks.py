@@ -0,0 +1,309 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.synthetic_data import generate_applicants
+from src.components.data_ingestion import DataIngestion
+from src.components.data_transformation import DataTransformation
+from src.components.model_training import ModelTrainer
+from src.exception import CustomException
+from src.logger import logging
+from src.pipeline.model_registry import ModelRegistry
+from src.pipeline.predict_pipeline import PredictPipeline
+from src.utils import available_cores, load_object, write_table
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS_DIR = os.path.join(REPO_ROOT, "benchmarks")
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, "baseline.json")
+BATCH_SIZES = (1, 64, 4096)
+SERVED_MODEL = "LGBM"
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    import lightgbm
+    import pandas
+    import sklearn
+    import xgboost
+
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "cores": available_cores(),
+        "numpy": np.__version__,
+        "pandas": pandas.__version__,
+        "scikit-learn": sklearn.__version__,
+        "xgboost": xgboost.__version__,
+        "lightgbm": lightgbm.__version__,
+    }
+
+
+def timing(runs):
+    """
+    Summarises repeated wall-clock timings in seconds; the median is the compared value.
+    """
+    return {"value": statistics.median(runs), "min": min(runs), "runs": [round(run, 6) for run in runs]}
+
+
+def model_file(model_name):
+    return os.path.join("artifacts", "models", f"{model_name.lower().replace(' ', '_')}_model.pkl")
+
+
+class BenchmarkSuite:
+    """
+    Times the training and serving stages on synthetic applicants.
+
+    Everything runs inside a scratch workspace directory, so the repository's own
+    artifacts are never read or overwritten. Each stage is repeated and its median
+    is reported, next to the individual runs.
+    """
+
+    def __init__(self, workspace, rows=20000, seed=42, repeats=3, models=None, predict_seconds=2.0):
+        self.workspace = workspace
+        self.rows = rows
+        self.seed = seed
+        self.repeats = repeats
+        self.models = models
+        self.predict_seconds = predict_seconds
+        self.metrics = {}
+        self.info = {}
+
+    def prepare(self):
+        source_path = os.path.join("notebook", "data", "Loan_Default.csv")
+        write_table(generate_applicants(self.rows, seed=self.seed), source_path)
+        self.info["source_bytes"] = os.path.getsize(source_path)
+
+    def bench_ingestion(self):
+        runs = []
+        for _ in range(self.repeats):
+            start = time.perf_counter()
+            train_path, test_path = DataIngestion().initiate_data_ingestion()
+            runs.append(time.perf_counter() - start)
+        self.metrics["ingestion_seconds"] = timing(runs)
+        return train_path, test_path
+
+    def bench_transformation(self, train_path, test_path):
+        runs = []
+        for _ in range(self.repeats):
+            start = time.perf_counter()
+            X_train, y_train, X_test, y_test, preprocessor_path = DataTransformation().initiate_data_transformation(
+                train_path, test_path
+            )
+            runs.append(time.perf_counter() - start)
+        self.metrics["transformation_seconds"] = timing(runs)
+        self.info["n_features"] = X_train.shape[1]
+        return X_train, y_train, X_test, y_test, preprocessor_path
+
+    def bench_training(self, X_train, y_train, X_test, y_test):
+        trainer = ModelTrainer()
+        model_names = list(self.models or trainer.get_models())
+        if SERVED_MODEL not in model_names:
+            # Serving benchmarks need the served model
+            model_names.append(SERVED_MODEL)
+        n_threads = available_cores()
+        for model_name in model_names:
+            runs = []
+            for _ in range(self.repeats):
+                model = trainer.get_models()[model_name]
+                result = trainer.train_model(model_name, model, X_train, y_train, X_test, y_test, n_threads)
+                runs.append(result["fit_seconds"])
+            self.metrics[f"fit_seconds.{model_name}"] = timing(runs)
+            self.info[f"f1.{model_name}"] = round(result["f1"], 4)
+
+    def bench_artifact_load(self, preprocessor_path):
+        model_path = model_file(SERVED_MODEL)
+        for name, path in [("preprocessor", preprocessor_path), (SERVED_MODEL, model_path)]:
+            runs = []
+            for _ in range(self.repeats):
+                start = time.perf_counter()
+                load_object(path)
+                runs.append(time.perf_counter() - start)
+            self.metrics[f"load_seconds.{name}"] = timing(runs)
+
+        # What a server process pays before its first request: unpickling plus compiling the encoder and trees
+        runs = []
+        for _ in range(self.repeats):
+            start = time.perf_counter()
+            ModelRegistry().get(model_path, preprocessor_path)
+            runs.append(time.perf_counter() - start)
+        self.metrics["load_seconds.registry"] = timing(runs)
+
+    def bench_predict(self, preprocessor_path):
+        pipeline = PredictPipeline(model_path=model_file(SERVED_MODEL), preprocessor_path=preprocessor_path)
+        pipeline.load()
+        applicants = generate_applicants(max(BATCH_SIZES), seed=self.seed + 1, with_target=False)
+        for batch_size in BATCH_SIZES:
+            batch = applicants.iloc[:batch_size]
+            # Warm-up; predict renames the frame's columns in place, so every call gets a fresh copy
+            pipeline.predict(batch.copy())
+            latencies = []
+            deadline = time.perf_counter() + self.predict_seconds
+            while len(latencies) < 5 or (time.perf_counter() < deadline and len(latencies) < 2000):
+                frame = batch.copy()
+                start = time.perf_counter()
+                pipeline.predict(frame)
+                latencies.append(time.perf_counter() - start)
+            self.metrics[f"predict_p50_seconds.batch_{batch_size}"] = {
+                "value": float(np.percentile(latencies, 50)), "calls": len(latencies),
+            }
+            self.metrics[f"predict_p95_seconds.batch_{batch_size}"] = {
+                "value": float(np.percentile(latencies, 95)), "calls": len(latencies),
+            }
+            self.info[f"rows_per_second.batch_{batch_size}"] = round(batch_size / statistics.mean(latencies), 1)
+
+    def run(self):
+        try:
+            started = time.perf_counter()
+            self.prepare()
+            train_path, test_path = self.bench_ingestion()
+            X_train, y_train, X_test, y_test, preprocessor_path = self.bench_transformation(train_path, test_path)
+            self.bench_training(X_train, y_train, X_test, y_test)
+            self.bench_artifact_load(preprocessor_path)
+            self.bench_predict(preprocessor_path)
+            self.info["total_seconds"] = round(time.perf_counter() - started, 2)
+            return {
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "git_commit": git_commit(),
+                "environment": environment(),
+                "config": {"rows": self.rows, "seed": self.seed, "repeats": self.repeats, "models": self.models},
+                "metrics": self.metrics,
+                "info": self.info,
+            }
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+def compare(baseline, current, tolerance=0.2, min_delta=0.0002):
+    """
+    Compares the metrics of two result files; every metric is a time, so higher is worse.
+
+    A metric regressed when it is more than tolerance (a fraction) slower than the
+    baseline and also at least min_delta seconds slower, which keeps the timer noise
+    of sub-millisecond metrics from being reported.
+    """
+    rows = []
+    for name, metric in current["metrics"].items():
+        previous = baseline["metrics"].get(name)
+        if previous is None:
+            continue
+        old, new = previous["value"], metric["value"]
+        change = (new - old) / old if old > 0 else 0.0
+        regressed = change > tolerance and new - old > min_delta
+        rows.append({"metric": name, "baseline": old, "current": new, "change": change, "regressed": regressed})
+    return rows
+
+
+def print_comparison(rows, baseline):
+    print(f"Compared with baseline from {baseline.get('created_at')} (commit {baseline.get('git_commit')})")
+    if not rows:
+        print("  no comparable metrics")
+        return
+    width = max(len(row["metric"]) for row in rows)
+    for row in rows:
+        flag = "REGRESSION" if row["regressed"] else ""
+        print(f"  {row['metric']:<{width}}  {row['baseline']:>10.5f}s -> {row['current']:>10.5f}s  {row['change']:+7.1%}  {flag}")
+
+
+def comparable(baseline, current):
+    """
+    Returns the settings that differ between two runs; their timings are not directly comparable.
+    """
+    differences = [key for key in ("rows", "seed") if baseline["config"].get(key) != current["config"].get(key)]
+    differences += [
+        key for key in ("machine", "cores", "python") if baseline["environment"].get(key) != current["environment"].get(key)
+    ]
+    return differences
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the training and serving pipelines on synthetic data")
+    parser.add_argument("--rows", type=int, default=20000, help="synthetic applications to generate")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeats", type=int, default=3, help="runs of each stage; the median is reported")
+    parser.add_argument("--models", nargs="+", help="models to fit (default: all of ModelTrainer.get_models)")
+    parser.add_argument("--predict-seconds", type=float, default=2.0, help="time spent timing each batch size")
+    parser.add_argument("--output", help=f"result file (default: {os.path.relpath(RESULTS_DIR)}/<timestamp>.json)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="result file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="also store this run as the baseline")
+    parser.add_argument("--compare", metavar="RESULT", help="compare an existing result file instead of running")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown as a fraction (default 0.2)")
+    parser.add_argument("--min-delta", type=float, default=0.0002, help="smallest slowdown in seconds that counts")
+    parser.add_argument("--keep-workspace", action="store_true", help="keep the scratch directory with the artifacts")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.compare:
+        with open(args.compare) as file_obj:
+            result = json.load(file_obj)
+    else:
+        workspace = tempfile.mkdtemp(prefix="loan_bench_")
+        cwd = os.getcwd()
+        os.chdir(workspace)
+        try:
+            suite = BenchmarkSuite(
+                workspace, rows=args.rows, seed=args.seed, repeats=args.repeats,
+                models=args.models, predict_seconds=args.predict_seconds,
+            )
+            result = suite.run()
+        finally:
+            os.chdir(cwd)
+            if args.keep_workspace:
+                print(f"Workspace kept in {workspace}")
+            else:
+                shutil.rmtree(workspace, ignore_errors=True)
+
+        output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as file_obj:
+            json.dump(result, file_obj, indent=2)
+        print(f"Results written to {output}")
+        logging.info(f"Benchmark results written to {output}")
+        for name, metric in result["metrics"].items():
+            print(f"  {name:<40} {metric['value']:.5f}s")
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as file_obj:
+            baseline = json.load(file_obj)
+        differences = comparable(baseline, result)
+        if differences:
+            print(f"Warning: baseline differs in {', '.join(differences)}; timings may not be comparable")
+        rows = compare(baseline, result, args.tolerance, args.min_delta)
+        print_comparison(rows, baseline)
+        regressions = [row["metric"] for row in rows if row["regressed"]]
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file_obj:
+            json.dump(result, file_obj, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from src.utils import write_table
+
+# Category frequencies of the Loan_Default.csv source data (148,670 applications).
+# Columns use their raw names; DataTransformation.col_rename maps them to the training names.
+CATEGORY_DISTRIBUTIONS = {
+    "loan_limit": {"cf": 0.933, "ncf": 0.067},
+    "Gender": {"Male": 0.285, "Joint": 0.278, "Sex Not Available": 0.254, "Female": 0.183},
+    "approv_in_adv": {"nopre": 0.843, "pre": 0.157},
+    "loan_type": {"type1": 0.761, "type2": 0.140, "type3": 0.099},
+    "loan_purpose": {"p3": 0.376, "p4": 0.369, "p1": 0.233, "p2": 0.022},
+    "Credit_Worthiness": {"l1": 0.957, "l2": 0.043},
+    "open_credit": {"nopc": 0.996, "opc": 0.004},
+    "Neg_ammortization": {"not_neg": 0.898, "neg_amm": 0.102},
+    "interest_only": {"not_int": 0.952, "int_only": 0.048},
+    "lump_sum_payment": {"not_lpsm": 0.977, "lpsm": 0.023},
+    "construction_type": {"sb": 0.9998, "mh": 0.0002},
+    "occupancy_type": {"pr": 0.930, "ir": 0.049, "sr": 0.021},
+    "total_units": {"1U": 0.985, "2U": 0.010, "3U": 0.003, "4U": 0.002},
+    "credit_type": {"CIB": 0.324, "CRIF": 0.295, "EXP": 0.278, "EQUI": 0.103},
+    "co-applicant_credit_type": {"CIB": 0.500, "EXP": 0.500},
+    "age": {"45-54": 0.234, "35-44": 0.221, "55-64": 0.219, "65-74": 0.140, "25-34": 0.129, ">74": 0.048, "<25": 0.009},
+    "submission_of_application": {"to_inst": 0.645, "not_inst": 0.355},
+    "Region": {"North": 0.503, "south": 0.431, "central": 0.058, "North-East": 0.008},
+}
+TERM_DISTRIBUTION = {360.0: 0.815, 180.0: 0.087, 240.0: 0.039, 300.0: 0.020, 144.0: 0.020, 120.0: 0.019}
+# Share of missing values per column in the source data
+MISSING_RATES = {
+    "loan_limit": 0.0225,
+    "approv_in_adv": 0.0061,
+    "loan_purpose": 0.0009,
+    "rate_of_interest": 0.245,
+    "Interest_rate_spread": 0.2466,
+    "Upfront_charges": 0.2666,
+    "term": 0.0003,
+    "Neg_ammortization": 0.0008,
+    "property_value": 0.1016,
+    "income": 0.0615,
+    "age": 0.0013,
+    "dtir1": 0.1622,
+}
+# Column order of Loan_Default.csv
+RAW_COLUMNS = [
+    "ID", "year", "loan_limit", "Gender", "approv_in_adv", "loan_type", "loan_purpose",
+    "Credit_Worthiness", "open_credit", "business_or_commercial", "loan_amount", "rate_of_interest",
+    "Interest_rate_spread", "Upfront_charges", "term", "Neg_ammortization", "interest_only",
+    "lump_sum_payment", "property_value", "construction_type", "occupancy_type", "Secured_by",
+    "total_units", "income", "credit_type", "Credit_Score", "co-applicant_credit_type", "age",
+    "submission_of_application", "LTV", "Region", "Security_Type", "Status", "dtir1",
+]
+DEFAULT_RATE = 0.246
+FIRST_ID = 24890
+
+
+def _choice(rng, distribution, n_rows):
+    values = list(distribution)
+    probabilities = np.array(list(distribution.values()), dtype=float)
+    return rng.choice(np.array(values, dtype=object), size=n_rows, p=probabilities / probabilities.sum())
+
+
+def _round_to(values, step, offset=0.0):
+    return np.round((values - offset) / step) * step + offset
+
+
+def generate_applicants(n_rows, seed=42, with_target=True):
+    """
+    Returns n_rows synthetic loan applications in the raw Loan_Default.csv layout.
+
+    Every column DataTransformation uses is present, with the category frequencies,
+    value ranges and missing-value rates of the source data. Columns that are tied
+    together there stay tied: business_or_commercial follows loan_type, Secured_by
+    and Security_Type follow construction_type, LTV is loan_amount / property_value,
+    and the interest rate fields are mostly missing for defaulted loans.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"ID": np.arange(FIRST_ID, FIRST_ID + n_rows), "year": 2019})
+
+    for column, distribution in CATEGORY_DISTRIBUTIONS.items():
+        df[column] = _choice(rng, distribution, n_rows)
+    df["business_or_commercial"] = np.where(df["loan_type"] == "type2", "b/c", "nob/c")
+    is_manufactured = df["construction_type"] == "mh"
+    df["Secured_by"] = np.where(is_manufactured, "land", "home")
+    df["Security_Type"] = np.where(is_manufactured, "Indirect", "direct")
+
+    loan_amount = np.clip(_round_to(rng.lognormal(np.log(296500), 0.5, n_rows), 10000, 6500), 16500, 3576500)
+    ltv = np.clip(rng.normal(74, 15, n_rows), 10, 130)
+    property_value = np.maximum(_round_to(loan_amount * 100 / ltv, 10000, 8000), 8000)
+    df["loan_amount"] = loan_amount.astype(np.int64)
+    df["rate_of_interest"] = np.round(np.clip(rng.normal(4.05, 0.56, n_rows), 0.0, 8.0), 3)
+    df["Interest_rate_spread"] = np.round(np.clip(rng.normal(0.44, 0.51, n_rows), -3.6, 3.4), 4)
+    df["Upfront_charges"] = np.round(rng.gamma(1.0, 3225.0, n_rows), 2)
+    df["term"] = _choice(rng, TERM_DISTRIBUTION, n_rows).astype(float)
+    df["property_value"] = property_value
+    df["income"] = np.maximum(_round_to(rng.lognormal(np.log(5760), 0.6, n_rows), 60), 0.0)
+    df["Credit_Score"] = rng.integers(500, 901, n_rows)
+    df["LTV"] = np.round(loan_amount * 100 / property_value, 6)
+    df["dtir1"] = np.round(np.clip(rng.normal(37.7, 10.5, n_rows), 5, 61))
+
+    status = rng.random(n_rows) < DEFAULT_RATE
+    for column, rate in MISSING_RATES.items():
+        if column in ("rate_of_interest", "Interest_rate_spread"):
+            continue
+        df.loc[rng.random(n_rows) < rate, column] = np.nan
+    # As in the source data, the rate fields are missing for nearly every default and few other loans
+    rate_missing = np.where(status, rng.random(n_rows) < 0.95, rng.random(n_rows) < 0.017)
+    df.loc[rate_missing, "rate_of_interest"] = np.nan
+    df.loc[rate_missing | (rng.random(n_rows) < 0.002), "Interest_rate_spread"] = np.nan
+    df.loc[df["property_value"].isna(), "LTV"] = np.nan
+    df.loc[df["age"].isna(), "submission_of_application"] = np.nan
+
+    df["Status"] = status.astype(np.int64)
+    columns = RAW_COLUMNS if with_target else [column for column in RAW_COLUMNS if column != "Status"]
+    return df[columns]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Write synthetic loan applications in the Loan_Default.csv layout")
+    parser.add_argument("output", help="output file, .csv, .parquet or .feather")
+    parser.add_argument("--rows", type=int, default=148670)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-target", action="store_true", help="leave out the Status column")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    frame = generate_applicants(args.rows, seed=args.seed, with_target=not args.no_target)
+    write_table(frame, args.output)
+    print(f"Wrote {len(frame)} rows to {args.output}")
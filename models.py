@@ -1,3 +1,5 @@
+from typing import List
+
 from pydantic import BaseModel
 from fastapi import FastAPI, Form
 
@@ -34,3 +36,9 @@ class LoanRequest(BaseModel):
     region: str
     security_Type: str
     dtir1: int
+
+
+class BatchPredictionResponse(BaseModel):
+    model_version: str
+    predictions: List[int]
+    probabilities: List[float]
@@ -0,0 +1,196 @@
+import argparse
+import gc
+import os
+import random
+import signal
+import socket
+import sys
+import time
+import traceback
+from dataclasses import dataclass, field
+
+from src.logger import logging, stop_listener
+from src.utils import available_cores
+
+
+@dataclass
+class ServerConfig:
+    host: str = field(default_factory=lambda: os.getenv("HOST", "0.0.0.0"))
+    port: int = field(default_factory=lambda: int(os.getenv("PORT", "8000")))
+    # WEB_CONCURRENCY as in uvicorn/gunicorn; 0 means one worker per available core
+    workers: int = field(default_factory=lambda: int(os.getenv("WEB_CONCURRENCY", "0")))
+    # A worker exits after about this many requests (0 disables) and is replaced by a fresh fork;
+    # a random extra of up to max_requests_jitter keeps workers from recycling at the same moment
+    max_requests: int = field(default_factory=lambda: int(os.getenv("PREDICT_MAX_REQUESTS", "10000")))
+    max_requests_jitter: int = field(default_factory=lambda: int(os.getenv("PREDICT_MAX_REQUESTS_JITTER", "1000")))
+    # Seconds a stopping worker waits for in-flight requests
+    graceful_timeout: float = field(default_factory=lambda: float(os.getenv("PREDICT_GRACEFUL_TIMEOUT", "30")))
+    backlog: int = 2048
+    log_level: str = "info"
+
+    def __post_init__(self):
+        self.workers = self.workers or available_cores()
+
+
+class PreforkServer:
+    """
+    Loads and warms up the prediction pipeline once, then forks the uvicorn workers.
+
+    The master imports app.py and loads the pipeline before binding the listening
+    socket, so each worker starts with the artifacts already in memory, shared
+    copy-on-write with the master, and is ready as soon as it is forked. The master
+    only supervises: a worker that exits, after reaching max_requests or by
+    crashing, is replaced by a new fork, and SIGTERM/SIGINT stop every worker
+    gracefully before the master exits.
+    """
+
+    # A worker that fails sooner than this after starting is replaced only after a pause
+    MIN_WORKER_LIFETIME = 1.0
+
+    def __init__(self, config=None):
+        self.config = config or ServerConfig()
+        self.app = None
+        self.socket = None
+        self.workers = {}
+        self.stopping = False
+
+    def preload(self):
+        from threadpoolctl import threadpool_limits
+        import app as app_module
+
+        start = time.perf_counter()
+        app_module.loader.config.mode = "eager"
+        # OpenMP/BLAS thread pools started in the master would not survive fork,
+        # so loading and warm-up run single-threaded; workers start their own pools
+        with threadpool_limits(limits=1):
+            app_module.loader.start()
+        if not app_module.loader.ready:
+            raise RuntimeError(f"Prediction pipeline failed to load: {app_module.loader.error}")
+        self.app = app_module.app
+
+        # Objects that exist now are never collected, so the GC does not write to (and copy) their pages
+        gc.freeze()
+        logging.info(f"Pipeline preloaded in {time.perf_counter() - start:.2f}s: {app_module.loader.timings.as_dict()}")
+
+    def bind(self):
+        family = socket.AF_INET6 if ":" in self.config.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.config.host, self.config.port))
+        sock.listen(self.config.backlog)
+        sock.set_inheritable(True)
+        self.socket = sock
+
+    def _run_worker(self):
+        import uvicorn
+
+        exit_code = 0
+        try:
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, signal.SIG_DFL)
+            limit_max_requests = None
+            if self.config.max_requests > 0:
+                # SystemRandom: the forked workers share the master's random state
+                jitter = random.SystemRandom().randint(0, max(self.config.max_requests_jitter, 0))
+                limit_max_requests = self.config.max_requests + jitter
+
+            config = uvicorn.Config(
+                self.app,
+                limit_max_requests=limit_max_requests,
+                timeout_graceful_shutdown=self.config.graceful_timeout,
+                log_level=self.config.log_level,
+            )
+            uvicorn.Server(config).run(sockets=[self.socket])
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            # os._exit skips atexit, so queued log records are written out here
+            stop_listener()
+            os._exit(exit_code)
+
+    def spawn_worker(self):
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker()
+        self.workers[pid] = time.monotonic()
+        logging.info(f"Started worker {pid}")
+
+    def _stop(self, signum, frame):
+        if self.stopping:
+            # A second signal skips the graceful shutdown
+            self._signal_workers(signal.SIGKILL)
+            return
+        self.stopping = True
+        logging.info(f"Received signal {signum}, stopping {len(self.workers)} workers")
+        self._signal_workers(signal.SIGTERM)
+
+    def _signal_workers(self, signum):
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def supervise(self):
+        while self.workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started_at = self.workers.pop(pid, None)
+            if started_at is None:
+                continue
+
+            exit_code = os.waitstatus_to_exitcode(status)
+            logging.info(f"Worker {pid} exited with code {exit_code}")
+            if self.stopping:
+                continue
+            if exit_code != 0 and time.monotonic() - started_at < self.MIN_WORKER_LIFETIME:
+                time.sleep(self.MIN_WORKER_LIFETIME)
+            self.spawn_worker()
+
+    def run(self):
+        self.preload()
+        self.bind()
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        print(f"Serving on {self.config.host}:{self.config.port} with {self.config.workers} workers")
+        logging.info(f"Serving on {self.config.host}:{self.config.port} with {self.config.workers} workers")
+        for _ in range(self.config.workers):
+            self.spawn_worker()
+        self.supervise()
+        self.socket.close()
+
+
+def parse_args(argv=None):
+    defaults = ServerConfig()
+    parser = argparse.ArgumentParser(description="Pre-fork server for the loan default prediction app")
+    parser.add_argument("--host", default=defaults.host)
+    parser.add_argument("--port", type=int, default=defaults.port)
+    parser.add_argument("--workers", type=int, default=defaults.workers)
+    parser.add_argument("--max-requests", type=int, default=defaults.max_requests)
+    parser.add_argument("--max-requests-jitter", type=int, default=defaults.max_requests_jitter)
+    parser.add_argument("--graceful-timeout", type=float, default=defaults.graceful_timeout)
+    parser.add_argument("--log-level", default=defaults.log_level)
+    args = parser.parse_args(argv)
+    return ServerConfig(
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        max_requests=args.max_requests,
+        max_requests_jitter=args.max_requests_jitter,
+        graceful_timeout=args.graceful_timeout,
+        log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    config = parse_args()
+    if not hasattr(os, "fork"):
+        # No fork on Windows: fall back to a single uvicorn process
+        import uvicorn
+        uvicorn.run("app:app", host=config.host, port=config.port)
+        sys.exit(0)
+    PreforkServer(config).run()
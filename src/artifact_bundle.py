@@ -0,0 +1,190 @@
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import shutil
+import sys
+import time
+
+from src.exception import CustomException
+from src.logger import logging
+
+BUNDLE_SUFFIX = ".bundle"
+BUNDLE_FORMAT = "artifact-bundle"
+SCHEMA_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+PICKLE_FILE = "object.pkl"
+# Smaller buffers (scaler statistics, category lists) stay inside the pickle stream
+MIN_BUFFER_BYTES = 64 * 1024
+
+
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file_obj:
+        for block in iter(lambda: file_obj.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_bundle(path):
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+
+def bundle_path_for(file_path):
+    """
+    Returns the bundle path that sits next to a pickle, e.g. preprocessor.pkl -> preprocessor.bundle.
+    """
+    return os.path.splitext(file_path)[0] + BUNDLE_SUFFIX
+
+
+def read_manifest(bundle_path):
+    with open(os.path.join(bundle_path, MANIFEST_FILE)) as file_obj:
+        manifest = json.load(file_obj)
+    if manifest.get("format") != BUNDLE_FORMAT or manifest.get("schema_version") != SCHEMA_VERSION:
+        raise ValueError(f"{bundle_path} is not a schema {SCHEMA_VERSION} {BUNDLE_FORMAT}")
+    return manifest
+
+
+def write_bundle(bundle_path, obj, min_buffer_bytes=MIN_BUFFER_BYTES, source_sha256=None):
+    """
+    Pickles obj into a bundle directory with protocol 5, writing every large contiguous
+    buffer (NumPy array data) to its own file so it can be memory-mapped on load.
+
+    The bundle is built in a temporary directory and renamed into place, so a reader
+    never sees a half-written bundle.
+    """
+    try:
+        buffers = []
+
+        def keep_in_band(buffer):
+            # Returning a true value keeps the buffer inside the pickle stream
+            if buffer.raw().nbytes < min_buffer_bytes:
+                return True
+            buffers.append(buffer)
+            return False
+
+        payload = pickle.dumps(obj, protocol=5, buffer_callback=keep_in_band)
+
+        parent = os.path.dirname(os.path.abspath(bundle_path))
+        os.makedirs(parent, exist_ok=True)
+        staging_path = f"{bundle_path}.tmp-{os.getpid()}"
+        shutil.rmtree(staging_path, ignore_errors=True)
+        os.makedirs(staging_path)
+
+        with open(os.path.join(staging_path, PICKLE_FILE), "wb") as file_obj:
+            file_obj.write(payload)
+
+        buffer_entries = []
+        for index, buffer in enumerate(buffers):
+            file_name = f"buffer_{index:03d}.bin"
+            data = buffer.raw()
+            with open(os.path.join(staging_path, file_name), "wb") as file_obj:
+                file_obj.write(data)
+            buffer_entries.append({
+                "file": file_name,
+                "nbytes": data.nbytes,
+                "sha256": hashlib.sha256(data).hexdigest(),
+            })
+
+        manifest = {
+            "format": BUNDLE_FORMAT,
+            "schema_version": SCHEMA_VERSION,
+            "object_type": f"{type(obj).__module__}.{type(obj).__qualname__}",
+            "python": ".".join(map(str, sys.version_info[:3])),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "source_sha256": source_sha256,
+            "pickle": {"file": PICKLE_FILE, "nbytes": len(payload),
+                       "sha256": hashlib.sha256(payload).hexdigest()},
+            "buffers": buffer_entries,
+        }
+        with open(os.path.join(staging_path, MANIFEST_FILE), "w") as file_obj:
+            json.dump(manifest, file_obj, indent=2)
+
+        # Swap the finished bundle in; the old one is removed only after the rename
+        previous_path = None
+        if os.path.exists(bundle_path):
+            previous_path = f"{bundle_path}.old-{os.getpid()}"
+            os.rename(bundle_path, previous_path)
+        os.rename(staging_path, bundle_path)
+        if previous_path:
+            shutil.rmtree(previous_path, ignore_errors=True)
+
+        logging.info(
+            f"Wrote bundle {bundle_path}: {len(payload)} pickle bytes, "
+            f"{sum(entry['nbytes'] for entry in buffer_entries)} bytes in {len(buffer_entries)} buffers"
+        )
+        return manifest
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def _map_file(file_path):
+    with open(file_path, "rb") as file_obj:
+        # The mapping stays valid after the file is closed
+        return mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def read_bundle(bundle_path, verify=True):
+    """
+    Unpickles a bundle with its large buffers memory-mapped read-only.
+
+    Arrays rebuilt from those buffers point straight into the mapped files, so every
+    process that loads the same bundle shares one copy of their pages. With verify,
+    each file's checksum is compared with the manifest first.
+    """
+    try:
+        manifest = read_manifest(bundle_path)
+
+        pickle_path = os.path.join(bundle_path, manifest["pickle"]["file"])
+        with open(pickle_path, "rb") as file_obj:
+            payload = file_obj.read()
+        if verify and hashlib.sha256(payload).hexdigest() != manifest["pickle"]["sha256"]:
+            raise ValueError(f"Checksum mismatch for {pickle_path}")
+
+        buffers = []
+        for entry in manifest["buffers"]:
+            mapped = _map_file(os.path.join(bundle_path, entry["file"]))
+            if len(mapped) != entry["nbytes"]:
+                raise ValueError(f"Size mismatch for {entry['file']} in {bundle_path}")
+            if verify and hashlib.sha256(mapped).hexdigest() != entry["sha256"]:
+                raise ValueError(f"Checksum mismatch for {entry['file']} in {bundle_path}")
+            buffers.append(memoryview(mapped))
+
+        return pickle.loads(payload, buffers=buffers)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def convert_pickle(file_path, bundle_path=None):
+    """
+    Writes the bundle version of a pickle file, recording the pickle's checksum as its source.
+    """
+    bundle_path = bundle_path or bundle_path_for(file_path)
+    with open(file_path, "rb") as file_obj:
+        obj = pickle.load(file_obj)
+    write_bundle(bundle_path, obj, source_sha256=file_sha256(file_path))
+    return bundle_path
+
+
+def current_bundle(file_path, source_sha256):
+    """
+    Returns the bundle next to file_path if it was converted from this exact file, else None.
+    """
+    bundle_path = bundle_path_for(file_path)
+    if not is_bundle(bundle_path):
+        return None
+    try:
+        manifest = read_manifest(bundle_path)
+    except (ValueError, OSError) as e:
+        logging.info(f"Ignoring bundle {bundle_path}: {e}")
+        return None
+    return bundle_path if manifest.get("source_sha256") == source_sha256 else None
+
+
+if __name__ == "__main__":
+    # python -m src.artifact_bundle artifacts/preprocessor.pkl artifacts/models/lgbm_model.pkl
+    for path in sys.argv[1:]:
+        print(path, "->", convert_pickle(path))
@@ -1,3 +1,4 @@
+import json
 import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -9,6 +10,8 @@ if project_root not in sys.path:
 
 from src.exception import CustomException
 from src.logger import logging
+from src.utils import write_table
+import numpy as np
 import pandas as pd
 
 from sklearn.model_selection import train_test_split
@@ -19,34 +22,338 @@ from src.components.data_transformation import DataTransformationConfig
 
 from src.components.model_training import ModelTrainerConfig
 from src.components.model_training import ModelTrainer
+
+# Resolution of the key hash used to split rows in streaming mode
+HASH_BUCKETS = 10000
+
 @dataclass
 class DataIngestionConfig:
-    train_data_path: str=os.path.join('artifacts',"train.csv")
-    test_data_path: str=os.path.join('artifacts',"test.csv")
-    raw_data_path: str=os.path.join('artifacts',"data.csv")
+    source_data_path: str=os.path.join('notebook','data','Loan_Default.csv')
+    # 'parquet' (default), 'feather' or 'csv'
+    artifact_format: str="parquet"
+    train_data_path: str=""
+    test_data_path: str=""
+    raw_data_path: str=""
+    test_size: float=0.2
+    # Streaming mode reads the source in chunks and splits rows by a stable hash of split_key_column
+    streaming: bool=False
+    chunk_size: int=100000
+    split_key_column: str="ID"
+    # Optional column (e.g. "Status") whose classes are each split in test_size proportions
+    stratify_column: str=""
+    # Per-class hash thresholds of the stratified split; reused by later runs so appended rows never move existing ones
+    split_thresholds_path: str=os.path.join('artifacts','split_thresholds.json')
+
+    def __post_init__(self):
+        self.train_data_path = self.train_data_path or os.path.join('artifacts',f"train.{self.artifact_format}")
+        self.test_data_path = self.test_data_path or os.path.join('artifacts',f"test.{self.artifact_format}")
+        self.raw_data_path = self.raw_data_path or os.path.join('artifacts',f"data.{self.artifact_format}")
+
+class PartitionWriter:
+    """
+    Appends DataFrame chunks to one CSV, Parquet or Feather file.
+
+    The Arrow schema is built from the declared column dtypes rather than from the
+    first chunk, so a chunk in which a text column happens to be all missing (and
+    reads as float64) is still stored with the column's declared type.
+    """
+
+    def __init__(self, file_path, dtypes):
+        self.file_path = file_path
+        self.dtypes = dtypes
+        self.extension = os.path.splitext(file_path)[1].lower()
+        self.rows_written = 0
+        self._writer = None
+        self._schema = None
+
+    def _arrow_schema(self):
+        import pyarrow as pa
+        empty = pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in self.dtypes.items()})
+        return pa.Schema.from_pandas(empty, preserve_index=False)
+
+    def write(self, chunk):
+        if self.extension in (".parquet", ".feather"):
+            import pyarrow as pa
+            if self._writer is None:
+                self._schema = self._arrow_schema()
+                if self.extension == ".parquet":
+                    import pyarrow.parquet as pq
+                    self._writer = pq.ParquetWriter(self.file_path, self._schema)
+                else:
+                    self._writer = pa.ipc.new_file(self.file_path, self._schema)
+            table = pa.Table.from_pandas(chunk, schema=self._schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            chunk.to_csv(self.file_path, mode="w" if self.rows_written == 0 else "a",
+                         header=self.rows_written == 0, index=False)
+        self.rows_written += len(chunk)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
 
 class DataIngestion:
     def __init__(self):
         self.ingestion_config=DataIngestionConfig()
 
+    def compact_dtypes(self, df):
+        """
+        Stores text columns as categories and downcasts numeric columns wherever no value changes.
+        """
+        for column in df.columns:
+            series = df[column]
+            if series.dtype == object:
+                df[column] = series.astype("category")
+            elif pd.api.types.is_integer_dtype(series):
+                df[column] = pd.to_numeric(series, downcast="integer")
+            elif pd.api.types.is_float_dtype(series):
+                downcast = series.astype(np.float32)
+                if np.array_equal(downcast.to_numpy(np.float64), series.to_numpy(np.float64), equal_nan=True):
+                    df[column] = downcast
+        return df
+
+    def hash_buckets(self, keys):
+        """
+        Returns a stable hash of the key values in [0, HASH_BUCKETS).
+
+        The same key always lands in the same bucket, whichever run or chunk it is read in.
+        """
+        hashes = pd.util.hash_pandas_object(keys.astype(str), index=False).to_numpy()
+        return (hashes % HASH_BUCKETS).astype(np.int64)
+
+    def hash_split(self, keys):
+        """
+        Returns a boolean test-set mask that sends the keys in the lowest test_size of the buckets to the test set.
+        """
+        return self.hash_buckets(keys) < int(round(self.ingestion_config.test_size * HASH_BUCKETS))
+
+    def class_thresholds(self, bucket_counts):
+        """
+        Returns, per class, the bucket below which test_size of that class's rows fall.
+
+        bucket_counts maps each class to the number of its rows in every hash bucket.
+        """
+        thresholds = {}
+        for label, counts in bucket_counts.items():
+            cumulative = np.cumsum(counts)
+            target = int(round(self.ingestion_config.test_size * cumulative[-1]))
+            # The smallest threshold that puts at least target rows of the class in the test set
+            thresholds[label] = int(np.searchsorted(cumulative, target)) + 1 if target > 0 else 0
+        return thresholds
+
+    def split_settings(self):
+        config = self.ingestion_config
+        return {
+            "test_size": config.test_size,
+            "split_key_column": config.split_key_column,
+            "stratify_column": config.stratify_column,
+            "hash_buckets": HASH_BUCKETS,
+        }
+
+    def stable_thresholds(self, thresholds):
+        """
+        Returns the per-class thresholds to split with, keeping those saved by an earlier run.
+
+        Recomputing the thresholds after rows are appended would shift them and move
+        existing rows between train and test. Saved thresholds are therefore reused as
+        long as the split settings are unchanged; only classes seen for the first time
+        get the newly computed threshold. The result is saved for the next run.
+        """
+        path = self.ingestion_config.split_thresholds_path
+        if not path:
+            return thresholds
+        saved = {}
+        if os.path.exists(path):
+            with open(path) as file_obj:
+                stored = json.load(file_obj)
+            if stored.get("settings") == self.split_settings():
+                saved = stored["thresholds"]
+            else:
+                logging.info(f"Split settings changed since {path} was written, recomputing the thresholds")
+        thresholds = {**thresholds, **saved}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as file_obj:
+            json.dump({"settings": self.split_settings(), "thresholds": thresholds}, file_obj, indent=2)
+        return thresholds
+
+    def stratified_split(self, keys, labels, thresholds):
+        """
+        Returns a test-set mask that sends test_size of each class to the test set.
+
+        Each class has its own hash threshold (see class_thresholds), so a row's
+        partition depends only on its key and class, not on where it sits in the
+        source. The thresholds are kept across runs (see stable_thresholds): classes
+        are split in test_size proportions to within one hash bucket on the data the
+        thresholds were first computed from, and about as closely after appends.
+        """
+        buckets = self.hash_buckets(keys)
+        labels = labels.astype(str).to_numpy()
+        default = int(round(self.ingestion_config.test_size * HASH_BUCKETS))
+        limits = np.array([thresholds.get(label, default) for label in labels], dtype=np.int64)
+        return buckets < limits
+
+    def scan_source(self):
+        """
+        Reads the source once in chunks and declares the dtype of every column.
+
+        The dtypes are the ones compact_dtypes gives the whole dataset: text columns
+        become categories holding every value seen, integer columns without missing
+        values take the smallest integer type of their range, and float columns are
+        float32 wherever that changes no value. With a stratify_column the per-class
+        hash thresholds are computed in the same pass.
+        """
+        config = self.ingestion_config
+        columns = {}
+        bucket_counts = {}
+        # Keys are read as text so their hash does not depend on dtype inference per chunk
+        reader = pd.read_csv(config.source_data_path, chunksize=config.chunk_size,
+                             dtype={config.split_key_column: str})
+        for chunk in reader:
+            if config.stratify_column:
+                buckets = self.hash_buckets(chunk[config.split_key_column])
+                labels = chunk[config.stratify_column].astype(str).to_numpy()
+                for label in np.unique(labels):
+                    counts = bucket_counts.setdefault(label, np.zeros(HASH_BUCKETS, dtype=np.int64))
+                    counts += np.bincount(buckets[labels == label], minlength=HASH_BUCKETS)
+
+            for column in chunk.columns:
+                series = chunk[column]
+                if column == config.split_key_column:
+                    try:
+                        series = pd.to_numeric(series)
+                    except (ValueError, TypeError):
+                        pass
+                stats = columns.setdefault(column, {
+                    "text": False, "numeric": False, "missing": False, "integer": True,
+                    "float32": True, "categories": set(), "min": None, "max": None,
+                })
+                values = series.dropna()
+                stats["missing"] = stats["missing"] or len(values) < len(series)
+                if len(values) == 0:
+                    # An all-missing chunk says nothing about the column's type
+                    continue
+                if series.dtype == object:
+                    stats["text"] = True
+                    stats["categories"].update(values.astype(str).unique())
+                    continue
+                stats["numeric"] = True
+                numbers = values.to_numpy(np.float64)
+                if pd.api.types.is_integer_dtype(series):
+                    low, high = values.min(), values.max()
+                    stats["min"] = low if stats["min"] is None else min(stats["min"], low)
+                    stats["max"] = high if stats["max"] is None else max(stats["max"], high)
+                else:
+                    stats["integer"] = False
+                stats["float32"] = stats["float32"] and np.array_equal(numbers.astype(np.float32), numbers)
+
+        dtypes = {}
+        for column, stats in columns.items():
+            if stats["text"]:
+                # A column with both text and numbers in it is kept as plain text
+                dtypes[column] = object if stats["numeric"] else pd.CategoricalDtype(sorted(stats["categories"]))
+            elif stats["numeric"] and stats["integer"] and not stats["missing"]:
+                dtypes[column] = pd.to_numeric(pd.Series([stats["min"], stats["max"]]), downcast="integer").dtype
+            else:
+                dtypes[column] = np.dtype(np.float32 if stats["float32"] else np.float64)
+        return dtypes, self.class_thresholds(bucket_counts)
+
+    def cast_chunk(self, chunk, dtypes):
+        """
+        Gives a chunk the declared dtypes.
+        """
+        for column, dtype in dtypes.items():
+            if dtype == object:
+                chunk[column] = chunk[column].where(chunk[column].isna(), chunk[column].astype(str))
+            else:
+                chunk[column] = chunk[column].astype(dtype)
+        return chunk
+
+    def initiate_streaming_ingestion(self):
+        """
+        Splits the source chunk by chunk and appends each chunk's rows to the partition files,
+        so peak memory depends on chunk_size rather than on the dataset size. The source is
+        read twice: once to declare the column dtypes (see scan_source), once to write it.
+        """
+        logging.info("Entered the streaming data ingestion method")
+        config = self.ingestion_config
+        writers = []
+        try:
+            dtypes, thresholds = self.scan_source()
+            if config.stratify_column:
+                thresholds = self.stable_thresholds(thresholds)
+                logging.info(f"Per-class split thresholds: {thresholds}")
+            logging.info(f"Declared dtypes of {len(dtypes)} columns from a first pass over the source")
+            writers = [
+                PartitionWriter(config.raw_data_path, dtypes),
+                PartitionWriter(config.train_data_path, dtypes),
+                PartitionWriter(config.test_data_path, dtypes),
+            ]
+            os.makedirs(os.path.dirname(config.train_data_path),exist_ok=True)
+            raw_writer, train_writer, test_writer = writers
+
+            # Text columns are read verbatim and cast to their declared categories afterwards
+            text_columns = [
+                column for column, dtype in dtypes.items() if dtype == object or isinstance(dtype, pd.CategoricalDtype)
+            ]
+            reader = pd.read_csv(config.source_data_path, chunksize=config.chunk_size,
+                                 dtype={column: str for column in text_columns + [config.split_key_column]})
+            for chunk_number, chunk in enumerate(reader):
+                if config.stratify_column:
+                    is_test = self.stratified_split(
+                        chunk[config.split_key_column], chunk[config.stratify_column], thresholds
+                    )
+                else:
+                    is_test = self.hash_split(chunk[config.split_key_column])
+
+                chunk = self.cast_chunk(chunk, dtypes)
+                raw_writer.write(chunk)
+                train_writer.write(chunk[~is_test])
+                test_writer.write(chunk[is_test])
+                logging.info(f"Ingested chunk {chunk_number}: {raw_writer.rows_written} rows so far")
+
+            logging.info(
+                f"Streaming ingestion completed: {train_writer.rows_written} train rows, "
+                f"{test_writer.rows_written} test rows"
+            )
+            return(
+                config.train_data_path,
+                config.test_data_path
+
+            )
+        except Exception as e:
+            raise CustomException(e,sys)
+        finally:
+            for writer in writers:
+                writer.close()
+
     def initiate_data_ingestion(self):
+        if self.ingestion_config.streaming:
+            return self.initiate_streaming_ingestion()
+
         logging.info("Entered the data ingestion method or component")
         try:
             #df=pd.read_csv('notebook\data\Loan_Deafault.csv')
-            df = pd.read_csv('notebook/data/Loan_Default.csv')
+            df = pd.read_csv(self.ingestion_config.source_data_path)
 
             logging.info('Read the dataset as dataframe')
 
+            # Categorical columns become dictionary-encoded categories in the columnar artifacts
+            df = self.compact_dtypes(df)
+            logging.info(f"Dataset uses {df.memory_usage(deep=True).sum() / 1e6:.1f} MB after dtype compaction")
+
             os.makedirs(os.path.dirname(self.ingestion_config.train_data_path),exist_ok=True)
 
-            df.to_csv(self.ingestion_config.raw_data_path,index=False,header=True)
+            write_table(df,self.ingestion_config.raw_data_path)
 
             logging.info("Train test split initiated")
-            train_set,test_set=train_test_split(df,test_size=0.2,random_state=42)
+            train_set,test_set=train_test_split(df,test_size=self.ingestion_config.test_size,random_state=42)
 
-            train_set.to_csv(self.ingestion_config.train_data_path,index=False,header=True)
+            write_table(train_set,self.ingestion_config.train_data_path)
 
-            test_set.to_csv(self.ingestion_config.test_data_path,index=False,header=True)
+            write_table(test_set,self.ingestion_config.test_data_path)
 
             logging.info("Ingestion of the data is completed")
 
@@ -59,11 +366,7 @@ class DataIngestion:
             raise CustomException(e,sys)
         
 if __name__=="__main__":
-    obj=DataIngestion()
-    train_data,test_data=obj.initiate_data_ingestion()
-
-    data_transformation=DataTransformation()
-    train_arr,test_arr,_=data_transformation.initiate_data_transformation(train_data,test_data)
+    from src.pipeline.train_pipeline import TrainPipeline
 
-    modeltrainer=ModelTrainer()
-    print(modeltrainer.initiate_model_trainer(train_arr,test_arr))
\ No newline at end of file
+    train_pipeline=TrainPipeline()
+    print(train_pipeline.run())
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+import json
 import numpy as np
 import pandas as pd
 import sys
@@ -8,44 +9,147 @@ from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from src.exception import CustomException
 from src.logger import logging
-from src.utils import save_object
+from src.utils import save_object, read_table, save_matrix, load_matrix
+from src.components.indexed_imputer import IndexedKNNImputer, imputation_report
+from src.components.parallel_imputation import ParallelKNNImputer, disable_process_pools
 import os
 
+TARGET_COLUMN = "status"
+NUMERICAL_COLUMNS = ['loan_amount', 'rate_of_interest', 'interest_rate_spread',
+                     'upfront_charges', 'term', 'property_value', 'income',
+                     'credit_score', 'ltv', 'dtir1']
+CATEGORICAL_COLUMNS = ['loan_limit', 'gender', 'approv_in_adv', 'loan_type',
+                       'loan_purpose', 'credit_worthiness', 'open_credit',
+                       'business_or_commercial', 'neg_ammortization', 'interest_only',
+                       'lump_sum_payment','construction_type', 'occupancy_type',
+                       'secured_by', 'total_units', 'credit_type',
+                       'co_applicant_credit_type', 'age', 'submission_of_application',
+                       'region', 'security_type']
+
 @dataclass
 class DataTransformationConfig:
     preprocessor_obj_file_path=os.path.join('artifacts',"preprocessor.pkl")
+    imputation_report_file_path=os.path.join('artifacts',"imputation_report.json")
+    # 'knn' (brute-force KNNImputer), 'indexed_exact' or 'indexed_approximate'
+    imputer_mode: str="knn"
+    imputer_max_index_rows: int=20000
+    # Process pool used by the 'knn' imputer while transforming the training and test data (-1 uses all cores);
+    # the saved preprocessor always has n_jobs=1
+    imputer_n_jobs: int=-1
+    imputer_chunk_size: int=2000
+    # Number of imputed test rows compared against the brute-force KNNImputer (0 disables the report)
+    imputation_report_rows: int=2000
+    # Output stays sparse CSR when its density is below this threshold (ColumnTransformer's sparse_threshold)
+    sparse_threshold: float=0.3
+    # 'float64' or 'float32' for the transformed feature matrices
+    feature_dtype: str="float64"
+    # Transformed matrices are cached here as .npy or, when sparse, .csr directories (both memory-mappable); empty disables the cache
+    features_dir: str=os.path.join('artifacts',"features")
 
 class DataTransformation:
     def __init__(self):
         self.data_transformation_config = DataTransformationConfig()
 
+    @staticmethod
+    def rename_column(column):
+        return column.replace(" ", "_").replace("-", "_").lower()
+
     def col_rename(self, df):
         """
         Renames columns by replacing spaces and hyphens with underscores and converting to lowercase.
         """
         for column in df.columns:
-            df.rename(columns={column: column.replace(" ", "_").replace("-", "_").lower()}, inplace=True)
+            df.rename(columns={column: self.rename_column(column)}, inplace=True)
         return df    
 
+    def get_numeric_imputer(self):
+        """
+        Returns the numeric imputer selected by imputer_mode.
+        """
+        mode = self.data_transformation_config.imputer_mode
+        if mode == "knn":
+            return ParallelKNNImputer(
+                n_neighbors=5,
+                chunk_size=self.data_transformation_config.imputer_chunk_size,
+                n_jobs=self.data_transformation_config.imputer_n_jobs,
+            )
+        if mode in ("indexed_exact", "indexed_approximate"):
+            return IndexedKNNImputer(
+                n_neighbors=5,
+                mode=mode.split("_", 1)[1],
+                max_index_rows=self.data_transformation_config.imputer_max_index_rows,
+            )
+        raise ValueError(f"Unknown imputer_mode: {mode}")
+
+    def save_imputation_report(self, preprocessing_obj, train_df, test_df, numerical_columns):
+        """
+        Writes how the indexed imputer's values differ from brute-force KNNImputer on test rows.
+        """
+        imputer = preprocessing_obj.named_transformers_["num_pipeline"].named_steps["imputer"]
+        n_rows = self.data_transformation_config.imputation_report_rows
+        if not isinstance(imputer, IndexedKNNImputer) or n_rows <= 0:
+            return
+
+        sample = test_df[numerical_columns]
+        sample = sample[sample.isna().any(axis=1)].head(n_rows)
+        if sample.empty:
+            return
+
+        reference = KNNImputer(n_neighbors=imputer.n_neighbors).fit(train_df[numerical_columns])
+        report = imputation_report(imputer, reference, sample)
+        logging.info(f"Imputation report: {report}")
+
+        report_path = self.data_transformation_config.imputation_report_file_path
+        os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+        with open(report_path, "w") as file_obj:
+            json.dump(report, file_obj, indent=2)
+
+    def cast_features(self, features):
+        dtype = np.dtype(self.data_transformation_config.feature_dtype)
+        if features.dtype == dtype:
+            return features
+        return features.astype(dtype)
+
+    def save_transformed_data(self, X_train, y_train, X_test, y_test):
+        """
+        Caches the transformed matrices under features_dir and returns the written paths.
+        """
+        features_dir = self.data_transformation_config.features_dir
+        paths = {
+            name: save_matrix(os.path.join(features_dir, name), matrix)
+            for name, matrix in [("X_train", X_train), ("y_train", y_train),
+                                 ("X_test", X_test), ("y_test", y_test)]
+        }
+        logging.info(f"Transformed data cached: {paths}")
+        return paths
+
+    def load_transformed_data(self, mmap_mode="r"):
+        """
+        Loads the cached matrices as (X_train, y_train, X_test, y_test), memory-mapped.
+        """
+        try:
+            features_dir = self.data_transformation_config.features_dir
+            loaded = []
+            for name in ["X_train", "y_train", "X_test", "y_test"]:
+                candidates = [os.path.join(features_dir, f"{name}.{extension}") for extension in ("csr", "npz", "npy")]
+                path = next((path for path in candidates if os.path.exists(path)), candidates[-1])
+                loaded.append(load_matrix(path, mmap_mode=mmap_mode))
+            return tuple(loaded)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
     def get_data_transformer_object(self):
         '''
         This function is responsible for data transformation
         '''
         try:
-            numerical_columns = ['loan_amount', 'rate_of_interest', 'interest_rate_spread',
-                                 'upfront_charges', 'term', 'property_value', 'income',
-                                 'credit_score', 'ltv', 'dtir1']
-            categorical_columns = ['loan_limit', 'gender', 'approv_in_adv', 'loan_type',
-                                   'loan_purpose', 'credit_worthiness', 'open_credit',
-                                    'business_or_commercial', 'neg_ammortization', 'interest_only',
-                                    'lump_sum_payment','construction_type', 'occupancy_type',
-                                    'secured_by', 'total_units', 'credit_type',
-                                    'co_applicant_credit_type', 'age', 'submission_of_application',
-                                    'region', 'security_type']
+            numerical_columns = NUMERICAL_COLUMNS
+            categorical_columns = CATEGORICAL_COLUMNS
 
             num_pipeline = Pipeline(
                 steps=[
-                ("imputer", KNNImputer(n_neighbors=5)),
+                ("imputer", self.get_numeric_imputer()),
                 ("scaler", StandardScaler())
                 ]
             )
@@ -65,7 +169,8 @@ class DataTransformation:
                 [
                 ("num_pipeline", num_pipeline, numerical_columns),
                 ("cat_pipeline", cat_pipeline, categorical_columns)
-                ]
+                ],
+                sparse_threshold=self.data_transformation_config.sparse_threshold
             )
 
             return preprocessor
@@ -75,14 +180,11 @@ class DataTransformation:
         
     def initiate_data_transformation(self, train_path, test_path):
         try:
-            # Read data
-            train_df = pd.read_csv(train_path)
-            test_df = pd.read_csv(test_path)
-
-            # Drop unnecessary columns
-            columns_to_drop = ['ID', 'year']  
-            train_df = train_df.drop(columns=columns_to_drop, axis=1)
-            test_df = test_df.drop(columns=columns_to_drop, axis=1)
+            # Read only the feature and target columns; unnecessary ones such as ID and year are skipped
+            needed_columns = set(NUMERICAL_COLUMNS + CATEGORICAL_COLUMNS + [TARGET_COLUMN])
+            is_needed = lambda column: self.rename_column(column) in needed_columns
+            train_df = read_table(train_path, columns=is_needed)
+            test_df = read_table(test_path, columns=is_needed)
 
             # Apply column renaming
             train_df = self.col_rename(train_df)
@@ -96,10 +198,8 @@ class DataTransformation:
             preprocessing_obj = self.get_data_transformer_object()
 
             # Define target column name and numerical columns
-            target_column_name = "status"
-            numerical_columns = ['loan_amount', 'rate_of_interest', 'interest_rate_spread',
-                                'upfront_charges', 'term', 'property_value', 'income',
-                                'credit_score', 'ltv', 'dtir1']
+            target_column_name = TARGET_COLUMN
+            numerical_columns = NUMERICAL_COLUMNS
 
             # Check if target column and numerical columns are present in the DataFrame
             if target_column_name not in train_df.columns:
@@ -120,9 +220,16 @@ class DataTransformation:
             input_feature_train_arr = preprocessing_obj.fit_transform(input_feature_train_df)
             input_feature_test_arr = preprocessing_obj.transform(input_feature_test_df)
 
-            # Combine features and target into final arrays
-            train_arr = np.c_[input_feature_train_arr, np.array(target_feature_train_df)]
-            test_arr = np.c_[input_feature_test_arr, np.array(target_feature_test_df)]
+            self.save_imputation_report(preprocessing_obj, input_feature_train_df, input_feature_test_df, numerical_columns)
+
+            # Features keep the preprocessor's output layout (sparse CSR or dense); labels stay separate
+            X_train = self.cast_features(input_feature_train_arr)
+            X_test = self.cast_features(input_feature_test_arr)
+            y_train = target_feature_train_df.to_numpy()
+            y_test = target_feature_test_df.to_numpy()
+
+            # The imputer's process pool is only for the training data; the saved preprocessor imputes in process
+            disable_process_pools(preprocessing_obj)
 
             # Save preprocessing object
             logging.info("Saving preprocessing object.")
@@ -131,9 +238,14 @@ class DataTransformation:
                 obj=preprocessing_obj
             )
 
+            if self.data_transformation_config.features_dir:
+                self.save_transformed_data(X_train, y_train, X_test, y_test)
+
             return (
-                train_arr,
-                test_arr,
+                X_train,
+                y_train,
+                X_test,
+                y_test,
                 self.data_transformation_config.preprocessor_obj_file_path,
             )
         except Exception as e:
@@ -0,0 +1,198 @@
+import hashlib
+import math
+import os
+import sys
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import f1_score, roc_auc_score
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+
+from src.exception import CustomException
+from src.logger import logging
+
+SCORERS = ("roc_auc", "f1")
+
+
+def _is_early_stopping_model(estimator):
+    return type(estimator).__name__ in ("XGBClassifier", "LGBMClassifier")
+
+
+def _fit_with_early_stopping(model, X, y, rounds, validation_fraction):
+    # The last rows of the (already shuffled) training fold decide when boosting stops
+    n_stop = max(1, int(len(y) * validation_fraction))
+    X_fit, y_fit = X[:-n_stop], y[:-n_stop]
+    eval_set = [(X[-n_stop:], y[-n_stop:])]
+
+    if type(model).__name__ == "LGBMClassifier":
+        import lightgbm
+        model.fit(X_fit, y_fit, eval_set=eval_set,
+                  callbacks=[lightgbm.early_stopping(rounds, verbose=False)])
+    else:
+        model.set_params(early_stopping_rounds=rounds)
+        model.fit(X_fit, y_fit, eval_set=eval_set, verbose=False)
+    return model
+
+
+def _fit_and_score(estimator, params, fold, X_train, y_train, X_val, y_val,
+                   early_stopping_rounds, validation_fraction):
+    model = clone(estimator).set_params(**params)
+    start = time.perf_counter()
+    if early_stopping_rounds and _is_early_stopping_model(model):
+        _fit_with_early_stopping(model, X_train, y_train, early_stopping_rounds, validation_fraction)
+    else:
+        model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    probabilities = model.predict_proba(X_val)
+    predictions = model.classes_[probabilities.argmax(axis=1)]
+    return {
+        "fold": fold,
+        "roc_auc": roc_auc_score(y_val, probabilities[:, 1]),
+        "f1": f1_score(y_val, predictions, average="weighted"),
+        "fit_seconds": fit_seconds,
+    }
+
+
+class SuccessiveHalvingSearch:
+    """
+    Successive-halving search over a parameter grid with cross-validation.
+
+    All candidates start with a small budget: a subset of the training rows
+    (resource='n_samples') or of the boosting rounds (resource='n_estimators').
+    After each rung only the best 1/factor of the candidates, ranked by the mean
+    CV score, move on to a budget factor times larger. Fold indices are computed
+    once, optionally cached on disk, and reused by every rung. Each fold's
+    matrices are sliced once and shared by all trials. Trials of a rung run in
+    parallel with joblib, and XGBoost/LGBM trials can stop early on a slice of
+    their training fold. With refit=False, best_estimator_ is left unfitted.
+    """
+
+    def __init__(self, estimator, param_grid, resource="n_samples", factor=3, min_resources=None,
+                 cv=3, scoring="roc_auc", n_jobs=None, early_stopping_rounds=None,
+                 validation_fraction=0.1, fold_cache_dir=None, refit=True, random_state=42):
+        if scoring not in SCORERS:
+            raise ValueError(f"scoring must be one of {SCORERS}, got {scoring!r}")
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.resource = resource
+        self.factor = factor
+        self.min_resources = min_resources
+        self.cv = cv
+        self.scoring = scoring
+        self.n_jobs = n_jobs
+        self.early_stopping_rounds = early_stopping_rounds
+        self.validation_fraction = validation_fraction
+        self.fold_cache_dir = fold_cache_dir
+        self.refit = refit
+        self.random_state = random_state
+
+    def _fold_indices(self, y):
+        cache_path = None
+        if self.fold_cache_dir:
+            digest = hashlib.sha256(np.ascontiguousarray(y).tobytes()).hexdigest()[:16]
+            cache_path = os.path.join(self.fold_cache_dir, f"folds_{self.cv}_{self.random_state}_{digest}.npz")
+            if os.path.exists(cache_path):
+                cached = np.load(cache_path)
+                return [(cached[f"train_{i}"], cached[f"val_{i}"]) for i in range(self.cv)]
+
+        splitter = StratifiedKFold(n_splits=self.cv, shuffle=True, random_state=self.random_state)
+        rng = np.random.default_rng(self.random_state)
+        # Training indices are shuffled so that any prefix is a random subsample of the fold
+        folds = [(rng.permutation(train_index), val_index)
+                 for train_index, val_index in splitter.split(np.zeros(len(y)), y)]
+
+        if cache_path:
+            os.makedirs(self.fold_cache_dir, exist_ok=True)
+            arrays = {}
+            for i, (train_index, val_index) in enumerate(folds):
+                arrays[f"train_{i}"] = train_index
+                arrays[f"val_{i}"] = val_index
+            np.savez(cache_path, **arrays)
+        return folds
+
+    def _schedule(self, n_candidates, max_resources):
+        n_rungs = max(1, math.ceil(math.log(n_candidates, self.factor)) + 1) if n_candidates > 1 else 1
+        # Row subsets below a few hundred rows give too noisy a ranking to be worth fitting
+        floor = 300 if self.resource == "n_samples" else 1
+        min_resources = self.min_resources or max(floor, max_resources // self.factor ** (n_rungs - 1))
+        return [min(max_resources, min_resources * self.factor ** rung) for rung in range(n_rungs)]
+
+    def _max_resources(self, n_train_rows):
+        if self.resource == "n_samples":
+            return n_train_rows
+        if self.resource == "n_estimators":
+            return self.estimator.get_params()["n_estimators"]
+        raise ValueError(f"resource must be 'n_samples' or 'n_estimators', got {self.resource!r}")
+
+    def fit(self, X, y):
+        try:
+            start = time.perf_counter()
+            y = np.asarray(y)
+            folds = self._fold_indices(y)
+
+            # Fold matrices are built once and shared by every trial
+            fold_data = [(X[train_index], y[train_index], X[val_index], y[val_index])
+                         for train_index, val_index in folds]
+
+            candidates = list(ParameterGrid(self.param_grid))
+            max_resources = self._max_resources(min(len(data[1]) for data in fold_data))
+            schedule = self._schedule(len(candidates), max_resources)
+            base_estimator = self.estimator
+            if self.n_jobs not in (None, 1) and "n_jobs" in base_estimator.get_params():
+                # Parallelism comes from running trials side by side
+                base_estimator = clone(base_estimator).set_params(n_jobs=1)
+
+            self.results_ = []
+            remaining = list(range(len(candidates)))
+            for rung, budget in enumerate(schedule):
+                trials = []
+                for candidate in remaining:
+                    params = dict(candidates[candidate])
+                    if self.resource == "n_estimators":
+                        params["n_estimators"] = budget
+                    for fold, (X_fold, y_fold, X_val, y_val) in enumerate(fold_data):
+                        if self.resource == "n_samples":
+                            X_fold, y_fold = X_fold[:budget], y_fold[:budget]
+                        trials.append((candidate, delayed(_fit_and_score)(
+                            base_estimator, params, fold, X_fold, y_fold, X_val, y_val,
+                            self.early_stopping_rounds, self.validation_fraction)))
+
+                scores = Parallel(n_jobs=self.n_jobs)(trial for _, trial in trials)
+
+                by_candidate = {}
+                for (candidate, _), score in zip(trials, scores):
+                    by_candidate.setdefault(candidate, []).append(score)
+                for candidate, fold_scores in by_candidate.items():
+                    self.results_.append({
+                        "rung": rung,
+                        "resource": budget,
+                        "params": candidates[candidate],
+                        "roc_auc": float(np.mean([score["roc_auc"] for score in fold_scores])),
+                        "f1": float(np.mean([score["f1"] for score in fold_scores])),
+                        "fit_seconds": float(sum(score["fit_seconds"] for score in fold_scores)),
+                    })
+
+                ranked = sorted(by_candidate, key=lambda c: -np.mean([s[self.scoring] for s in by_candidate[c]]))
+                logging.info(
+                    f"Successive halving rung {rung}: {len(remaining)} candidates on {budget} {self.resource}, "
+                    f"best {self.scoring}={np.mean([s[self.scoring] for s in by_candidate[ranked[0]]]):.4f}"
+                )
+                remaining = ranked[:max(1, math.ceil(len(ranked) / self.factor))]
+
+            best = remaining[0]
+            last_rung = [result for result in self.results_ if result["rung"] == len(schedule) - 1]
+            self.best_params_ = candidates[best]
+            self.best_score_ = next(r[self.scoring] for r in last_rung if r["params"] == self.best_params_)
+
+            # Refit the winner once on all rows with the full budget
+            self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_)
+            if self.refit:
+                self.best_estimator_.fit(X, y)
+            self.search_seconds_ = time.perf_counter() - start
+            return self
+
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -0,0 +1,174 @@
+import time
+
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.neighbors import KDTree
+
+
+class IndexedKNNImputer(TransformerMixin, BaseEstimator):
+    """
+    KNN imputer that searches a prebuilt KD-tree instead of scanning the training matrix.
+
+    Donors are the training rows with no missing values. For each missing-value
+    pattern, a KD-tree is built over the donors projected onto the features that
+    are present, and queries go to that tree. Nearest neighbours under
+    nan_euclidean distance are then exactly the nearest neighbours in that
+    subspace. Trees are built for the max_cached_patterns most frequent patterns
+    seen at fit. Only the donor matrix and those patterns are pickled; the trees
+    are rebuilt when the imputer is loaded, so the pickle holds a single copy of
+    the donors. transform never builds a tree: other patterns are scanned by
+    brute force over the donors, scan_chunk_rows rows at a time.
+
+    mode='exact' indexes every complete row. mode='approximate' indexes a random
+    sample of at most max_index_rows complete rows, which keeps the pickled
+    preprocessor small. Unlike KNNImputer, rows with missing values are never
+    used as donors, so results can differ slightly from the brute-force imputer
+    (see imputation_report).
+    """
+
+    def __init__(self, n_neighbors=5, mode="exact", max_index_rows=20000, leaf_size=40,
+                 max_cached_patterns=32, scan_chunk_rows=64, random_state=42):
+        self.n_neighbors = n_neighbors
+        self.mode = mode
+        self.max_index_rows = max_index_rows
+        self.leaf_size = leaf_size
+        self.max_cached_patterns = max_cached_patterns
+        self.scan_chunk_rows = scan_chunk_rows
+        self.random_state = random_state
+
+    def fit(self, X, y=None):
+        if self.mode not in ("exact", "approximate"):
+            raise ValueError(f"mode must be 'exact' or 'approximate', got {self.mode!r}")
+
+        if hasattr(X, "columns"):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        X = np.asarray(X, dtype=np.float64)
+        self.n_features_in_ = X.shape[1]
+
+        missing = np.isnan(X)
+        donors = X[~missing.any(axis=1)]
+        if len(donors) == 0:
+            raise ValueError("IndexedKNNImputer needs at least one training row without missing values")
+        if self.mode == "approximate" and len(donors) > self.max_index_rows:
+            rng = np.random.default_rng(self.random_state)
+            donors = donors[np.sort(rng.choice(len(donors), self.max_index_rows, replace=False))]
+
+        self.donors_ = np.ascontiguousarray(donors)
+        with np.errstate(invalid="ignore"):
+            self.column_means_ = np.nanmean(X, axis=0)
+
+        # One tree per missing-value pattern seen in training, most frequent first
+        patterns, counts = np.unique(missing[missing.any(axis=1)], axis=0, return_counts=True)
+        self.tree_patterns_ = ~patterns[np.argsort(-counts, kind="stable")][: self.max_cached_patterns]
+        self._build_trees()
+        return self
+
+    def _build_trees(self):
+        self.trees_ = {
+            present.tobytes(): KDTree(self.donors_[:, present], leaf_size=self.leaf_size)
+            for present in self.tree_patterns_
+            if present.any()
+        }
+
+    def __getstate__(self):
+        # The trees hold their own projected copies of the donors; they are rebuilt on load
+        state = dict(super().__getstate__())
+        state.pop("trees_", None)
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        if "tree_patterns_" in state:
+            self._build_trees()
+
+    def _neighbors(self, rows, present):
+        k = min(self.n_neighbors, len(self.donors_))
+        queries = rows[:, present]
+        tree = self.trees_.get(present.tobytes())
+        if tree is not None:
+            return tree.query(queries, k=k, return_distance=False)
+
+        # Pattern without a tree: exact scan over the donors, a chunk of rows at a time
+        # so the distance matrix stays at scan_chunk_rows x donors
+        projected = self.donors_[:, present]
+        neighbors = np.empty((len(queries), k), dtype=np.intp)
+        for start in range(0, len(queries), self.scan_chunk_rows):
+            chunk = queries[start:start + self.scan_chunk_rows]
+            distances = np.zeros((len(chunk), len(projected)))
+            for j in range(projected.shape[1]):
+                distances += (chunk[:, j, None] - projected[None, :, j]) ** 2
+            nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+            order = np.take_along_axis(distances, nearest, axis=1).argsort(axis=1, kind="stable")
+            neighbors[start:start + len(chunk)] = np.take_along_axis(nearest, order, axis=1)
+        return neighbors
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but IndexedKNNImputer expects {self.n_features_in_}")
+
+        missing = np.isnan(X)
+        rows_to_impute = np.flatnonzero(missing.any(axis=1))
+        if len(rows_to_impute) == 0:
+            return X
+
+        patterns, inverse = np.unique(missing[rows_to_impute], axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        for pattern_index, pattern in enumerate(patterns):
+            rows = rows_to_impute[inverse == pattern_index]
+            present = ~pattern
+            if not present.any():
+                X[np.ix_(rows, pattern)] = self.column_means_[pattern]
+                continue
+            neighbors = self._neighbors(X[rows], present)
+            X[np.ix_(rows, pattern)] = self.donors_[:, pattern][neighbors].mean(axis=1)
+        return X
+
+    def get_feature_names_out(self, input_features=None):
+        if input_features is not None:
+            return np.asarray(input_features, dtype=object)
+        if hasattr(self, "feature_names_in_"):
+            return self.feature_names_in_
+        return np.asarray([f"x{i}" for i in range(self.n_features_in_)], dtype=object)
+
+
+def imputation_report(imputer, reference, X):
+    """
+    Compares the values imputed by imputer with those of a fitted brute-force KNNImputer.
+
+    Returns a dict with timings and, per column, how many values were imputed,
+    how many matched exactly and the mean/max absolute difference.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    missing = np.isnan(X)
+    names = list(getattr(imputer, "feature_names_in_", [f"x{i}" for i in range(X.shape[1])]))
+
+    start = time.perf_counter()
+    indexed = imputer.transform(X)
+    indexed_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    brute_force = reference.transform(X)
+    brute_force_seconds = time.perf_counter() - start
+
+    columns = {}
+    for j, name in enumerate(names):
+        if not missing[:, j].any():
+            continue
+        difference = np.abs(indexed[missing[:, j], j] - brute_force[missing[:, j], j])
+        columns[name] = {
+            "n_imputed": int(missing[:, j].sum()),
+            "n_identical": int((difference == 0).sum()),
+            "mean_abs_diff": float(difference.mean()),
+            "max_abs_diff": float(difference.max()),
+        }
+
+    return {
+        "mode": imputer.mode,
+        "n_rows": int(X.shape[0]),
+        "n_rows_imputed": int(missing.any(axis=1).sum()),
+        "n_index_rows": int(len(imputer.donors_)),
+        "indexed_seconds": indexed_seconds,
+        "brute_force_seconds": brute_force_seconds,
+        "columns": columns,
+    }
@@ -1,17 +1,26 @@
 import os
 import sys
+import shutil
+import tempfile
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pandas as pd
+from threadpoolctl import threadpool_limits
 from sklearn.ensemble import (
     RandomForestClassifier,
     GradientBoostingClassifier,
     AdaBoostClassifier
 )
+from sklearn.base import clone
 from sklearn.tree import DecisionTreeClassifier
 from xgboost import XGBClassifier
 from lightgbm import LGBMClassifier
 from sklearn.metrics import classification_report, accuracy_score, precision_score, recall_score, f1_score
 from src.exception import CustomException
-from src.utils import save_object
+from src.logger import logging
+from src.components.hyperparameter_search import SuccessiveHalvingSearch
+from src.utils import available_cores, save_object, save_matrix, load_matrix
 
 # Define the path to the artifacts directory
 artifacts_dir = "artifacts"
@@ -23,6 +32,21 @@ if not os.path.exists(artifacts_dir):
 class ModelTrainerConfig:
     def __init__(self):
         self.trained_models_dir = os.path.join(artifacts_dir, "models")
+        # Total number of cores shared by all estimators trained concurrently
+        self.n_jobs = available_cores()
+        # Train the candidate models concurrently in a process pool
+        self.parallel = True
+        # Tune each model with successive halving before the final fit
+        self.tune_hyperparameters = False
+        self.search_scoring = "roc_auc"
+        self.search_folds_dir = os.path.join(artifacts_dir, "search_folds")
+
+
+def _train_model_worker(model_name, model, data_paths, n_threads):
+    # Runs in a pool process: the matrices are memory-mapped from the shared copy on disk
+    X_train, y_train, X_test, y_test = [load_matrix(path) for path in data_paths]
+    return ModelTrainer().train_model(model_name, model, X_train, y_train, X_test, y_test, n_threads)
+
 
 class ModelTrainer:
     def __init__(self):
@@ -39,53 +63,175 @@ class ModelTrainer:
         else:
             print(f"Model {type(model).__name__} does not support feature importances")
 
-    def initiate_model_trainer(self, train_array, test_array):
-        try:
-            X_train, y_train, X_test, y_test = (
-                train_array[:, :-1],
-                train_array[:, -1],
-                test_array[:, :-1],
-                test_array[:, -1]
+    def get_models(self):
+        return {
+            'Decision Tree': DecisionTreeClassifier(random_state=7215),
+            'Random Forest': RandomForestClassifier(random_state=7215),
+            'XGBoost': XGBClassifier(random_state=7215),
+            'AdaBoost': AdaBoostClassifier(random_state=7215),
+            'LGBM': LGBMClassifier(boosting_type='gbdt', class_weight=None, colsample_bytree=1.0,
+                                importance_type='split', learning_rate=0.1, max_depth=-1,
+                                min_child_samples=20, min_child_weight=0.001, min_split_gain=0.0,
+                                n_estimators=100, n_jobs=-1, num_leaves=31, objective=None,
+                                random_state=5893, reg_alpha=0.0, reg_lambda=0.0, subsample=1.0,
+                                subsample_for_bin=200000, subsample_freq=0)}
+
+    def get_param_grids(self):
+        return {
+            'Decision Tree': {'max_depth': [4, 8, 12, None], 'min_samples_leaf': [1, 5, 20]},
+            'Random Forest': {'n_estimators': [100, 300], 'max_depth': [12, None], 'min_samples_leaf': [1, 5]},
+            'XGBoost': {'learning_rate': [0.05, 0.1, 0.3], 'max_depth': [4, 6, 8], 'n_estimators': [300]},
+            'AdaBoost': {'n_estimators': [50, 100, 200], 'learning_rate': [0.5, 1.0]},
+            'LGBM': {'num_leaves': [15, 31, 63], 'learning_rate': [0.05, 0.1], 'n_estimators': [300]},
+        }
+
+    def tune_models(self, models, X_train, y_train):
+        """
+        Returns unfitted copies of the models set to the parameters chosen by successive halving.
+        """
+        param_grids = self.get_param_grids()
+        tuned = {}
+        for model_name, model in models.items():
+            if model_name not in param_grids:
+                tuned[model_name] = model
+                continue
+            search = SuccessiveHalvingSearch(
+                model, param_grids[model_name], scoring=self.model_trainer_config.search_scoring,
+                n_jobs=self.model_trainer_config.n_jobs, early_stopping_rounds=20,
+                fold_cache_dir=self.model_trainer_config.search_folds_dir, refit=False,
             )
-            models = {
-                'Decision Tree': DecisionTreeClassifier(random_state=7215),
-                'Random Forest': RandomForestClassifier(random_state=7215),
-                'XGBoost': XGBClassifier(random_state=7215),
-                'AdaBoost': AdaBoostClassifier(random_state=7215),
-                'LGBM': LGBMClassifier(boosting_type='gbdt', class_weight=None, colsample_bytree=1.0,
-                                    importance_type='split', learning_rate=0.1, max_depth=-1,
-                                    min_child_samples=20, min_child_weight=0.001, min_split_gain=0.0,
-                                    n_estimators=100, n_jobs=-1, num_leaves=31, objective=None,
-                                    random_state=5893, reg_alpha=0.0, reg_lambda=0.0, subsample=1.0,
-                                    subsample_for_bin=200000, subsample_freq=0)}
-
-            feature_names = [f'Feature_{i}' for i in range(X_train.shape[1])]
-
-            for model_name, model in models.items():
-                print(f"Training {model_name}...")
-                model.fit(X_train, y_train)
-                y_pred = model.predict(X_test)
-
-                accuracy = accuracy_score(y_test, y_pred)
-                precision = precision_score(y_test, y_pred, average='weighted')
-                recall = recall_score(y_test, y_pred, average='weighted')
-                f1 = f1_score(y_test, y_pred, average='weighted')
-
-                print(f"\nClassification Report for {model_name}:\n")
-                print(classification_report(y_test, y_pred))
-
-                print(f"{model_name} - Accuracy: {accuracy}")
-                print(f"{model_name} - Precision: {precision}")
-                print(f"{model_name} - Recall: {recall}")
-                print(f"{model_name} - F1 Score: {f1}")
-
-                # Save the trained model
-                model_path = os.path.join(self.model_trainer_config.trained_models_dir, f"{model_name.lower().replace(' ', '_')}_model.pkl")
-                save_object(file_path=model_path, obj=model)
-
-                # Save feature importances if available
-                feature_importance_path = os.path.join(self.model_trainer_config.trained_models_dir, f"{model_name.lower().replace(' ', '_')}_feature_importances.csv")
-                self.save_feature_importances(model, feature_names, feature_importance_path)
+            search.fit(X_train, y_train)
+            logging.info(f"{model_name} tuned in {search.search_seconds_:.1f}s: {search.best_params_} "
+                         f"({self.model_trainer_config.search_scoring}={search.best_score_:.4f})")
+            tuned[model_name] = clone(model).set_params(**search.best_params_)
+        return tuned
+
+    def allocate_threads(self, models, budget):
+        """
+        Splits a core budget across models trained at the same time.
+
+        Estimators without an n_jobs parameter get one core each; the remaining
+        cores are dealt out to the internally parallel ones.
+        """
+        threads = {model_name: 1 for model_name in models}
+        parallel_models = [name for name, model in models.items() if 'n_jobs' in model.get_params()]
+        spare = budget - len(models)
+        i = 0
+        while spare > 0 and parallel_models:
+            threads[parallel_models[i % len(parallel_models)]] += 1
+            spare -= 1
+            i += 1
+        return threads
+
+    def train_model(self, model_name, model, X_train, y_train, X_test, y_test, n_threads=1):
+        """
+        Fits and evaluates one model within n_threads cores, saves it and returns its metrics.
+        """
+        serving_n_jobs = model.get_params().get('n_jobs')
+        if 'n_jobs' in model.get_params():
+            model.set_params(n_jobs=n_threads)
+
+        with threadpool_limits(limits=n_threads):
+            start = time.perf_counter()
+            model.fit(X_train, y_train)
+            fit_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            y_pred = model.predict(X_test)
+            predict_seconds = time.perf_counter() - start
+
+        feature_names = [f'Feature_{i}' for i in range(X_train.shape[1])]
+
+        # The thread split is for this training run only; the saved model keeps its own n_jobs for serving
+        if 'n_jobs' in model.get_params():
+            model.set_params(n_jobs=serving_n_jobs)
+
+        # Save the trained model
+        model_path = os.path.join(self.model_trainer_config.trained_models_dir, f"{model_name.lower().replace(' ', '_')}_model.pkl")
+        save_object(file_path=model_path, obj=model)
+
+        # Save feature importances if available
+        feature_importance_path = os.path.join(self.model_trainer_config.trained_models_dir, f"{model_name.lower().replace(' ', '_')}_feature_importances.csv")
+        self.save_feature_importances(model, feature_names, feature_importance_path)
+
+        return {
+            'accuracy': accuracy_score(y_test, y_pred),
+            'precision': precision_score(y_test, y_pred, average='weighted'),
+            'recall': recall_score(y_test, y_pred, average='weighted'),
+            'f1': f1_score(y_test, y_pred, average='weighted'),
+            'fit_seconds': fit_seconds,
+            'predict_seconds': predict_seconds,
+            'n_threads': n_threads,
+            'classification_report': classification_report(y_test, y_pred),
+        }
+
+    def print_result(self, model_name, result):
+        print(f"\nClassification Report for {model_name}:\n")
+        print(result['classification_report'])
+
+        print(f"{model_name} - Accuracy: {result['accuracy']}")
+        print(f"{model_name} - Precision: {result['precision']}")
+        print(f"{model_name} - Recall: {result['recall']}")
+        print(f"{model_name} - F1 Score: {result['f1']}")
+        print(f"{model_name} - Fit time: {result['fit_seconds']:.2f}s, predict time: "
+              f"{result['predict_seconds']:.2f}s on {result['n_threads']} core(s)")
+
+    def shared_data_paths(self, shared_dir, X_train, y_train, X_test, y_test):
+        """
+        Returns on-disk copies of the matrices that pool workers can memory-map.
+
+        Matrices that are already memory-mapped from .npy files or .csr directories are
+        reused as they are. Sparse matrices are written as .csr directories, so workers
+        memory-map them as well instead of each reading a full copy.
+        """
+        paths = []
+        for name, matrix in [("X_train", X_train), ("y_train", y_train), ("X_test", X_test), ("y_test", y_test)]:
+            filename = getattr(matrix, 'filename', None)
+            if filename and str(filename).endswith(('.npy', '.csr')):
+                paths.append(str(filename))
+            else:
+                paths.append(save_matrix(os.path.join(shared_dir, name), matrix))
+        return paths
+
+    def initiate_model_trainer(self, X_train, y_train, X_test, y_test, models=None):
+        try:
+            models = models if models is not None else self.get_models()
+            if self.model_trainer_config.tune_hyperparameters:
+                models = self.tune_models(models, X_train, y_train)
+            budget = max(1, self.model_trainer_config.n_jobs)
+            n_workers = min(len(models), budget)
+            threads = self.allocate_threads(models, budget)
+            report = {}
+
+            if not self.model_trainer_config.parallel or n_workers == 1:
+                for model_name, model in models.items():
+                    print(f"Training {model_name}...")
+                    report[model_name] = self.train_model(model_name, model, X_train, y_train, X_test, y_test, threads[model_name])
+                    self.print_result(model_name, report[model_name])
+            else:
+                logging.info(f"Training {len(models)} models on {n_workers} processes with core allocation {threads}")
+                shared_dir = tempfile.mkdtemp(prefix="shared_", dir=artifacts_dir)
+                try:
+                    data_paths = self.shared_data_paths(shared_dir, X_train, y_train, X_test, y_test)
+                    # Spawned workers avoid inheriting the parent's OpenMP/BLAS thread state
+                    context = multiprocessing.get_context("spawn")
+                    with ProcessPoolExecutor(max_workers=n_workers, mp_context=context) as executor:
+                        futures = {}
+                        for model_name, model in models.items():
+                            print(f"Training {model_name}...")
+                            futures[executor.submit(_train_model_worker, model_name, model, data_paths, threads[model_name])] = model_name
+                        for future in as_completed(futures):
+                            model_name = futures[future]
+                            report[model_name] = future.result()
+                            self.print_result(model_name, report[model_name])
+                finally:
+                    shutil.rmtree(shared_dir, ignore_errors=True)
+
+            # Keep the report in the order the models were given
+            report = {model_name: report[model_name] for model_name in models}
+            for result in report.values():
+                result.pop('classification_report', None)
+            return report
 
         except Exception as e:
             raise CustomException(e, sys)
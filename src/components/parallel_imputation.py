@@ -0,0 +1,155 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+from sklearn.impute import KNNImputer
+
+from src.logger import logging
+from src.utils import available_cores
+
+_worker_imputer = None
+
+
+def _init_worker(imputer):
+    global _worker_imputer
+    _worker_imputer = imputer
+
+
+def _impute_chunk(chunk):
+    return KNNImputer.transform(_worker_imputer, chunk)
+
+
+def _take_rows(X, rows):
+    return X.iloc[rows] if hasattr(X, "iloc") else X[rows]
+
+
+def effective_n_jobs(n_jobs):
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(1, available_cores() + 1 + n_jobs)
+    return max(1, n_jobs)
+
+
+def _fitted_steps(estimator):
+    if hasattr(estimator, "transformers_"):
+        return [transformer for _, transformer, _ in estimator.transformers_]
+    if hasattr(estimator, "steps"):
+        return [step for _, step in estimator.steps]
+    return []
+
+
+def disable_process_pools(estimator):
+    """
+    Sets n_jobs=1 on every ParallelKNNImputer inside a fitted estimator, so its transform
+    runs in the calling process. Returns the number of imputers changed.
+    """
+    if isinstance(estimator, ParallelKNNImputer):
+        changed = int(estimator.n_jobs != 1)
+        estimator.n_jobs = 1
+        return changed
+    return sum(disable_process_pools(step) for step in _fitted_steps(estimator))
+
+
+class ParallelKNNImputer(KNNImputer):
+    """
+    KNNImputer whose transform spreads the rows needing imputation over a process pool.
+
+    Rows that need imputation are split into chunks of chunk_size. Each chunk
+    goes through KNNImputer.transform in a worker process that holds one copy
+    of the fitted imputer, and at most two chunks per worker are in flight at a
+    time. A row's imputed values depend only on that row and the fit data, so
+    the output is the same as a single-process KNNImputer. Small inputs and
+    n_jobs=1 skip the pool entirely.
+
+    The pool is meant for transforming the training data: DataTransformation
+    resets n_jobs to 1 before the preprocessor is saved, so serving and batch
+    scoring never start it.
+    """
+
+    def __init__(
+        self,
+        *,
+        missing_values=np.nan,
+        n_neighbors=5,
+        weights="uniform",
+        metric="nan_euclidean",
+        copy=True,
+        add_indicator=False,
+        keep_empty_features=False,
+        chunk_size=2000,
+        n_jobs=None,
+    ):
+        super().__init__(
+            missing_values=missing_values,
+            n_neighbors=n_neighbors,
+            weights=weights,
+            metric=metric,
+            copy=copy,
+            add_indicator=add_indicator,
+            keep_empty_features=keep_empty_features,
+        )
+        self.chunk_size = chunk_size
+        self.n_jobs = n_jobs
+
+    def transform(self, X):
+        n_jobs = effective_n_jobs(self.n_jobs)
+        is_nan_marker = isinstance(self.missing_values, float) and np.isnan(self.missing_values)
+        if n_jobs == 1 or X.shape[0] <= self.chunk_size or not is_nan_marker:
+            return super().transform(X)
+
+        rows_with_missing = np.flatnonzero(np.isnan(np.asarray(X, dtype=np.float64)).any(axis=1))
+        if len(rows_with_missing) <= self.chunk_size:
+            return super().transform(X)
+
+        # Complete rows involve no distance computations and are handled here
+        complete_rows = np.setdiff1d(np.arange(X.shape[0]), rows_with_missing)
+        output = None
+        if len(complete_rows):
+            complete = super().transform(_take_rows(X, complete_rows))
+            output = np.empty((X.shape[0], complete.shape[1]), dtype=complete.dtype)
+            output[complete_rows] = complete
+
+        chunks = [
+            rows_with_missing[start:start + self.chunk_size]
+            for start in range(0, len(rows_with_missing), self.chunk_size)
+        ]
+        n_workers = min(n_jobs, len(chunks))
+        logging.info(
+            f"KNN imputation of {len(rows_with_missing)} rows in {len(chunks)} chunks "
+            f"across {n_workers} processes"
+        )
+
+        start_time = time.perf_counter()
+        rows_done = 0
+        # Spawned workers do not inherit the caller's threads, locks or OpenMP state
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=n_workers, mp_context=context, initializer=_init_worker, initargs=(self,)
+        ) as executor:
+            pending = {}
+            next_chunk = 0
+            while next_chunk < len(chunks) or pending:
+                # Keep at most two chunks per worker in flight to bound memory
+                while next_chunk < len(chunks) and len(pending) < 2 * n_workers:
+                    rows = chunks[next_chunk]
+                    pending[executor.submit(_impute_chunk, _take_rows(X, rows))] = rows
+                    next_chunk += 1
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    rows = pending.pop(future)
+                    imputed = future.result()
+                    if output is None:
+                        output = np.empty((X.shape[0], imputed.shape[1]), dtype=imputed.dtype)
+                    output[rows] = imputed
+                    rows_done += len(rows)
+
+                elapsed = time.perf_counter() - start_time
+                logging.info(
+                    f"KNN imputation progress: {rows_done}/{len(rows_with_missing)} rows, "
+                    f"{elapsed:.1f}s elapsed, {rows_done / max(elapsed, 1e-9):.0f} rows/s"
+                )
+
+        return output
@@ -1,18 +1,243 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import multiprocessing.util
 import os
+import queue
+import random
+import time
+import uuid
+from contextvars import ContextVar
 from datetime import datetime
 
-LOG_FILE=f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
-logs_path=os.path.join(os.getcwd(),"logs",LOG_FILE)
-os.makedirs(logs_path,exist_ok=True)
+# One directory for every process; each process writes its own size-rotated file in it
+LOG_DIR = os.getenv("LOG_DIR", os.path.join(os.getcwd(), "logs"))
+# 'text' keeps the classic line format, 'json' writes one JSON object per line
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+# Records are handed to a background writer thread unless LOG_QUEUE=0
+LOG_QUEUE = os.getenv("LOG_QUEUE", "1") == "1"
+# Records beyond this many waiting are dropped rather than blocking the caller
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(20 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+# Fraction of records kept per level, e.g. "DEBUG=0.01,INFO=0.2"; unlisted levels are all kept
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+# Fraction of per-request access lines kept; unset means the INFO rate applies
+LOG_ACCESS_SAMPLE_RATE = float(os.getenv("LOG_ACCESS_SAMPLE_RATE")) if os.getenv("LOG_ACCESS_SAMPLE_RATE") else None
 
-LOG_FILE_PATH=os.path.join(logs_path,LOG_FILE)
+TEXT_FORMAT = "[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s"
 
-logging.basicConfig(
-    filename=LOG_FILE_PATH,
-    format="[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO,
-)
+# Set per request by RequestLogMiddleware and attached to every record logged while serving it
+request_id_var = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else on a record came from extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id", "sample_rate"}
+
+
+def log_file_path():
+    return os.path.join(LOG_DIR, f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}_{os.getpid()}.log")
+
+
+LOG_FILE_PATH = log_file_path()
+
+
+def parse_sample_rates(spec):
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        level, _, rate = item.partition("=")
+        rates[logging.getLevelName(level.strip().upper())] = float(rate)
+    return rates
+
+
+class LazyRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler that creates the log directory and file on the first record instead of at import.
+    """
+
+    def __init__(self, filename, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class ContextFilter(logging.Filter):
+    """
+    Attaches the current request ID to each record.
+    """
+
+    def filter(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a random fraction of records per level; a record's own sample_rate extra takes precedence.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        rate = getattr(record, "sample_rate", None)
+        if rate is None:
+            rate = self.rates.get(record.levelno)
+        return rate is None or rate >= 1 or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record, with the request ID and any extra= fields as top-level keys.
+    """
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "line": record.lineno,
+            "process": record.process,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that drops records instead of waiting when the queue is full.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Resolve the message and traceback now, in the caller, and leave formatting to the writer thread.
+        # Updated in place rather than copied: other handlers format the record to the same text
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler = None
+_listener = None
+
+
+def stop_listener():
+    """
+    Stops the writer thread after it has written every queued record.
+    """
+    global _listener
+    if _listener is not None:
+        # Writes out whatever is still queued
+        _listener.stop()
+        _listener = None
+
+
+def configure():
+    """
+    Installs the root handler: a queue drained by a writer thread, or the file handler itself with LOG_QUEUE=0.
+    """
+    global _handler, _listener, LOG_FILE_PATH
+
+    root = logging.getLogger()
+    if _handler is not None:
+        root.removeHandler(_handler)
+    # A listener inherited through fork has no thread in this process; start a new one
+    _listener = None
+
+    LOG_FILE_PATH = log_file_path()
+    file_handler = LazyRotatingFileHandler(LOG_FILE_PATH)
+    file_handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+
+    if LOG_QUEUE:
+        _handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        _listener = logging.handlers.QueueListener(_handler.queue, file_handler)
+        _listener.start()
+    else:
+        _handler = file_handler
+
+    # Filters run in the caller: sampled-out records never reach the queue
+    _handler.addFilter(ContextFilter())
+    _handler.addFilter(SamplingFilter(parse_sample_rates(LOG_SAMPLE_RATES)))
+    root.addHandler(_handler)
+    root.setLevel(logging.INFO)
+
+
+class RequestLogMiddleware:
+    """
+    ASGI middleware giving each request an ID and writing one access record with its latency.
+
+    The ID comes from the X-Request-ID header when the client sends one, is echoed
+    in the response and is attached to every record logged while the request runs.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            extra = {
+                "route": getattr(scope.get("route"), "path", None),
+                "status": status[0],
+                "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+            }
+            if LOG_ACCESS_SAMPLE_RATE is not None:
+                extra["sample_rate"] = LOG_ACCESS_SAMPLE_RATE
+            logging.info(f"{scope['method']} {scope['path']} {status[0]}", extra=extra)
+            request_id_var.reset(token)
+
+
+configure()
+atexit.register(stop_listener)
+# multiprocessing children end with os._exit, which skips atexit but runs these finalizers
+multiprocessing.util.Finalize(None, stop_listener, exitpriority=0)
+if hasattr(os, "register_at_fork"):
+    # Forked workers (serve.py) get their own log file and writer thread
+    os.register_at_fork(after_in_child=configure)
 
 if __name__ == "__main__":
-    logging.info ("Logging has started")
\ No newline at end of file
+    logging.info ("Logging has started")
@@ -0,0 +1,298 @@
+import bisect
+import threading
+import time
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds; fine-grained below 10ms, where the per-stage timings of a single prediction fall
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384)
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """
+        Returns the child metric for one combination of label values, creating it on first use.
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def clear(self):
+        with self._lock:
+            self._children = {}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items(), key=lambda item: tuple(map(str, item[0]))):
+            lines.extend(child.render(self.name, self.labelnames, values))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self.value += amount
+
+    def render(self, name, labelnames, values):
+        return [f"{name}{_label_text(labelnames, values)} {_format_value(self.value)}"]
+
+
+class _GaugeChild(_CounterChild):
+    def set(self, value):
+        self.value = value
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+    def state(self):
+        with self._lock:
+            return list(self.counts), self.sum
+
+    def merge(self, counts, total):
+        """
+        Adds observations made elsewhere, given as per-bucket counts and their sum.
+        """
+        with self._lock:
+            for index, count in enumerate(counts):
+                self.counts[index] += count
+            self.sum += total
+
+    def render(self, name, labelnames, values):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_label_text(labelnames, values, [('le', _format_value(bound))])} {cumulative}")
+        lines.append(f"{name}_sum{_label_text(labelnames, values)} {_format_value(total)}")
+        lines.append(f"{name}_count{_label_text(labelnames, values)} {cumulative}")
+        return lines
+
+
+class _Timer:
+    """
+    Context manager that observes the seconds spent in its block.
+    """
+
+    __slots__ = ("child", "start")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.child.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+
+class MetricsRegistry:
+    """
+    Process-wide set of metrics rendered in the Prometheus text exposition format.
+
+    Updates take a per-series lock and a bucket lookup, cheap enough for every stage
+    of every request; all formatting happens when /metrics is scraped.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name):
+        return self._metrics[name]
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+# Shared by the app and the prediction pipeline
+REQUESTS = metrics.counter("http_requests_total", "HTTP requests by route and status code.", ("route", "method", "status"))
+REQUEST_ERRORS = metrics.counter("http_request_errors_total", "Requests that failed with a server error.", ("route",))
+REQUEST_SECONDS = metrics.histogram("http_request_duration_seconds", "End-to-end request latency.", ("route",))
+STAGE_SECONDS = metrics.histogram("prediction_stage_seconds", "Time spent in each stage of a prediction.", ("stage",))
+BATCH_ROWS = metrics.histogram("prediction_batch_rows", "Rows per scoring call.", ("path",), buckets=BATCH_SIZE_BUCKETS)
+# Recorded inside process-pool workers and sent back to the API process with each result
+SCORING_HISTOGRAMS = (STAGE_SECONDS, BATCH_ROWS)
+MODEL_INFO = metrics.gauge(
+    "prediction_model_info", "Artifacts currently served (value is always 1).",
+    ("release", "model_version", "preprocessor_version"),
+)
+
+
+def histogram_state(histograms):
+    """
+    Returns the bucket counts and sum of every series of the given histograms.
+    """
+    return {
+        (histogram.name, values): child.state()
+        for histogram in histograms
+        for values, child in list(histogram._children.items())
+    }
+
+
+def histogram_delta(before, histograms):
+    """
+    Returns the observations made since histogram_state returned before, in a picklable form.
+    """
+    delta = []
+    for (name, values), (counts, total) in histogram_state(histograms).items():
+        old_counts, old_total = before.get((name, values), ([0] * len(counts), 0.0))
+        new_counts = [count - old_count for count, old_count in zip(counts, old_counts)]
+        if any(new_counts):
+            delta.append((name, values, new_counts, total - old_total))
+    return delta
+
+
+def merge_histograms(delta):
+    """
+    Adds observations returned by histogram_delta in another process to this process's metrics.
+    """
+    for name, values, counts, total in delta:
+        metrics.get(name).labels(*values).merge(counts, total)
+
+
+def stage_timer(stage):
+    """
+    Times a block into prediction_stage_seconds{stage=...}.
+    """
+    return STAGE_SECONDS.labels(stage).time()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and timing them per route template.
+
+    It also stores the time the request arrived in scope["state"]["received_at"],
+    so handlers can measure what happened before they were called (form parsing).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        scope.setdefault("state", {})["received_at"] = start
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Route templates rather than raw paths keep the label set bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUESTS.labels(route, scope["method"], status[0]).inc()
+            if status[0] >= 500:
+                REQUEST_ERRORS.labels(route).inc()
+            REQUEST_SECONDS.labels(route).observe(time.perf_counter() - start)
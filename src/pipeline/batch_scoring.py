@@ -0,0 +1,267 @@
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import available_cores, iter_table, write_table
+from src.artifact_bundle import file_sha256, is_bundle, read_manifest
+
+CHECKPOINT_FILE = "checkpoint.json"
+OUTPUT_FORMATS = (".csv", ".parquet")
+
+
+@dataclass
+class BatchScoringConfig:
+    chunk_rows: int = 50000
+    # Scoring processes; 0 means one per available core
+    workers: int = 0
+    # Chunks read ahead of the oldest unfinished one (0 means two per worker); bounds memory use
+    max_in_flight: int = 0
+    id_column: str = "ID"
+    # None serves the same artifacts as the API: the current release, else the artifacts/ files
+    model_path: str = None
+    preprocessor_path: str = None
+    progress_seconds: float = 5.0
+
+    def __post_init__(self):
+        self.workers = self.workers or available_cores()
+        self.max_in_flight = self.max_in_flight or 2 * self.workers
+
+
+def artifact_fingerprint(path):
+    if is_bundle(path):
+        manifest = read_manifest(path)
+        return manifest["source_sha256"] or manifest["pickle"]["sha256"]
+    return file_sha256(path)
+
+
+def part_path(parts_dir, index, extension):
+    return os.path.join(parts_dir, f"part-{index:06d}{extension}")
+
+
+# Pipeline of a scoring worker process, loaded once by _init_worker
+_worker_pipeline = None
+
+
+def _init_worker(model_path, preprocessor_path):
+    global _worker_pipeline
+    from threadpoolctl import threadpool_limits
+    from src.pipeline.predict_pipeline import PredictPipeline
+
+    # The pool provides the parallelism; model libraries must not start a thread per core in every worker
+    threadpool_limits(limits=1)
+    _worker_pipeline = PredictPipeline(engine="native", model_path=model_path, preprocessor_path=preprocessor_path)
+    _worker_pipeline.load()
+
+
+def _score_chunk(index, chunk, id_column, output_path):
+    import pandas as pd
+
+    # Taken first: scoring renames the chunk's columns in place
+    ids = chunk[id_column].to_numpy() if id_column in chunk.columns else chunk.index.to_numpy()
+    labels, probabilities = _worker_pipeline.predict_with_proba(chunk)
+    result = pd.DataFrame({id_column: ids, "label": labels, "probability": probabilities})
+
+    # Written under a temporary name and renamed, so a part file that exists is complete
+    root, extension = os.path.splitext(output_path)
+    temp_path = f"{root}.tmp-{os.getpid()}{extension}"
+    write_table(result, temp_path)
+    os.replace(temp_path, output_path)
+    return index, len(chunk)
+
+
+class BatchScorer:
+    """
+    Scores a CSV or Parquet file of any size with a pool of worker processes.
+
+    The input is read in chunks of chunk_rows rows and each chunk goes to a worker,
+    which applies col_rename, the preprocessor and the model, and writes the ID,
+    label and probability of every row to its own part file. At most max_in_flight
+    chunks are read but unfinished at any time, so memory use stays flat however big
+    the input is. When every chunk is done, the parts are concatenated in input order
+    into the output file.
+
+    The parts directory is the checkpoint: a rerun with the same input, chunk size and
+    artifacts skips every chunk whose part file exists. A different input or model
+    discards the old parts and starts over.
+    """
+
+    def __init__(self, input_path, output_path, config=None):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.config = config or BatchScoringConfig()
+        self.extension = os.path.splitext(output_path)[1].lower()
+        if self.extension not in OUTPUT_FORMATS:
+            raise ValueError(f"Output must be one of {OUTPUT_FORMATS}, got {output_path}")
+        self.parts_dir = f"{output_path}.parts"
+
+    def _resolve_artifacts(self):
+        from src.pipeline.predict_pipeline import PredictPipeline
+
+        pipeline = PredictPipeline(model_path=self.config.model_path, preprocessor_path=self.config.preprocessor_path)
+        return pipeline.model_path, pipeline.preprocessor_path
+
+    def _checkpoint(self, model_path, preprocessor_path):
+        stat = os.stat(self.input_path)
+        return {
+            "input_path": os.path.abspath(self.input_path),
+            "input_size": stat.st_size,
+            "input_mtime": stat.st_mtime,
+            "chunk_rows": self.config.chunk_rows,
+            "id_column": self.config.id_column,
+            "model_sha256": artifact_fingerprint(model_path),
+            "preprocessor_sha256": artifact_fingerprint(preprocessor_path),
+        }
+
+    def _prepare_parts(self, checkpoint, resume):
+        """
+        Returns the chunk indexes already scored, clearing parts that belong to another run.
+        """
+        checkpoint_path = os.path.join(self.parts_dir, CHECKPOINT_FILE)
+        if resume and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as file_obj:
+                if json.load(file_obj) == checkpoint:
+                    return {
+                        int(name[len("part-"):-len(self.extension)])
+                        for name in os.listdir(self.parts_dir)
+                        if name.startswith("part-") and name.endswith(self.extension) and ".tmp-" not in name
+                    }
+            logging.info(f"Checkpoint in {self.parts_dir} is for another input or model, starting over")
+
+        shutil.rmtree(self.parts_dir, ignore_errors=True)
+        os.makedirs(self.parts_dir)
+        with open(checkpoint_path, "w") as file_obj:
+            json.dump(checkpoint, file_obj, indent=2)
+        return set()
+
+    def _merge_parts(self, n_chunks):
+        temp_path = f"{self.output_path}.tmp-{os.getpid()}"
+        if self.extension == ".parquet":
+            import pyarrow.parquet as pq
+
+            writer = None
+            try:
+                for index in range(n_chunks):
+                    table = pq.read_table(part_path(self.parts_dir, index, self.extension))
+                    if writer is None:
+                        writer = pq.ParquetWriter(temp_path, table.schema)
+                    writer.write_table(table)
+            finally:
+                if writer is not None:
+                    writer.close()
+        else:
+            with open(temp_path, "wb") as out:
+                for index in range(n_chunks):
+                    with open(part_path(self.parts_dir, index, self.extension), "rb") as part:
+                        if index > 0:
+                            part.readline()  # each part has its own header
+                        shutil.copyfileobj(part, out)
+        os.replace(temp_path, self.output_path)
+
+    def run(self, resume=True):
+        try:
+            start = time.perf_counter()
+            model_path, preprocessor_path = self._resolve_artifacts()
+            done = self._prepare_parts(self._checkpoint(model_path, preprocessor_path), resume)
+            if done:
+                logging.info(f"Resuming: {len(done)} chunks already scored")
+
+            rows_scored = 0
+            n_chunks = 0
+            last_report = start
+            in_flight = deque()
+            with ProcessPoolExecutor(
+                max_workers=self.config.workers,
+                # Spawned workers do not inherit the reader's Arrow and OpenMP thread pools
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(model_path, preprocessor_path),
+            ) as pool:
+                def collect_oldest():
+                    nonlocal rows_scored
+                    _, n_rows = in_flight.popleft().result()
+                    rows_scored += n_rows
+
+                for index, chunk in enumerate(iter_table(self.input_path, self.config.chunk_rows)):
+                    n_chunks = index + 1
+                    if index in done:
+                        continue
+                    while len(in_flight) >= self.config.max_in_flight:
+                        collect_oldest()
+                    in_flight.append(pool.submit(
+                        _score_chunk, index, chunk, self.config.id_column,
+                        part_path(self.parts_dir, index, self.extension),
+                    ))
+                    del chunk
+
+                    now = time.perf_counter()
+                    if now - last_report >= self.config.progress_seconds:
+                        last_report = now
+                        self._report(rows_scored, now - start, n_chunks)
+                while in_flight:
+                    collect_oldest()
+
+            if n_chunks == 0:
+                raise ValueError(f"{self.input_path} has no rows")
+            self._merge_parts(n_chunks)
+            shutil.rmtree(self.parts_dir, ignore_errors=True)
+
+            elapsed = time.perf_counter() - start
+            summary = {
+                "input": self.input_path,
+                "output": self.output_path,
+                "chunks": n_chunks,
+                "chunks_resumed": len(done),
+                "rows_scored": rows_scored,
+                "seconds": round(elapsed, 2),
+                "rows_per_second": round(rows_scored / elapsed, 1) if elapsed > 0 else None,
+                "workers": self.config.workers,
+            }
+            logging.info(f"Batch scoring finished: {summary}")
+            return summary
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def _report(rows_scored, elapsed, chunks_read):
+        message = f"{rows_scored} rows scored in {elapsed:.1f}s ({rows_scored / elapsed:.0f} rows/s), {chunks_read} chunks read"
+        print(message, file=sys.stderr, flush=True)
+        logging.info(message)
+
+
+def parse_args(argv=None):
+    defaults = BatchScoringConfig()
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file of loan applications")
+    parser.add_argument("input", help="CSV or Parquet file to score")
+    parser.add_argument("output", help="output file, .csv or .parquet")
+    parser.add_argument("--chunk-rows", type=int, default=defaults.chunk_rows)
+    parser.add_argument("--workers", type=int, default=0, help="default: one per available core")
+    parser.add_argument("--max-in-flight", type=int, default=0, help="default: two chunks per worker")
+    parser.add_argument("--id-column", default=defaults.id_column)
+    parser.add_argument("--model", help="default: the current release, else artifacts/models/lgbm_model.pkl")
+    parser.add_argument("--preprocessor", help="default: the current release, else artifacts/preprocessor.pkl")
+    parser.add_argument("--restart", action="store_true", help="ignore any checkpoint and score every chunk")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    config = BatchScoringConfig(
+        chunk_rows=args.chunk_rows,
+        workers=args.workers,
+        max_in_flight=args.max_in_flight,
+        id_column=args.id_column,
+        model_path=args.model,
+        preprocessor_path=args.preprocessor,
+    )
+    summary = BatchScorer(args.input, args.output, config).run(resume=not args.restart)
+    print(json.dumps(summary, indent=2))
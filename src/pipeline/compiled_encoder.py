@@ -0,0 +1,194 @@
+import math
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.impute import KNNImputer, SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from src.components.data_transformation import DataTransformation
+from src.components.indexed_imputer import IndexedKNNImputer
+from src.logger import logging
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+class CompiledEncoder:
+    """
+    Lookup-table version of the fitted preprocessor for complete records.
+
+    The numeric StandardScaler is reduced to mean/scale vectors and the
+    categorical OneHotEncoder + StandardScaler(with_mean=False) to a table
+    mapping each (column, category) to its output index and scaled value, so a
+    record dict is written straight into a NumPy feature vector without building
+    a DataFrame. Records with a missing value still need the fitted imputers and
+    are reported back to the caller instead of being encoded.
+    """
+
+    def __init__(self, preprocessor):
+        self.expected_columns = list(preprocessor.feature_names_in_)
+        transformers = {name: (steps, columns) for name, steps, columns in preprocessor.transformers_}
+
+        num_steps, self.numerical_columns = transformers["num_pipeline"]
+        cat_steps, self.categorical_columns = transformers["cat_pipeline"]
+        if set(transformers) - {"num_pipeline", "cat_pipeline", "remainder"}:
+            raise ValueError(f"Unsupported transformers in preprocessor: {list(transformers)}")
+        if "remainder" in transformers and transformers["remainder"][0] != "drop":
+            raise ValueError("Preprocessor remainder must be 'drop'")
+
+        self.num_slice = preprocessor.output_indices_["num_pipeline"]
+        self.cat_slice = preprocessor.output_indices_["cat_pipeline"]
+        self.n_features_out = max(self.num_slice.stop, self.cat_slice.stop)
+
+        self._compile_numeric(num_steps)
+        self._compile_categorical(cat_steps)
+
+        self._key_map = {}
+
+    def _compile_numeric(self, steps):
+        self._check_steps(steps, [(KNNImputer, IndexedKNNImputer), StandardScaler])
+        scaler = steps.named_steps["scaler"]
+        n_columns = len(self.numerical_columns)
+        self.num_mean = scaler.mean_ if scaler.with_mean else np.zeros(n_columns)
+        self.num_scale = scaler.scale_ if scaler.with_std else np.ones(n_columns)
+
+    def _compile_categorical(self, steps):
+        self._check_steps(steps, [SimpleImputer, OneHotEncoder, StandardScaler])
+        encoder = steps.named_steps["one_hot_encoder"]
+        scaler = steps.named_steps["scaler"]
+        if encoder.drop_idx_ is not None or getattr(encoder, "_infrequent_enabled", False):
+            raise ValueError("OneHotEncoder with drop or infrequent categories is not supported")
+        if scaler.with_mean:
+            raise ValueError("Categorical scaler must not center the data")
+
+        # StandardScaler(with_mean=False) multiplies by the reciprocal of scale_
+        inverse_scale = 1.0 / scaler.scale_ if scaler.with_std else np.ones(len(encoder.get_feature_names_out()))
+
+        self.cat_tables = []
+        offset = self.cat_slice.start
+        position = 0
+        for categories in encoder.categories_:
+            table = {}
+            for category in categories:
+                table[category] = (offset + position, 1.0 * inverse_scale[position])
+                position += 1
+            self.cat_tables.append(table)
+
+    @staticmethod
+    def _check_steps(steps, expected_types):
+        if not isinstance(steps, Pipeline) or len(steps.steps) != len(expected_types):
+            raise ValueError(f"Unsupported pipeline: {steps}")
+        for (_, step), expected_type in zip(steps.steps, expected_types):
+            if not isinstance(step, expected_type):
+                raise ValueError(f"Unsupported step {type(step).__name__} in pipeline")
+
+    def _normalise_keys(self, record):
+        key_map = self._key_map
+        normalised = {}
+        for key, value in record.items():
+            name = key_map.get(key)
+            if name is None:
+                name = key_map[key] = DataTransformation.rename_column(key)
+            normalised[name] = value
+        return normalised
+
+    def encode(self, record, out=None):
+        """
+        Encodes one record dict into out (or a new vector).
+
+        Returns the vector, or None when the record has a missing value and must
+        go through the full preprocessor instead.
+        """
+        record = self._normalise_keys(record)
+        missing_columns = [column for column in self.expected_columns if column not in record]
+        if missing_columns:
+            raise KeyError(f"Missing columns in input features: {set(missing_columns)}")
+
+        numeric_values = []
+        for column in self.numerical_columns:
+            value = record[column]
+            if _is_missing(value):
+                return None
+            numeric_values.append(float(value))
+
+        indices = []
+        values = []
+        for column, table in zip(self.categorical_columns, self.cat_tables):
+            value = record[column]
+            if _is_missing(value):
+                return None
+            entry = table.get(value)
+            # Unknown categories encode to all zeros, as with handle_unknown='ignore'
+            if entry is not None:
+                indices.append(entry[0])
+                values.append(entry[1])
+
+        if out is None:
+            out = np.zeros(self.n_features_out)
+        else:
+            out[:] = 0.0
+        out[self.num_slice] = (np.array(numeric_values) - self.num_mean) / self.num_scale
+        out[indices] = values
+        return out
+
+    def encode_many(self, records):
+        """
+        Encodes a list of records into a preallocated matrix.
+
+        Returns the matrix and the positions of records that could not be encoded.
+        """
+        matrix = np.zeros((len(records), self.n_features_out))
+        fallback_rows = []
+        for i, record in enumerate(records):
+            if self.encode(record, out=matrix[i]) is None:
+                fallback_rows.append(i)
+        return matrix, fallback_rows
+
+    def sample_records(self):
+        """
+        Builds complete records that together cover every known category.
+        """
+        n_records = max(len(table) for table in self.cat_tables)
+        records = []
+        for i in range(n_records):
+            record = {}
+            for j, column in enumerate(self.numerical_columns):
+                record[column] = float(self.num_mean[j] + (i - n_records / 2) * self.num_scale[j] / n_records)
+            for column, table in zip(self.categorical_columns, self.cat_tables):
+                categories = list(table)
+                record[column] = categories[i % len(categories)]
+            records.append(record)
+        return records
+
+    def check_parity(self, preprocessor, records=None):
+        """
+        Returns True when encoding records gives exactly preprocessor.transform's output.
+        """
+        records = records if records is not None else self.sample_records()
+        expected = preprocessor.transform(pd.DataFrame(records)[self.expected_columns])
+        if sparse.issparse(expected):
+            expected = expected.toarray()
+        actual, fallback_rows = self.encode_many(records)
+        if fallback_rows:
+            keep = np.setdiff1d(np.arange(len(records)), fallback_rows)
+            actual, expected = actual[keep], expected[keep]
+        return actual.shape == expected.shape and np.array_equal(actual, expected)
+
+
+def compile_preprocessor(preprocessor):
+    """
+    Returns a parity-checked CompiledEncoder, or None if the preprocessor can't be compiled.
+    """
+    try:
+        encoder = CompiledEncoder(preprocessor)
+    except (ValueError, KeyError, AttributeError) as e:
+        logging.info(f"Preprocessor not compiled, using full transform: {e}")
+        return None
+
+    if not encoder.check_parity(preprocessor):
+        logging.warning("Compiled encoder does not match preprocessor.transform, using full transform")
+        return None
+    return encoder
@@ -0,0 +1,131 @@
+import asyncio
+import os
+from dataclasses import dataclass, field
+
+from src.logger import logging
+
+
+@dataclass
+class MicroBatcherConfig:
+    enabled: bool = field(default_factory=lambda: os.getenv("PREDICT_MICRO_BATCHING", "0") == "1")
+    max_batch_size: int = field(default_factory=lambda: int(os.getenv("PREDICT_MAX_BATCH_SIZE", "64")))
+    max_wait_ms: float = field(default_factory=lambda: float(os.getenv("PREDICT_MAX_WAIT_MS", "5")))
+    max_concurrent_batches: int = field(default_factory=lambda: int(os.getenv("PREDICT_MAX_CONCURRENT_BATCHES", "2")))
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-record scoring calls into batches.
+
+    Records submitted from request handlers are queued; a collector task groups
+    them until either max_batch_size records are waiting or max_wait_ms has
+    passed since the first one arrived, scores the group with one call to
+    score_batch in the default executor, and resolves each caller's future with
+    its own result.
+    """
+
+    def __init__(self, score_batch, config=None):
+        # score_batch takes a list of records and returns one result per record, in order
+        self.score_batch = score_batch
+        self.config = config or MicroBatcherConfig()
+        self._queue = None
+        self._collector = None
+        self._slots = None
+        self._in_flight = set()
+
+    @property
+    def running(self):
+        return self._collector is not None and not self._collector.done()
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.config.max_concurrent_batches)
+        self._collector = asyncio.create_task(self._collect())
+        logging.info(
+            f"Micro-batching started (max_batch_size={self.config.max_batch_size}, "
+            f"max_wait_ms={self.config.max_wait_ms})"
+        )
+
+    async def stop(self):
+        if self._collector is None:
+            return
+        self._collector.cancel()
+        try:
+            await self._collector
+        except asyncio.CancelledError:
+            pass
+        self._collector = None
+
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+        # Anything still queued will never be scored
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Micro-batcher stopped before the record was scored"))
+
+    async def submit(self, record):
+        """
+        Queues one record and waits for its result.
+        """
+        if not self.running:
+            raise RuntimeError("Micro-batcher is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((record, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        max_wait = self.config.max_wait_ms / 1000.0
+
+        while True:
+            batch = []
+            try:
+                batch.append(await self._queue.get())
+                deadline = loop.time() + max_wait
+
+                while len(batch) < self.config.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                # Bound the number of batches being scored at once; requests keep queuing meanwhile
+                await self._slots.acquire()
+            except asyncio.CancelledError:
+                # Records already taken from the queue are no longer visible to stop()
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError("Micro-batcher stopped before the record was scored"))
+                raise
+
+            task = asyncio.create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _dispatch(self, batch):
+        # Callers that gave up (e.g. disconnected clients) are dropped before scoring
+        batch = [(record, future) for record, future in batch if not future.done()]
+        try:
+            if not batch:
+                return
+            records = [record for record, _ in batch]
+            results = await asyncio.get_running_loop().run_in_executor(None, self.score_batch, records)
+            if len(results) != len(batch):
+                # zip would leave the callers past the shorter list waiting forever
+                raise ValueError(f"score_batch returned {len(results)} results for {len(batch)} records")
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
@@ -0,0 +1,163 @@
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import load_object
+from src.artifact_bundle import current_bundle, file_sha256, is_bundle, read_manifest
+from src.components.parallel_imputation import disable_process_pools
+from src.pipeline.compiled_encoder import compile_preprocessor
+from src.pipeline.tree_engine import TreeEnsemble, compile_model
+
+
+def artifact_version(file_path):
+    """
+    Returns a short content hash of an artifact file, used as its version label.
+    """
+    return file_sha256(file_path)[:12]
+
+
+def load_artifact(file_path):
+    """
+    Loads a pickle or bundle artifact and returns (object, version, bundle path or None).
+
+    A pickle that has a bundle converted from exactly that file is loaded from the
+    bundle instead, keeping the pickle's content hash as its version.
+    """
+    if is_bundle(file_path):
+        manifest = read_manifest(file_path)
+        version = manifest["source_sha256"] or manifest["pickle"]["sha256"]
+        return load_object(file_path=file_path), version[:12], file_path
+
+    source_sha256 = file_sha256(file_path)
+    bundle_path = current_bundle(file_path, source_sha256)
+    return load_object(file_path=bundle_path or file_path), source_sha256[:12], bundle_path
+
+
+@dataclass
+class LoadedArtifacts:
+    model: object
+    preprocessor: object
+    expected_columns: list
+    model_path: str
+    preprocessor_path: str
+    model_version: str
+    preprocessor_version: str
+    load_seconds: float
+    loaded_at: float
+    encoder: object = None
+    tree_ensemble: object = None
+    model_bundle: str = None
+    preprocessor_bundle: str = None
+
+    def describe(self):
+        return {
+            "model_path": self.model_path,
+            "model_version": self.model_version,
+            "preprocessor_path": self.preprocessor_path,
+            "preprocessor_version": self.preprocessor_version,
+            "model_bundle": self.model_bundle,
+            "preprocessor_bundle": self.preprocessor_bundle,
+            "n_expected_columns": len(self.expected_columns),
+            "compiled_encoder": self.encoder is not None,
+            "tree_engine": self.tree_ensemble is not None,
+            "load_seconds": round(self.load_seconds, 4),
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.loaded_at)),
+        }
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of unpickled model/preprocessor pairs.
+
+    Each pair is loaded from disk once and then shared by every PredictPipeline,
+    so requests served from FastAPI's threadpool never pay the unpickling cost.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._artifacts = {}
+
+    @staticmethod
+    def _key(model_path, preprocessor_path):
+        return (os.path.abspath(model_path), os.path.abspath(preprocessor_path))
+
+    def _load(self, model_path, preprocessor_path):
+        logging.info(f"Loading model {model_path} and preprocessor {preprocessor_path}")
+        start = time.perf_counter()
+
+        # An exported <name>_model_arrays.npz is served without unpickling the original model
+        if model_path.endswith(".npz"):
+            model, model_version, model_bundle = TreeEnsemble.load(model_path), artifact_version(model_path), None
+        else:
+            model, model_version, model_bundle = load_artifact(model_path)
+        # Bundled arrays (such as the KNN imputer's training matrix) are shared page cache, not private copies
+        preprocessor, preprocessor_version, preprocessor_bundle = load_artifact(preprocessor_path)
+        # Preprocessors saved with the training-time imputer pool enabled would fork it for large batches
+        disable_process_pools(preprocessor)
+        expected_columns = list(preprocessor.feature_names_in_)
+        encoder = compile_preprocessor(preprocessor)
+        tree_ensemble = compile_model(model)
+
+        artifacts = LoadedArtifacts(
+            model=model,
+            preprocessor=preprocessor,
+            expected_columns=expected_columns,
+            model_path=model_path,
+            preprocessor_path=preprocessor_path,
+            model_version=model_version,
+            preprocessor_version=preprocessor_version,
+            load_seconds=time.perf_counter() - start,
+            loaded_at=time.time(),
+            encoder=encoder,
+            tree_ensemble=tree_ensemble,
+            model_bundle=model_bundle,
+            preprocessor_bundle=preprocessor_bundle,
+        )
+        logging.info(f"Artifacts loaded in {artifacts.load_seconds:.3f}s")
+        return artifacts
+
+    def get(self, model_path, preprocessor_path):
+        """
+        Returns the loaded artifacts for the given paths, loading them on first use.
+        """
+        key = self._key(model_path, preprocessor_path)
+        artifacts = self._artifacts.get(key)
+        if artifacts is not None:
+            return artifacts
+
+        with self._lock:
+            artifacts = self._artifacts.get(key)
+            if artifacts is None:
+                try:
+                    artifacts = self._load(model_path, preprocessor_path)
+                except Exception as e:
+                    raise CustomException(e, sys)
+                self._artifacts[key] = artifacts
+        return artifacts
+
+    def is_loaded(self, model_path, preprocessor_path):
+        return self._key(model_path, preprocessor_path) in self._artifacts
+
+    def status(self):
+        return [artifacts.describe() for artifacts in list(self._artifacts.values())]
+
+    def retain(self, pairs):
+        """
+        Drops every cached pair except the given (model_path, preprocessor_path) pairs.
+
+        Pipelines still holding a dropped pair keep it alive until they are released.
+        """
+        keep = {self._key(model_path, preprocessor_path) for model_path, preprocessor_path in pairs}
+        with self._lock:
+            self._artifacts = {key: value for key, value in self._artifacts.items() if key in keep}
+
+    def clear(self):
+        with self._lock:
+            self._artifacts = {}
+
+
+registry = ModelRegistry()
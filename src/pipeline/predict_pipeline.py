@@ -1,42 +1,88 @@
 import os
 import sys
+import numpy as np
 import pandas as pd
+from scipy import sparse
 from src.exception import CustomException
-from src.utils import load_object
+from src.metrics import BATCH_ROWS, stage_timer
 from src.components.data_transformation import DataTransformation
+from src.pipeline.model_registry import registry
+from src.pipeline.releases import ReleaseStore
+from src.pipeline.prediction_cache import canonical_key, prediction_cache
+
+# 'native' always calls the pickled model, 'numpy' always uses the exported tree arrays,
+# 'auto' uses the arrays for batches of up to NUMPY_ENGINE_MAX_ROWS rows
+ENGINES = ("auto", "native", "numpy")
+NUMPY_ENGINE_MAX_ROWS = 16
 
 
 class PredictPipeline:
-    def __init__(self):
-        self.model_path = os.path.join("artifacts", 'models', "lgbm_model.pkl")
-        self.preprocessor_path = os.path.join('artifacts', 'preprocessor.pkl')
+    def __init__(self, engine=None, model_path=None, preprocessor_path=None, release=None):
+        self.engine = engine or os.environ.get("PREDICT_ENGINE", "auto")
+        if self.engine not in ENGINES:
+            raise ValueError(f"engine must be one of {ENGINES}, got {self.engine!r}")
+        self.release = release
+        if model_path is None and preprocessor_path is None:
+            # Serve the current release when one has been published, else the plain artifacts/ files
+            current = ReleaseStore().current_paths()
+            if current is not None:
+                model_path, preprocessor_path, self.release = current
+        self.model_path = model_path or os.path.join("artifacts", 'models', "lgbm_model.pkl")
+        self.preprocessor_path = preprocessor_path or os.path.join('artifacts', 'preprocessor.pkl')
         self.model = None
         self.preprocessor = None
+        self.artifacts = None
         self.data_transformation = DataTransformation()
 
     def _load_resources(self):
         try:
-            if not os.path.isfile(self.model_path):
+            # Either path may be a pickle file or an artifact bundle directory
+            if not os.path.exists(self.model_path):
                 raise FileNotFoundError(f"Model file not found at {self.model_path}")
-            if not os.path.isfile(self.preprocessor_path):
+            if not os.path.exists(self.preprocessor_path):
                 raise FileNotFoundError(f"Preprocessor file not found at {self.preprocessor_path}")
             
-            self.model = load_object(file_path=self.model_path)
-            self.preprocessor = load_object(file_path=self.preprocessor_path)
+            # Artifacts are unpickled once per process and shared between pipelines
+            self.artifacts = registry.get(self.model_path, self.preprocessor_path)
+            self.model = self.artifacts.model
+            self.preprocessor = self.artifacts.preprocessor
         
         except Exception as e:
             raise CustomException(e, sys)
 
-    def predict(self, features: pd.DataFrame):
-        try:
-            if self.model is None or self.preprocessor is None:
-                self._load_resources()
+    def load(self):
+        """
+        Loads the model and preprocessor up front so the first request is not slowed down.
+        """
+        if self.artifacts is None:
+            self._load_resources()
+        return self.artifacts
+
+    def is_ready(self):
+        return self.artifacts is not None
+
+    def _model_for(self, n_rows):
+        """
+        Returns the model that scores a batch of n_rows; both engines give identical probabilities.
+        """
+        ensemble = self.artifacts.tree_ensemble
+        if ensemble is None or self.engine == "native":
+            return self.model
+        if self.engine == "numpy" or n_rows <= NUMPY_ENGINE_MAX_ROWS:
+            return ensemble
+        return self.model
+
+    def _transform(self, features: pd.DataFrame):
+        if self.artifacts is None:
+            self._load_resources()
 
-            # Rename columns to match those used during training
+        # Rename columns to match those used during training
+        with stage_timer("col_rename"):
             features = self.data_transformation.col_rename(features)
 
+        with stage_timer("select_columns"):
             # Ensure the columns in features match the preprocessor's expected columns
-            expected_columns = self.preprocessor.feature_names_in_
+            expected_columns = self.artifacts.expected_columns
             missing_columns = set(expected_columns) - set(features.columns)
             if missing_columns:
                 raise KeyError(f"Missing columns in input features: {missing_columns}")
@@ -44,14 +90,97 @@ class PredictPipeline:
             # Reorder columns to match preprocessor expectation
             features = features[expected_columns]
 
+        with stage_timer("transform"):
+            return self.preprocessor.transform(features)
+
+    @staticmethod
+    def _records_frame(records):
+        features = pd.DataFrame(records)
+        # None stays None in text columns, and the categorical SimpleImputer only treats NaN as missing
+        return features.where(features.notna(), np.nan)
+
+    def _transform_records(self, records):
+        if self.artifacts is None:
+            self._load_resources()
+
+        encoder = self.artifacts.encoder
+        if encoder is None:
+            with stage_timer("dataframe_build"):
+                features = self._records_frame(records)
+            return self._transform(features)
+
+        # Complete records skip pandas entirely; records with missing values need the fitted imputers
+        with stage_timer("encode"):
+            data_scaled, fallback_rows = encoder.encode_many(records)
+        if fallback_rows:
+            with stage_timer("dataframe_build"):
+                features = self._records_frame([records[i] for i in fallback_rows])
+            imputed = self._transform(features)
+            data_scaled[fallback_rows] = imputed.toarray() if sparse.issparse(imputed) else imputed
+        return data_scaled
+
+    def predict(self, features: pd.DataFrame):
+        try:
             # Transform features and make predictions
-            data_scaled = self.preprocessor.transform(features)
-            preds = self.model.predict(data_scaled)
+            data_scaled = self._transform(features)
+            BATCH_ROWS.labels("frame").observe(data_scaled.shape[0])
+            with stage_timer("predict"):
+                preds = self._model_for(data_scaled.shape[0]).predict(data_scaled)
             return preds
         
         except Exception as e:
             raise CustomException(e, sys)
 
+    def predict_with_proba(self, features: pd.DataFrame):
+        """
+        Scores a whole frame in one pass and returns the predicted labels together
+        with the probability of the positive class, in input row order.
+        """
+        try:
+            data_scaled = self._transform(features)
+            BATCH_ROWS.labels("frame").observe(data_scaled.shape[0])
+            model = self._model_for(data_scaled.shape[0])
+            with stage_timer("predict"):
+                probabilities = model.predict_proba(data_scaled)
+                labels = model.classes_[probabilities.argmax(axis=1)]
+            return labels, probabilities[:, 1]
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _score_records(self, records):
+        data_scaled = self._transform_records(records)
+        BATCH_ROWS.labels("records").observe(data_scaled.shape[0])
+        with stage_timer("predict"):
+            return self._model_for(data_scaled.shape[0]).predict(data_scaled)
+
+    def predict_records(self, records):
+        """
+        Scores a list of record dicts, using the compiled encoder when it is available.
+
+        With the prediction cache enabled, records scored before by the same
+        artifacts are answered from it and only the rest are transformed and scored.
+        """
+        try:
+            if not prediction_cache.enabled:
+                return self._score_records(records)
+
+            if self.artifacts is None:
+                self._load_resources()
+            version = f"{self.artifacts.model_version}:{self.artifacts.preprocessor_version}"
+            with stage_timer("cache_lookup"):
+                keys = [canonical_key(record, version) for record in records]
+                results = [prediction_cache.get(key) for key in keys]
+            missing = [i for i, result in enumerate(results) if result is None]
+            if missing:
+                scored = self._score_records([records[i] for i in missing])
+                for i, result in zip(missing, scored):
+                    results[i] = result
+                    prediction_cache.put(keys[i], result)
+            return np.asarray(results)
+
+        except Exception as e:
+            raise CustomException(e, sys)
 
 
 class CustomData:
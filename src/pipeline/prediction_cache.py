@@ -0,0 +1,136 @@
+import hashlib
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+# Approximate bytes an entry costs beyond its key and value (dict slot, linked-list node, tuple)
+ENTRY_OVERHEAD_BYTES = 160
+
+
+@dataclass
+class PredictionCacheConfig:
+    enabled: bool = field(default_factory=lambda: os.getenv("PREDICT_CACHE", "0") == "1")
+    max_bytes: int = field(default_factory=lambda: int(float(os.getenv("PREDICT_CACHE_MAX_MB", "32")) * 1024 * 1024))
+    ttl_seconds: float = field(default_factory=lambda: float(os.getenv("PREDICT_CACHE_TTL_SECONDS", "300")))
+
+
+def _canonical_value(value):
+    # 250000 and 250000.0 are the same applicant; strings are categories and kept as they are
+    if value is None or isinstance(value, str):
+        return value
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    if math.isnan(number):
+        return None
+    return int(number) if number.is_integer() else number
+
+
+def canonical_key(record, version):
+    """
+    Returns a digest of a record's fields that is independent of key order and number formatting.
+    """
+    canonical = {str(name): _canonical_value(value) for name, value in record.items()}
+    payload = json.dumps([version, canonical], sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).digest()
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache of per-record predictions with a TTL and a memory budget.
+
+    Keys come from canonical_key and include the artifact versions, so a prediction
+    is never served for a different model or preprocessor than the one that made it.
+    The least recently used entries are evicted once the estimated size exceeds
+    max_bytes, and entries older than ttl_seconds are treated as misses.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or PredictionCacheConfig()
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.config.enabled and self.config.max_bytes > 0
+
+    @staticmethod
+    def _entry_size(key, value):
+        return ENTRY_OVERHEAD_BYTES + sys.getsizeof(key) + sys.getsizeof(value)
+
+    def get(self, key):
+        """
+        Returns the cached value for key, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, size = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = self._entry_size(key, value)
+        if size > self.config.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (value, time.monotonic() + self.config.ttl_seconds, size)
+            self._bytes += size
+            while self._bytes > self.config.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Drops every entry, e.g. after the served model changed.
+        """
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries = OrderedDict()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.config.max_bytes,
+                "ttl_seconds": self.config.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+prediction_cache = PredictionCache()
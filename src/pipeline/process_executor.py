@@ -0,0 +1,352 @@
+import asyncio
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from src.exception import CustomException
+from src.logger import logging
+from src.metrics import SCORING_HISTOGRAMS, histogram_delta, histogram_state, merge_histograms
+
+
+@dataclass
+class ProcessExecutorConfig:
+    enabled: bool = field(default_factory=lambda: os.getenv("PREDICT_PROCESS_POOL", "0") == "1")
+    # Scoring processes; 0 means one per available core
+    workers: int = field(default_factory=lambda: int(os.getenv("PREDICT_POOL_WORKERS", "0")))
+    # Scoring calls allowed to wait or run at once; further calls are rejected with ExecutorBusy
+    max_queue: int = field(default_factory=lambda: int(os.getenv("PREDICT_POOL_MAX_QUEUE", "256")))
+    # Rows per task when a large batch is split across the workers
+    chunk_rows: int = field(default_factory=lambda: int(os.getenv("PREDICT_POOL_CHUNK_ROWS", "2048")))
+    # 'spawn' gives each worker a clean interpreter; fork would copy the server's threads and locks
+    start_method: str = field(default_factory=lambda: os.getenv("PREDICT_POOL_START_METHOD", "spawn"))
+    # Seconds to wait for every worker to load and warm up
+    start_timeout: float = field(default_factory=lambda: float(os.getenv("PREDICT_POOL_START_TIMEOUT", "300")))
+
+
+class ExecutorBusy(RuntimeError):
+    """
+    Raised when max_queue scoring calls are already waiting for the pool.
+    """
+
+
+class VersionMismatch(ExecutorBusy):
+    """
+    Raised when the chunks of a batch keep being scored by different model versions.
+    """
+
+
+class PoolUnavailable(RuntimeError):
+    """
+    Raised when the pool broke or was stopped during a call; running is false from then on.
+    """
+
+
+def pack_records(records):
+    """
+    Packs record dicts into column arrays: one float64 matrix for the numeric fields
+    (NaN for missing) and one fixed-width unicode matrix for the others.
+
+    NumPy arrays pickle as a small header plus their raw buffer, so a batch crosses
+    the process boundary far more compactly than a list of dicts or a DataFrame.
+    """
+    names = list(records[0])
+    numeric_names, text_names = [], []
+    for name in names:
+        values = [record.get(name) for record in records]
+        if all(value is None or (isinstance(value, (int, float)) and not isinstance(value, bool)) for value in values):
+            numeric_names.append(name)
+        else:
+            text_names.append(name)
+
+    numeric = np.array(
+        [[np.nan if record.get(name) is None else record[name] for name in numeric_names] for record in records],
+        dtype=np.float64,
+    ).reshape(len(records), len(numeric_names))
+    text_missing = np.array([[record.get(name) is None for name in text_names] for record in records], dtype=bool)
+    text = np.array(
+        [["" if record.get(name) is None else str(record[name]) for name in text_names] for record in records],
+        dtype=str,
+    ).reshape(len(records), len(text_names))
+    return {
+        "numeric_names": numeric_names,
+        "numeric": numeric,
+        "text_names": text_names,
+        "text": text,
+        "text_missing": text_missing.reshape(len(records), len(text_names)),
+    }
+
+
+def unpack_records(packed):
+    records = []
+    numeric_names, text_names = packed["numeric_names"], packed["text_names"]
+    for numeric_row, text_row, missing_row in zip(packed["numeric"].tolist(), packed["text"].tolist(), packed["text_missing"].tolist()):
+        record = {name: (None if value != value else value) for name, value in zip(numeric_names, numeric_row)}
+        record.update((name, None if missing else value) for name, value, missing in zip(text_names, text_row, missing_row))
+        records.append(record)
+    return records
+
+
+def split_packed(packed, chunk_rows):
+    n_rows = packed["numeric"].shape[0]
+    for start in range(0, n_rows, chunk_rows):
+        yield {
+            key: value[start:start + chunk_rows] if isinstance(value, np.ndarray) else value
+            for key, value in packed.items()
+        }
+
+
+# State of a pool worker process, set up once by _init_worker
+_worker_loader = None
+
+
+def _init_worker():
+    global _worker_loader
+    from src.pipeline.startup import ServiceLoader, StartupConfig
+
+    # Ctrl+C reaches the whole process group; the parent shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_loader = ServiceLoader(StartupConfig(mode="eager"))
+    _worker_loader.start()
+    # Each worker follows the release pointer itself, like a server process
+    _worker_loader.watch_releases()
+
+
+def _worker_ready(hold_seconds):
+    pipeline = _worker_loader.get_pipeline()
+    # Holding the worker briefly makes the other pings go to other workers
+    time.sleep(hold_seconds)
+    return os.getpid(), pipeline.release, pipeline.artifacts.model_version
+
+
+def _with_observations(function, *args):
+    # Stage timings are recorded in this worker's metrics; the caller merges them into the API process's
+    before = histogram_state(SCORING_HISTOGRAMS)
+    result = function(*args)
+    return result, histogram_delta(before, SCORING_HISTOGRAMS)
+
+
+def _predict_records(packed):
+    return _worker_loader.get_pipeline().predict_records(unpack_records(packed))
+
+
+def _predict_with_proba(packed):
+    import pandas as pd
+
+    columns = dict(zip(packed["numeric_names"], packed["numeric"].T))
+    columns.update(zip(packed["text_names"], packed["text"].T))
+    frame = pd.DataFrame(columns)
+    for name, missing in zip(packed["text_names"], packed["text_missing"].T):
+        if missing.any():
+            frame[name] = frame[name].astype(object).where(~missing, None)
+    pipeline = _worker_loader.get_pipeline()
+    labels, probabilities = pipeline.predict_with_proba(frame)
+    return labels, probabilities, pipeline.artifacts.model_version
+
+
+def _worker_predict(packed):
+    return _with_observations(_predict_records, packed)
+
+
+def _worker_predict_with_proba(packed):
+    return _with_observations(_predict_with_proba, packed)
+
+
+class ProcessExecutor:
+    """
+    Runs record encoding and scoring in a pool of worker processes.
+
+    Each worker loads and warms up the pipeline once, in its initializer, so a
+    single API process can keep every core busy instead of being limited by the
+    GIL. start() launches the pool in the background and running only becomes
+    true once every worker has answered; until then callers keep scoring in
+    process. Batches travel as packed NumPy column arrays, and large ones are
+    split into chunk_rows tasks so all workers share them.
+    """
+
+    PING_HOLD_SECONDS = 0.05
+    # Times a batch is rescored when its chunks came from different model versions
+    VERSION_RETRIES = 3
+
+    def __init__(self, config=None):
+        self.config = config or ProcessExecutorConfig()
+        self.pool = None
+        self.workers = []
+        self.state = "stopped"
+        self.error = None
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self.state == "running"
+
+    def _start_pool(self):
+        import multiprocessing
+        from src.utils import available_cores
+
+        try:
+            start = time.perf_counter()
+            n_workers = self.config.workers or available_cores()
+            pool = ProcessPoolExecutor(
+                max_workers=n_workers,
+                mp_context=multiprocessing.get_context(self.config.start_method),
+                initializer=_init_worker,
+            )
+            # Pings make the pool start every worker; a worker only answers after its warm-up,
+            # so the pool is ready once each process has answered one
+            workers = {}
+            while len(workers) < n_workers:
+                if time.perf_counter() - start > self.config.start_timeout:
+                    raise TimeoutError(f"Only {len(workers)} of {n_workers} pool workers started")
+                futures = [pool.submit(_worker_ready, self.PING_HOLD_SECONDS) for _ in range(n_workers)]
+                workers.update((pid, (release, version)) for pid, release, version in (f.result() for f in futures))
+            self.workers = sorted(workers)
+            self.pool = pool
+            self.state = "running"
+            logging.info(f"Process pool ready in {time.perf_counter() - start:.2f}s with {len(self.workers)} workers")
+
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(CustomException(e, sys))
+            logging.error(f"Process pool failed to start: {self.error}")
+
+    def start(self):
+        if self._thread is not None or not self.config.enabled:
+            return
+        self.state = "starting"
+        self._thread = threading.Thread(target=self._start_pool, name="process-pool-starter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._state_lock:
+            pool, self.pool = self.pool, None
+            self.state = "stopped"
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _running_pool(self):
+        # Read once: a concurrent stop() or failure sets self.pool to None
+        pool = self.pool
+        if pool is None or not self.running:
+            raise PoolUnavailable("The process pool is not running")
+        return pool
+
+    def _pool_failure(self, pool, error):
+        """
+        Returns the PoolUnavailable to raise for an error from pool, or None if the pool is still usable.
+
+        A BrokenProcessPool (a worker died) fails every later call, so the pool is marked
+        failed and shut down; running turns false and callers score in process again.
+        """
+        if isinstance(error, BrokenProcessPool):
+            with self._state_lock:
+                if self.pool is pool:
+                    self.pool = None
+                    self.state = "failed"
+                    self.error = str(CustomException(error, sys))
+                    logging.error(f"Process pool broke, scoring falls back to the API process: {self.error}")
+                    pool.shutdown(wait=False, cancel_futures=True)
+            return PoolUnavailable("A process pool worker died")
+        if self.pool is not pool:
+            # Submitting to a pool that stop() shut down meanwhile
+            return PoolUnavailable("The process pool was stopped")
+        return None
+
+    def _acquire(self):
+        with self._pending_lock:
+            if self._pending >= self.config.max_queue:
+                raise ExecutorBusy(f"{self._pending} scoring calls already queued")
+            self._pending += 1
+
+    def _release(self):
+        with self._pending_lock:
+            self._pending -= 1
+
+    def predict_records_sync(self, records):
+        """
+        Blocking scoring of record dicts in one worker, for callers already off the event loop.
+        """
+        pool = self._running_pool()
+        self._acquire()
+        try:
+            predictions, observations = pool.submit(_worker_predict, pack_records(records)).result()
+            merge_histograms(observations)
+            return predictions
+        except RuntimeError as e:
+            failure = self._pool_failure(pool, e)
+            if failure is None:
+                raise
+            raise failure from e
+        finally:
+            self._release()
+
+    async def predict_records(self, records):
+        pool = self._running_pool()
+        self._acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            predictions, observations = await loop.run_in_executor(pool, _worker_predict, pack_records(records))
+            merge_histograms(observations)
+            return predictions
+        except RuntimeError as e:
+            failure = self._pool_failure(pool, e)
+            if failure is None:
+                raise
+            raise failure from e
+        finally:
+            self._release()
+
+    async def predict_with_proba(self, records):
+        """
+        Scores records split across the workers; returns labels, probabilities and the model version.
+
+        Workers follow releases on their own, so during a swap the chunks of one batch
+        can be scored by different models. Such a batch is rescored, up to
+        VERSION_RETRIES times, so a response never mixes two models' predictions.
+        """
+        pool = self._running_pool()
+        self._acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            packed = pack_records(records)
+            for attempt in range(self.VERSION_RETRIES + 1):
+                chunks = await asyncio.gather(*(
+                    loop.run_in_executor(pool, _worker_predict_with_proba, chunk)
+                    for chunk in split_packed(packed, self.config.chunk_rows)
+                ))
+                for _, observations in chunks:
+                    merge_histograms(observations)
+                results = [result for result, _ in chunks]
+                versions = {version for _, _, version in results}
+                if len(versions) == 1:
+                    break
+                logging.info(f"Batch scored by model versions {sorted(versions)}, rescoring (attempt {attempt + 1})")
+                await asyncio.sleep(0.1 * (attempt + 1))
+            else:
+                raise VersionMismatch(f"Workers are switching between model versions {sorted(versions)}")
+
+            labels = np.concatenate([result[0] for result in results])
+            probabilities = np.concatenate([result[1] for result in results])
+            return labels, probabilities, results[0][2]
+        except RuntimeError as e:
+            failure = self._pool_failure(pool, e)
+            if failure is None:
+                raise
+            raise failure from e
+        finally:
+            self._release()
+
+    def status(self):
+        status = {"state": self.state, "workers": len(self.workers), "queued": self._pending}
+        if self.error:
+            status["error"] = self.error
+        return status
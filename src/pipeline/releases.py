@@ -0,0 +1,246 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from dataclasses import dataclass, field
+
+from src.exception import CustomException
+from src.logger import logging
+from src.artifact_bundle import convert_pickle, file_sha256
+
+RELEASE_MANIFEST = "release.json"
+POINTER_FILE = "CURRENT"
+HISTORY_FILE = "history.jsonl"
+
+
+@dataclass
+class ReleaseConfig:
+    releases_dir: str = field(default_factory=lambda: os.getenv("PREDICT_RELEASES_DIR", os.path.join("artifacts", "releases")))
+    model_file_name: str = "model.pkl"
+    preprocessor_file_name: str = "preprocessor.pkl"
+    # Also write memory-mappable bundles of both pickles into the release (see src.artifact_bundle)
+    write_bundles: bool = True
+
+
+class ReleaseStore:
+    """
+    Versioned model/preprocessor releases with an atomically switched "current" pointer.
+
+    Each release is a directory releases_dir/<version> holding the model, the
+    preprocessor and a release.json manifest with their checksums. A release is
+    assembled in a staging directory and renamed into place, so it is never seen
+    half-written. The CURRENT file names the active version and is replaced with
+    os.replace, so readers see either the old or the new version, never a mix.
+    Every activation is appended to history.jsonl, which is what rollback reads: the
+    activations form a stack, and a rollback pops the latest one, so rolling back
+    twice steps back two releases instead of returning to the one just undone.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or ReleaseConfig()
+
+    @property
+    def pointer_path(self):
+        return os.path.join(self.config.releases_dir, POINTER_FILE)
+
+    def release_dir(self, version):
+        return os.path.join(self.config.releases_dir, version)
+
+    def release_paths(self, version):
+        release_dir = self.release_dir(version)
+        return (
+            os.path.join(release_dir, self.config.model_file_name),
+            os.path.join(release_dir, self.config.preprocessor_file_name),
+        )
+
+    def read_manifest(self, version):
+        with open(os.path.join(self.release_dir(version), RELEASE_MANIFEST)) as file_obj:
+            return json.load(file_obj)
+
+    def list_versions(self):
+        if not os.path.isdir(self.config.releases_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.config.releases_dir)
+            if os.path.isfile(os.path.join(self.config.releases_dir, name, RELEASE_MANIFEST))
+        )
+
+    def current_version(self):
+        try:
+            with open(self.pointer_path) as file_obj:
+                return file_obj.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def verify(self, version):
+        """
+        Raises ValueError unless every file of the release matches its manifest checksum.
+        """
+        manifest = self.read_manifest(version)
+        for file_name, expected in manifest["files"].items():
+            actual = file_sha256(os.path.join(self.release_dir(version), file_name))
+            if actual != expected:
+                raise ValueError(f"Release {version}: checksum mismatch for {file_name}")
+        return manifest
+
+    def is_current(self, model_path, preprocessor_path):
+        """
+        True when the current release holds exactly these two files.
+        """
+        version = self.current_version()
+        if version is None:
+            return False
+        files = self.read_manifest(version)["files"]
+        return (
+            files.get(self.config.model_file_name) == file_sha256(model_path)
+            and files.get(self.config.preprocessor_file_name) == file_sha256(preprocessor_path)
+        )
+
+    def publish(self, model_path, preprocessor_path, version=None, activate=True, metadata=None):
+        """
+        Copies a model/preprocessor pair into a new release and, by default, activates it.
+        """
+        try:
+            model_sha256 = file_sha256(model_path)
+            preprocessor_sha256 = file_sha256(preprocessor_path)
+            version = version or f"{time.strftime('%Y%m%d-%H%M%S')}-{model_sha256[:6]}{preprocessor_sha256[:6]}"
+            release_dir = self.release_dir(version)
+            if os.path.exists(release_dir):
+                raise FileExistsError(f"Release {version} already exists")
+
+            staging_dir = os.path.join(self.config.releases_dir, f".staging-{version}")
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            os.makedirs(staging_dir)
+            shutil.copy2(model_path, os.path.join(staging_dir, self.config.model_file_name))
+            shutil.copy2(preprocessor_path, os.path.join(staging_dir, self.config.preprocessor_file_name))
+            if self.config.write_bundles:
+                for file_name in (self.config.model_file_name, self.config.preprocessor_file_name):
+                    convert_pickle(os.path.join(staging_dir, file_name))
+
+            manifest = {
+                "version": version,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "source": {"model": model_path, "preprocessor": preprocessor_path},
+                "files": {
+                    self.config.model_file_name: model_sha256,
+                    self.config.preprocessor_file_name: preprocessor_sha256,
+                },
+                "metadata": metadata or {},
+            }
+            with open(os.path.join(staging_dir, RELEASE_MANIFEST), "w") as file_obj:
+                json.dump(manifest, file_obj, indent=2, default=repr)
+            os.rename(staging_dir, release_dir)
+            logging.info(f"Published release {version}")
+
+            if activate:
+                self.activate(version)
+            return version
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def activate(self, version, rolled_back_from=None):
+        """
+        Verifies a release and atomically points CURRENT at it.
+        """
+        try:
+            self.verify(version)
+            previous = self.current_version()
+            temp_path = f"{self.pointer_path}.tmp-{os.getpid()}"
+            with open(temp_path, "w") as file_obj:
+                file_obj.write(version + "\n")
+                file_obj.flush()
+                os.fsync(file_obj.fileno())
+            os.replace(temp_path, self.pointer_path)
+
+            entry = {"version": version, "previous": previous, "activated_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+            if rolled_back_from:
+                entry["rolled_back_from"] = rolled_back_from
+            with open(os.path.join(self.config.releases_dir, HISTORY_FILE), "a") as file_obj:
+                file_obj.write(json.dumps(entry) + "\n")
+            logging.info(f"Activated release {version} (previous: {previous})")
+            return previous
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def activation_stack(self):
+        """
+        Replays history.jsonl into the stack of activations still in effect, oldest first.
+        """
+        history_path = os.path.join(self.config.releases_dir, HISTORY_FILE)
+        if not os.path.exists(history_path):
+            return []
+        stack = []
+        with open(history_path) as file_obj:
+            for line in file_obj:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry.get("rolled_back_from"):
+                    # A rollback undoes the latest activation rather than adding one
+                    if stack:
+                        stack.pop()
+                    if not stack or stack[-1] != entry["version"]:
+                        stack.append(entry["version"])
+                else:
+                    if not stack and entry["previous"]:
+                        stack.append(entry["previous"])
+                    stack.append(entry["version"])
+        return stack
+
+    def rollback(self):
+        """
+        Undoes the latest activation still in effect and re-activates the release before it.
+        """
+        stack = self.activation_stack()
+        if not stack:
+            raise ValueError("No release history to roll back")
+        if len(stack) < 2:
+            raise ValueError("No previous release to roll back to")
+        previous = stack[-2]
+        self.activate(previous, rolled_back_from=stack[-1])
+        return previous
+
+    def current_paths(self):
+        """
+        Returns (model_path, preprocessor_path, version) of the current release, or None without one.
+        """
+        version = self.current_version()
+        if version is None:
+            return None
+        return (*self.release_paths(version), version)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage model releases")
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish = commands.add_parser("publish", help="publish and activate a model/preprocessor pair")
+    publish.add_argument("--model", default=os.path.join("artifacts", "models", "lgbm_model.pkl"))
+    publish.add_argument("--preprocessor", default=os.path.join("artifacts", "preprocessor.pkl"))
+    publish.add_argument("--version")
+    publish.add_argument("--no-activate", action="store_true")
+    activate = commands.add_parser("activate", help="point CURRENT at an existing release")
+    activate.add_argument("version")
+    commands.add_parser("rollback", help="re-activate the previous release")
+    commands.add_parser("list", help="list releases")
+    args = parser.parse_args(argv)
+
+    store = ReleaseStore()
+    if args.command == "publish":
+        print(store.publish(args.model, args.preprocessor, version=args.version, activate=not args.no_activate))
+    elif args.command == "activate":
+        store.activate(args.version)
+        print(args.version)
+    elif args.command == "rollback":
+        print(store.rollback())
+    else:
+        current = store.current_version()
+        for version in store.list_versions():
+            print(("* " if version == current else "  ") + version)
+
+
+if __name__ == "__main__":
+    main()
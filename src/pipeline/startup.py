@@ -0,0 +1,295 @@
+import importlib
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from src.exception import CustomException
+from src.logger import logging
+from src.metrics import MODEL_INFO
+from src.pipeline.prediction_cache import prediction_cache
+
+# Heavy modules (pandas, sklearn, the model libraries) are only imported through this one
+PIPELINE_MODULE = "src.pipeline.predict_pipeline"
+
+
+@dataclass
+class StartupConfig:
+    # 'background' starts serving liveness at once and loads the pipeline in a thread;
+    # 'eager' loads it before the server accepts connections
+    mode: str = field(default_factory=lambda: os.getenv("PREDICT_STARTUP_MODE", "background"))
+    # Synthetic applicants scored once after loading to prime every scoring path (0 disables)
+    warmup_records: int = field(default_factory=lambda: int(os.getenv("PREDICT_WARMUP_RECORDS", "64")))
+    # How often the current release pointer is checked for a new version (0 disables hot swapping)
+    release_poll_seconds: float = field(default_factory=lambda: float(os.getenv("PREDICT_RELEASE_POLL_SECONDS", "5")))
+
+
+class StartupTimings:
+    """
+    Ordered record of how long each startup phase took, in seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._phases = {}
+
+    def record(self, phase, seconds):
+        with self._lock:
+            self._phases[phase] = round(seconds, 4)
+
+    @contextmanager
+    def measure(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    def as_dict(self):
+        with self._lock:
+            return dict(self._phases)
+
+
+def synthetic_applicants(preprocessor, n_records):
+    """
+    Builds complete applicant records from the fitted preprocessor: numeric values spread
+    around each training mean, categories cycled so every known category appears.
+    """
+    transformers = preprocessor.named_transformers_
+    scaler = transformers["num_pipeline"].named_steps["scaler"]
+    encoder = transformers["cat_pipeline"].named_steps["one_hot_encoder"]
+    columns = {name: list(cols) for name, _, cols in preprocessor.transformers_}
+
+    records = []
+    for i in range(n_records):
+        offset = (i / max(n_records - 1, 1)) * 2 - 1
+        record = {
+            column: float(mean + offset * scale)
+            for column, mean, scale in zip(columns["num_pipeline"], scaler.mean_, scaler.scale_)
+        }
+        for column, categories in zip(columns["cat_pipeline"], encoder.categories_):
+            record[column] = categories[i % len(categories)]
+        records.append(record)
+    return records
+
+
+def warm_up(pipeline, n_records):
+    """
+    Scores synthetic applicants through the single-record, batched and DataFrame paths.
+    """
+    import pandas as pd
+
+    records = synthetic_applicants(pipeline.preprocessor, n_records)
+    # A record with a missing numeric value goes through the fitted imputers
+    incomplete = dict(records[0])
+    incomplete[next(iter(incomplete))] = None
+
+    for record in records[:3] + [incomplete]:
+        pipeline.predict_records([record])
+    pipeline.predict_records(records)
+    pipeline.predict_with_proba(pd.DataFrame(records))
+    return len(records)
+
+
+def record_model_info(pipeline):
+    """
+    Points the prediction_model_info metric at the artifacts a pipeline serves.
+    """
+    MODEL_INFO.clear()
+    artifacts = pipeline.artifacts
+    MODEL_INFO.labels(pipeline.release or "", artifacts.model_version, artifacts.preprocessor_version).set(1)
+
+
+class ServiceLoader:
+    """
+    Imports, loads and warms up the prediction pipeline, in a background thread or inline.
+
+    state moves through 'starting', 'importing', 'loading', 'warming' and then
+    'ready' (or 'failed'), and the time spent in each phase is kept in timings.
+    The pipeline is only published once warm-up has finished, so readiness
+    means the first real request takes the same paths warm-up already primed.
+
+    watch_releases() then polls the release pointer (see src.pipeline.releases).
+    A new release is loaded and warmed up next to the serving pipeline and swapped
+    in with a single assignment: requests already running keep the pipeline they
+    started with, new ones get the new release. The replaced pipeline stays
+    loaded, so pointing back at it (a rollback) swaps it back without reloading.
+    """
+
+    def __init__(self, config=None, started_at=None):
+        self.config = config or StartupConfig()
+        self.started_at = started_at or time.perf_counter()
+        self.timings = StartupTimings()
+        self.state = "starting"
+        self.error = None
+        self.pipeline = None
+        self.previous_pipeline = None
+        self.swap_error = None
+        self._lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+        self._thread = None
+        self._watcher = None
+        self._failed_release = None
+
+    @property
+    def ready(self):
+        return self.pipeline is not None
+
+    def _load(self):
+        with self._lock:
+            if self.pipeline is not None:
+                return
+            self.error = None
+            try:
+                self.state = "importing"
+                with self.timings.measure("pipeline_import"):
+                    module = importlib.import_module(PIPELINE_MODULE)
+
+                self.state = "loading"
+                pipeline = module.PredictPipeline()
+                with self.timings.measure("artifact_load"):
+                    pipeline.load()
+
+                if self.config.warmup_records > 0:
+                    self.state = "warming"
+                    with self.timings.measure("warmup"):
+                        warm_up(pipeline, self.config.warmup_records)
+
+                self.pipeline = pipeline
+                record_model_info(pipeline)
+                self.state = "ready"
+                self.timings.record("until_ready", time.perf_counter() - self.started_at)
+                logging.info(f"Prediction service ready, startup timings: {self.timings.as_dict()}")
+
+            except Exception as e:
+                self.state = "failed"
+                self.error = str(CustomException(e, sys))
+                logging.error(f"Prediction service failed to start: {self.error}")
+
+    def start(self):
+        """
+        Loads the pipeline inline in 'eager' mode, otherwise in a daemon thread.
+        """
+        if self.config.mode == "eager":
+            self._load()
+        elif self._thread is None:
+            self._thread = threading.Thread(target=self._load, name="pipeline-loader", daemon=True)
+            self._thread.start()
+
+    def get_pipeline(self):
+        """
+        Returns the warmed-up pipeline, waiting for (or retrying) the load if needed.
+        """
+        if self.pipeline is None:
+            self._load()
+        if self.pipeline is None:
+            raise RuntimeError(f"Prediction pipeline is not available: {self.error}")
+        return self.pipeline
+
+    @property
+    def release(self):
+        return getattr(self.pipeline, "release", None)
+
+    def _warmed_pipeline(self, model_path, preprocessor_path, release):
+        module = importlib.import_module(PIPELINE_MODULE)
+        pipeline = module.PredictPipeline(model_path=model_path, preprocessor_path=preprocessor_path, release=release)
+        pipeline.load()
+        if self.config.warmup_records > 0:
+            warm_up(pipeline, self.config.warmup_records)
+        return pipeline
+
+    def swap_to_release(self, store, version):
+        """
+        Loads and warms up a release, then makes it the serving pipeline.
+        """
+        from src.pipeline.model_registry import registry
+
+        with self._swap_lock:
+            current = self.pipeline
+            if current is not None and current.release == version:
+                return current
+
+            start = time.perf_counter()
+            previous = self.previous_pipeline
+            if previous is not None and previous.release == version:
+                # Rolling back to the pipeline that was just replaced: it is still loaded and warm
+                pipeline = previous
+            else:
+                store.verify(version)
+                model_path, preprocessor_path = store.release_paths(version)
+                pipeline = self._warmed_pipeline(model_path, preprocessor_path, version)
+
+            self.previous_pipeline, self.pipeline = current, pipeline
+            record_model_info(pipeline)
+            # Cached predictions are keyed by artifact version; drop the old model's entries at once
+            prediction_cache.clear()
+            self.swap_error = None
+            self._failed_release = None
+            # Keep the serving and previous pairs cached, drop older ones
+            registry.retain(
+                (p.model_path, p.preprocessor_path) for p in (self.pipeline, self.previous_pipeline) if p is not None
+            )
+            self.timings.record("last_swap", time.perf_counter() - start)
+            logging.info(f"Swapped to release {version} (previous: {getattr(current, 'release', None)})")
+            return pipeline
+
+    def check_release(self, store):
+        """
+        Swaps to the release the pointer names if it is not the one being served.
+        """
+        if not self.ready:
+            return False
+        version = store.current_version()
+        if version is None or version == self.release or version == self._failed_release:
+            return False
+        try:
+            self.swap_to_release(store, version)
+            return True
+        except Exception as e:
+            # Keep serving the current pipeline; the same version is not retried until the pointer moves
+            self._failed_release = version
+            self.swap_error = f"{version}: {CustomException(e, sys)}"
+            logging.error(f"Could not swap to release {self.swap_error}")
+            return False
+
+    def _watch(self, store):
+        while True:
+            time.sleep(self.config.release_poll_seconds)
+            try:
+                self.check_release(store)
+            except Exception as e:
+                logging.error(f"Release watcher error: {e}")
+
+    def watch_releases(self):
+        """
+        Starts polling the release pointer in a daemon thread, once per process.
+        """
+        if self.config.release_poll_seconds <= 0:
+            return
+        # A thread started before a fork is not alive in the child, which starts its own
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        from src.pipeline.releases import ReleaseStore
+
+        self._watcher = threading.Thread(
+            target=self._watch, args=(ReleaseStore(),), name="release-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def status(self):
+        status = {"state": self.state, "startup_seconds": self.timings.as_dict()}
+        if self.error:
+            status["error"] = self.error
+        if self.ready:
+            status["release"] = self.release
+            status["previous_release"] = getattr(self.previous_pipeline, "release", None)
+        if self.swap_error:
+            status["swap_error"] = self.swap_error
+        if prediction_cache.enabled:
+            status["prediction_cache"] = prediction_cache.stats()
+        if self.ready:
+            from src.pipeline.model_registry import registry
+            status["artifacts"] = registry.status()
+        return status
@@ -0,0 +1,257 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+from dataclasses import dataclass
+
+from src.exception import CustomException
+from src.logger import logging
+from src.components.data_ingestion import DataIngestion
+from src.components.data_transformation import (
+    DataTransformation,
+    NUMERICAL_COLUMNS,
+    CATEGORICAL_COLUMNS,
+    TARGET_COLUMN,
+)
+from src.components.model_training import ModelTrainer
+from src.artifact_bundle import convert_pickle
+from src.pipeline.releases import ReleaseStore
+
+# Parameters that change how fast a stage runs but not what it produces
+EXECUTION_ONLY_PARAMS = ("n_jobs", "chunk_size")
+
+
+@dataclass
+class TrainPipelineConfig:
+    cache_dir: str=os.path.join('artifacts',"cache")
+    preprocessor_file_path: str=os.path.join('artifacts',"preprocessor.pkl")
+    trained_models_dir: str=os.path.join('artifacts',"models")
+    # Also publish each pickle as a memory-mappable <name>.bundle that serving workers share
+    write_bundles: bool=True
+    # Publish the served model and the preprocessor as a new release that running servers swap in
+    publish_release: bool=True
+    served_model_name: str="LGBM"
+
+
+def hash_file(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file_obj:
+        for block in iter(lambda: file_obj.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_values(*values):
+    """
+    Returns a stable digest of JSON-serialisable values; other objects are hashed by repr.
+    """
+    payload = json.dumps(values, sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _param_value(value):
+    # A nested estimator's repr would repeat its parameters, execution-only ones included;
+    # they are already listed as separate <step>__<param> leaves, so only its class is kept
+    if hasattr(value, "get_params") and not isinstance(value, type):
+        return type(value).__name__
+    if isinstance(value, (list, tuple)):
+        return [_param_value(item) for item in value]
+    return value
+
+
+def estimator_params(estimator):
+    """
+    Returns the parameters that determine an estimator's output, as hashable plain values.
+    """
+    return {
+        name: _param_value(value) for name, value in estimator.get_params(deep=True).items()
+        if name.split("__")[-1] not in EXECUTION_ONLY_PARAMS
+    }
+
+
+def model_file_stem(model_name):
+    return model_name.lower().replace(' ', '_')
+
+
+class TrainPipeline:
+    """
+    Runs ingestion, transformation and training as cached stages.
+
+    Each stage's outputs are stored under cache_dir/<stage>/<key>, where the
+    key hashes everything that determines them: the source data, the column
+    lists, the transformer parameters and each model's parameters, plus the key
+    of the stage before. A stage whose key already has a complete cache entry is
+    skipped, and models are cached one by one, so changing one model's
+    hyperparameters retrains only that model. The current preprocessor and
+    models are then copied to the usual artifacts/ paths for serving.
+    """
+
+    def __init__(self):
+        self.config = TrainPipelineConfig()
+        self.data_ingestion = DataIngestion()
+        self.data_transformation = DataTransformation()
+        self.model_trainer = ModelTrainer()
+
+    def _stage_dir(self, stage, key):
+        return os.path.join(self.config.cache_dir, stage, key)
+
+    @staticmethod
+    def _load_manifest(stage_dir):
+        manifest_path = os.path.join(stage_dir, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path) as file_obj:
+            return json.load(file_obj)
+
+    @staticmethod
+    def _write_manifest(stage_dir, manifest):
+        # Written last: an entry without a manifest is an interrupted run and gets redone
+        with open(os.path.join(stage_dir, "manifest.json"), "w") as file_obj:
+            json.dump(manifest, file_obj, indent=2, default=repr)
+
+    def _publish_bundle(self, pickle_path):
+        if self.config.write_bundles:
+            convert_pickle(pickle_path)
+
+    def run_ingestion(self):
+        config = self.data_ingestion.ingestion_config
+        key = hash_values(
+            "ingestion",
+            hash_file(config.source_data_path),
+            config.artifact_format,
+            config.test_size,
+            config.streaming,
+            config.split_key_column,
+            config.stratify_column,
+        )
+        stage_dir = self._stage_dir("ingestion", key)
+        config.train_data_path = os.path.join(stage_dir, f"train.{config.artifact_format}")
+        config.test_data_path = os.path.join(stage_dir, f"test.{config.artifact_format}")
+        config.raw_data_path = os.path.join(stage_dir, f"data.{config.artifact_format}")
+
+        if self._load_manifest(stage_dir) is not None:
+            logging.info(f"Ingestion stage {key} is cached, skipping")
+        else:
+            shutil.rmtree(stage_dir, ignore_errors=True)
+            self.data_ingestion.initiate_data_ingestion()
+            self._write_manifest(stage_dir, {"stage": "ingestion", "source": config.source_data_path})
+
+        return key, config.train_data_path, config.test_data_path
+
+    def run_transformation(self, ingestion_key, train_path, test_path):
+        config = self.data_transformation.data_transformation_config
+        preprocessor = self.data_transformation.get_data_transformer_object()
+        key = hash_values(
+            "transformation",
+            ingestion_key,
+            NUMERICAL_COLUMNS,
+            CATEGORICAL_COLUMNS,
+            TARGET_COLUMN,
+            estimator_params(preprocessor),
+            config.feature_dtype,
+        )
+        stage_dir = self._stage_dir("transformation", key)
+        config.preprocessor_obj_file_path = os.path.join(stage_dir, "preprocessor.pkl")
+        config.imputation_report_file_path = os.path.join(stage_dir, "imputation_report.json")
+        config.features_dir = os.path.join(stage_dir, "features")
+
+        if self._load_manifest(stage_dir) is not None:
+            logging.info(f"Transformation stage {key} is cached, skipping")
+            X_train, y_train, X_test, y_test = self.data_transformation.load_transformed_data()
+        else:
+            shutil.rmtree(stage_dir, ignore_errors=True)
+            X_train, y_train, X_test, y_test, _ = self.data_transformation.initiate_data_transformation(train_path, test_path)
+            self._write_manifest(stage_dir, {"stage": "transformation", "ingestion_key": ingestion_key})
+
+        os.makedirs(os.path.dirname(self.config.preprocessor_file_path), exist_ok=True)
+        shutil.copy2(config.preprocessor_obj_file_path, self.config.preprocessor_file_path)
+        self._publish_bundle(self.config.preprocessor_file_path)
+        return key, X_train, y_train, X_test, y_test
+
+    def run_training(self, transformation_key, X_train, y_train, X_test, y_test):
+        trainer_config = self.model_trainer.model_trainer_config
+        models = self.model_trainer.get_models()
+        param_grids = self.model_trainer.get_param_grids() if trainer_config.tune_hyperparameters else {}
+
+        keys = {
+            model_name: hash_values(
+                "training",
+                transformation_key,
+                model_name,
+                type(model).__name__,
+                estimator_params(model),
+                param_grids.get(model_name),
+                trainer_config.search_scoring if param_grids else None,
+            )
+            for model_name, model in models.items()
+        }
+        stale = {
+            model_name: model for model_name, model in models.items()
+            if self._load_manifest(self._stage_dir("training", keys[model_name])) is None
+        }
+        logging.info(f"Training stage: {len(models) - len(stale)} models cached, retraining {list(stale)}")
+
+        if stale:
+            staging_dir = os.path.join(self.config.cache_dir, "training", "_staging")
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            trainer_config.trained_models_dir = staging_dir
+            report = self.model_trainer.initiate_model_trainer(X_train, y_train, X_test, y_test, models=stale)
+
+            for model_name in stale:
+                stage_dir = self._stage_dir("training", keys[model_name])
+                shutil.rmtree(stage_dir, ignore_errors=True)
+                os.makedirs(stage_dir)
+                stem = model_file_stem(model_name)
+                for file_name in os.listdir(staging_dir):
+                    if file_name.startswith(f"{stem}_"):
+                        shutil.move(os.path.join(staging_dir, file_name), os.path.join(stage_dir, file_name))
+                self._write_manifest(stage_dir, {"stage": "training", "model": model_name, "metrics": report[model_name]})
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+        # Publish every model, fresh or cached, to the serving location
+        os.makedirs(self.config.trained_models_dir, exist_ok=True)
+        full_report = {}
+        for model_name in models:
+            stage_dir = self._stage_dir("training", keys[model_name])
+            for file_name in os.listdir(stage_dir):
+                if file_name != "manifest.json":
+                    published_path = os.path.join(self.config.trained_models_dir, file_name)
+                    shutil.copy2(os.path.join(stage_dir, file_name), published_path)
+                    if file_name.endswith("_model.pkl"):
+                        self._publish_bundle(published_path)
+            full_report[model_name] = dict(self._load_manifest(stage_dir)["metrics"], cached=model_name not in stale)
+        return full_report
+
+    def publish_release(self, report):
+        """
+        Publishes and activates a release of the served model, unless it is already current.
+        """
+        store = ReleaseStore()
+        model_path = os.path.join(
+            self.config.trained_models_dir, f"{model_file_stem(self.config.served_model_name)}_model.pkl"
+        )
+        if store.is_current(model_path, self.config.preprocessor_file_path):
+            logging.info(f"Release {store.current_version()} already serves these artifacts")
+            return store.current_version()
+        return store.publish(
+            model_path,
+            self.config.preprocessor_file_path,
+            metadata={"model": self.config.served_model_name, "metrics": report.get(self.config.served_model_name)},
+        )
+
+    def run(self):
+        try:
+            ingestion_key, train_path, test_path = self.run_ingestion()
+            transformation_key, X_train, y_train, X_test, y_test = self.run_transformation(ingestion_key, train_path, test_path)
+            report = self.run_training(transformation_key, X_train, y_train, X_test, y_test)
+            if self.config.publish_release:
+                self.publish_release(report)
+            return report
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+if __name__ == "__main__":
+    print(TrainPipeline().run())
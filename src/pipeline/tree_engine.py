@@ -0,0 +1,443 @@
+import json
+import os
+import sys
+
+import numpy as np
+from scipy import sparse
+from scipy.special import expit
+
+from src.exception import CustomException
+from src.logger import logging
+
+# How a node routes a missing value, following LightGBM's MissingType
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+# LightGBM treats |x| <= kZeroThreshold as zero
+LGBM_ZERO_THRESHOLD = 1e-35
+
+ARRAY_FIELDS = ("feature", "threshold", "left", "right", "value", "default_left", "missing_type", "roots")
+
+
+class TreeEnsemble:
+    """
+    Flat-array copy of a fitted tree model, evaluated with vectorized NumPy.
+
+    All trees share one set of node arrays (feature index, threshold, left and
+    right child, leaf value, missing-value routing) and roots holds each tree's
+    first node. A single row decides every node's split at once and then
+    follows the resulting next-node table, one gather per tree level. Larger
+    batches walk all (row, tree) pairs level by level, dropping pairs that have
+    reached a leaf. Neither path branches per node in Python, and neither pays
+    the booster wrappers' per-call overhead, which dominates small batches.
+
+    Each kind reproduces its library's arithmetic exactly:
+      - lightgbm: float64 inputs, x <= threshold, leaf values summed tree by
+        tree in float64, then a float64 sigmoid.
+      - xgboost: float32 inputs, x < threshold, margin accumulated in float32
+        from the base score, then a float32 sigmoid.
+      - decision_tree: inputs cast to float32, x <= threshold, and the class
+        fractions of the reached leaf, normalised like sklearn.
+    """
+
+    def __init__(self, kind, classes, n_features, max_depth, base_score=0.0, **arrays):
+        self.kind = kind
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = int(n_features)
+        self.max_depth = int(max_depth)
+        self.base_score = base_score
+        for name in ARRAY_FIELDS:
+            setattr(self, name, arrays[name])
+        self._is_leaf = self.left == np.arange(len(self.left))
+        self._has_zero_routing = bool((self.missing_type == MISSING_ZERO).any())
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ARRAY_FIELDS)
+
+    def _input_matrix(self, X):
+        if sparse.issparse(X):
+            X = X.tocsr()
+            if self.kind == "xgboost":
+                # XGBoost treats entries absent from a sparse matrix as missing, not zero
+                dense = np.full(X.shape, np.nan, dtype=np.float32)
+                rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+                dense[rows, X.indices] = X.data
+                X = dense
+            else:
+                X = X.toarray()
+        X = np.asarray(X, dtype=np.float64 if self.kind == "lightgbm" else np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got input of shape {X.shape}")
+        if self.kind == "lightgbm":
+            X = np.where(np.abs(X) <= LGBM_ZERO_THRESHOLD, 0.0, X)
+        return X
+
+    def _compare(self, values, threshold):
+        return values < threshold if self.kind == "xgboost" else values <= threshold
+
+    def _decide_with_missing(self, values, nodes):
+        is_nan = np.isnan(values)
+        missing_type = self.missing_type[nodes]
+        # LightGBM reads NaN as zero at nodes that don't route NaN separately
+        values = np.where(is_nan & (missing_type != MISSING_NAN), 0, values)
+        use_default = (
+            ((missing_type == MISSING_ZERO) & (values == 0))
+            | ((missing_type == MISSING_NAN) & is_nan)
+        )
+        return np.where(use_default, self.default_left[nodes], self._compare(values, self.threshold[nodes]))
+
+    def _apply_table(self, X, check_missing):
+        # Every node's decision for every row at once, turned into a per-row "next node" table
+        values = X[:, self.feature]
+        if check_missing:
+            go_left = self._decide_with_missing(values, slice(None))
+        else:
+            go_left = self._compare(values, self.threshold)
+        row_offset = np.arange(X.shape[0])[:, None] * len(self.feature)
+        next_node = (np.where(go_left, self.left, self.right) + row_offset).ravel()
+
+        # Leaves point to themselves, so max_depth hops land every tree of every row on its leaf
+        nodes = (self.roots + row_offset).ravel()
+        for _ in range(self.max_depth):
+            nodes = next_node[nodes]
+        return nodes.reshape(X.shape[0], self.n_trees) - row_offset
+
+    def _apply_walk(self, X, check_missing):
+        n_rows = X.shape[0]
+        flat = X.ravel()
+        # One slot per (row, tree); a slot drops out of the active set once it reaches a leaf
+        nodes = np.tile(self.roots, n_rows)
+        row_start = np.repeat(np.arange(n_rows) * self.n_features_in_, self.n_trees)
+        active = np.flatnonzero(~self._is_leaf[nodes])
+        for _ in range(self.max_depth):
+            if not active.size:
+                break
+            current = nodes[active]
+            values = flat[row_start[active] + self.feature[current]]
+            if check_missing:
+                go_left = self._decide_with_missing(values, current)
+            else:
+                go_left = self._compare(values, self.threshold[current])
+            reached = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = reached
+            active = active[~self._is_leaf[reached]]
+        return nodes.reshape(n_rows, self.n_trees)
+
+    def apply(self, X):
+        """
+        Returns the leaf node reached in every tree, as an (n_rows, n_trees) index array.
+        """
+        X = self._input_matrix(X)
+        check_missing = self._has_zero_routing or bool(np.isnan(X).any())
+        # A single row is cheaper through the full decision table than through the walk's bookkeeping
+        if X.shape[0] == 1:
+            return self._apply_table(X, check_missing)
+        return self._apply_walk(X, check_missing)
+
+    def predict_raw(self, X):
+        """
+        Returns the margin for boosted models, or the leaf class fractions for a decision tree.
+        """
+        leaves = self.apply(X)
+        if self.kind == "decision_tree":
+            return self.value[leaves[:, 0]]
+
+        dtype = np.float64 if self.kind == "lightgbm" else np.float32
+        leaf_values = np.empty((leaves.shape[0], self.n_trees + 1), dtype=dtype)
+        leaf_values[:, 0] = self.base_score
+        leaf_values[:, 1:] = self.value[leaves]
+        # cumsum adds the trees one at a time, in the same order as the libraries
+        return np.cumsum(leaf_values, axis=1, dtype=dtype)[:, -1]
+
+    def predict_proba(self, X):
+        try:
+            raw = self.predict_raw(X)
+            if self.kind == "decision_tree":
+                normalizer = raw.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                return raw / normalizer
+
+            positive = expit(raw)
+            return np.vstack((1.0 - positive, positive)).transpose()
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def save(self, file_path):
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        meta = {
+            "kind": self.kind,
+            "classes": self.classes_.tolist(),
+            "n_features": self.n_features_in_,
+            "max_depth": self.max_depth,
+            "base_score": float(self.base_score),
+        }
+        arrays = {name: getattr(self, name) for name in ARRAY_FIELDS}
+        np.savez(file_path, meta=np.array(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, file_path):
+        with np.load(file_path) as stored:
+            meta = json.loads(str(stored["meta"]))
+            arrays = {name: stored[name] for name in ARRAY_FIELDS}
+        if meta["kind"] == "xgboost":
+            meta["base_score"] = np.float32(meta["base_score"])
+        return cls(**meta, **arrays)
+
+
+class _NodeBuffer:
+    """
+    Collects nodes of one or more trees in the flat layout used by TreeEnsemble.
+    """
+
+    def __init__(self):
+        self.feature, self.threshold, self.left, self.right = [], [], [], []
+        self.value, self.default_left, self.missing_type = [], [], []
+
+    def add(self, feature=0, threshold=0.0, value=0.0, default_left=False, missing_type=MISSING_NONE):
+        node = len(self.feature)
+        self.feature.append(feature)
+        self.threshold.append(threshold)
+        self.left.append(node)
+        self.right.append(node)
+        self.value.append(value)
+        self.default_left.append(default_left)
+        self.missing_type.append(missing_type)
+        return node
+
+    def arrays(self, threshold_dtype, value_dtype, roots):
+        return {
+            "feature": np.asarray(self.feature, dtype=np.int32),
+            "threshold": np.asarray(self.threshold, dtype=threshold_dtype),
+            "left": np.asarray(self.left, dtype=np.int32),
+            "right": np.asarray(self.right, dtype=np.int32),
+            "value": np.asarray(self.value, dtype=value_dtype),
+            "default_left": np.asarray(self.default_left, dtype=bool),
+            "missing_type": np.asarray(self.missing_type, dtype=np.uint8),
+            "roots": np.asarray(roots, dtype=np.int32),
+        }
+
+
+LGBM_MISSING_TYPES = {"None": MISSING_NONE, "Zero": MISSING_ZERO, "NaN": MISSING_NAN}
+
+
+def _export_lightgbm(model):
+    dump = model.booster_.dump_model()
+    if dump["num_tree_per_iteration"] != 1 or not dump["objective"].startswith("binary"):
+        raise ValueError(f"Only binary LightGBM models are supported, got objective {dump['objective']!r}")
+    if dump.get("average_output"):
+        raise ValueError("LightGBM random forest mode is not supported")
+    if "sigmoid:1" not in dump["objective"].split():
+        raise ValueError(f"Only sigmoid:1 is supported, got objective {dump['objective']!r}")
+
+    buffer, roots, max_depth = _NodeBuffer(), [], 0
+    for tree_info in dump["tree_info"]:
+        if tree_info.get("is_linear"):
+            raise ValueError("Linear LightGBM trees are not supported")
+        stack = [(tree_info["tree_structure"], None, None, 0)]
+        roots.append(len(buffer.feature))
+        while stack:
+            node, parent, side, depth = stack.pop()
+            max_depth = max(max_depth, depth)
+            if "leaf_value" in node:
+                index = buffer.add(value=node["leaf_value"])
+            else:
+                if node["decision_type"] != "<=":
+                    raise ValueError(f"Unsupported LightGBM decision type {node['decision_type']!r}")
+                index = buffer.add(
+                    feature=node["split_feature"],
+                    threshold=node["threshold"],
+                    default_left=node["default_left"],
+                    missing_type=LGBM_MISSING_TYPES[node["missing_type"]],
+                )
+                stack.append((node["right_child"], index, "right", depth + 1))
+                stack.append((node["left_child"], index, "left", depth + 1))
+            if parent is not None:
+                getattr(buffer, side)[parent] = index
+
+    return TreeEnsemble(
+        kind="lightgbm",
+        classes=model.classes_,
+        n_features=dump["max_feature_idx"] + 1,
+        max_depth=max_depth,
+        base_score=0.0,
+        **buffer.arrays(np.float64, np.float64, roots),
+    )
+
+
+def _export_xgboost(model):
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw("json"))["learner"]
+    if learner["objective"]["name"] != "binary:logistic":
+        raise ValueError(f"Only binary:logistic XGBoost models are supported, got {learner['objective']['name']!r}")
+    if learner["gradient_booster"]["name"] != "gbtree":
+        raise ValueError(f"Only gbtree boosters are supported, got {learner['gradient_booster']['name']!r}")
+
+    trees = learner["gradient_booster"]["model"]["trees"]
+    best_iteration = booster.attr("best_iteration")
+    if best_iteration is not None:
+        trees = trees[:int(best_iteration) + 1]
+
+    buffer, roots, max_depth = _NodeBuffer(), [], 0
+    for tree in trees:
+        if any(tree["split_type"]):
+            raise ValueError("Categorical XGBoost splits are not supported")
+        offset = len(buffer.feature)
+        roots.append(offset)
+        left, right = tree["left_children"], tree["right_children"]
+        depth = [0] * len(left)
+        for node in range(len(left)):
+            if left[node] == -1:
+                # Leaf values are stored in split_conditions
+                buffer.add(value=tree["split_conditions"][node])
+            else:
+                buffer.add(
+                    feature=tree["split_indices"][node],
+                    threshold=tree["split_conditions"][node],
+                    default_left=bool(tree["default_left"][node]),
+                    missing_type=MISSING_NAN,
+                )
+        for node in range(len(left)):
+            if left[node] != -1:
+                buffer.left[offset + node] = offset + left[node]
+                buffer.right[offset + node] = offset + right[node]
+                depth[left[node]] = depth[right[node]] = depth[node] + 1
+        max_depth = max(max_depth, max(depth))
+
+    # The base score is stored as a probability and turned into a margin in float32, as XGBoost does
+    probability = np.float32(float(learner["learner_model_param"]["base_score"]))
+    base_margin = -np.log(np.float32(1.0) / probability - np.float32(1.0))
+
+    return TreeEnsemble(
+        kind="xgboost",
+        classes=model.classes_,
+        n_features=int(learner["learner_model_param"]["num_feature"]),
+        max_depth=max_depth,
+        base_score=np.float32(base_margin),
+        **buffer.arrays(np.float32, np.float32, roots),
+    )
+
+
+def _export_decision_tree(model):
+    tree = model.tree_
+    if model.n_outputs_ != 1:
+        raise ValueError("Only single-output decision trees are supported")
+
+    is_leaf = tree.children_left == -1
+    nodes = np.arange(tree.node_count)
+    missing_go_to_left = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=bool))
+    arrays = {
+        "feature": np.where(is_leaf, 0, tree.feature).astype(np.int32),
+        "threshold": tree.threshold.astype(np.float64),
+        "left": np.where(is_leaf, nodes, tree.children_left).astype(np.int32),
+        "right": np.where(is_leaf, nodes, tree.children_right).astype(np.int32),
+        "value": tree.value[:, 0, :model.n_classes_].astype(np.float64),
+        "default_left": np.asarray(missing_go_to_left, dtype=bool),
+        "missing_type": np.full(tree.node_count, MISSING_NAN, dtype=np.uint8),
+        "roots": np.zeros(1, dtype=np.int32),
+    }
+    return TreeEnsemble(
+        kind="decision_tree",
+        classes=model.classes_,
+        n_features=model.n_features_in_,
+        max_depth=tree.max_depth,
+        **arrays,
+    )
+
+
+EXPORTERS = {
+    "LGBMClassifier": _export_lightgbm,
+    "XGBClassifier": _export_xgboost,
+    "DecisionTreeClassifier": _export_decision_tree,
+}
+
+
+def export_model(model):
+    """
+    Flattens a fitted LGBM, XGBoost or DecisionTree classifier into a TreeEnsemble.
+    """
+    if isinstance(model, TreeEnsemble):
+        return model
+    exporter = EXPORTERS.get(type(model).__name__)
+    if exporter is None:
+        raise ValueError(f"No tree exporter for {type(model).__name__}")
+    return exporter(model)
+
+
+def sample_inputs(n_features, n_rows=512, random_state=0):
+    """
+    Returns rows spread around the scaled feature range, with some exact zeros as in one-hot columns.
+    """
+    rng = np.random.default_rng(random_state)
+    X = rng.normal(scale=2.0, size=(n_rows, n_features))
+    X[rng.random(X.shape) < 0.3] = 0.0
+    return X
+
+
+def check_parity(model, ensemble, X=None):
+    """
+    Returns True when the ensemble's probabilities equal model.predict_proba bit for bit,
+    for the whole batch and for single rows.
+    """
+    X = X if X is not None else sample_inputs(ensemble.n_features_in_)
+    expected = model.predict_proba(X)
+    actual = ensemble.predict_proba(X)
+    if actual.dtype != expected.dtype or not np.array_equal(actual, expected):
+        return False
+    return all(np.array_equal(ensemble.predict_proba(X[i:i + 1]), expected[i:i + 1]) for i in range(8))
+
+
+def compile_model(model):
+    """
+    Returns a parity-checked TreeEnsemble for the model, or None if it can't be exported.
+    """
+    if isinstance(model, TreeEnsemble):
+        return model
+    try:
+        ensemble = export_model(model)
+    except (ValueError, KeyError, AttributeError) as e:
+        logging.info(f"Model not exported to the NumPy tree engine: {e}")
+        return None
+
+    if not check_parity(model, ensemble):
+        logging.warning(f"NumPy tree engine does not match {type(model).__name__}.predict_proba, not using it")
+        return None
+    logging.info(
+        f"Exported {type(model).__name__} to {ensemble.n_trees} trees, "
+        f"{len(ensemble.feature)} nodes, {ensemble.nbytes / 1024:.0f} KiB"
+    )
+    return ensemble
+
+
+def export_models(models_dir=os.path.join("artifacts", "models")):
+    """
+    Writes <name>_model_arrays.npz next to every exportable <name>_model.pkl and returns the written paths.
+    """
+    from src.utils import load_object
+
+    written = {}
+    for file_name in sorted(os.listdir(models_dir)):
+        if not file_name.endswith("_model.pkl"):
+            continue
+        try:
+            model = load_object(os.path.join(models_dir, file_name))
+        except Exception as e:
+            logging.info(f"Skipping {file_name}: {e}")
+            continue
+        ensemble = compile_model(model)
+        if ensemble is None:
+            continue
+        array_path = os.path.join(models_dir, file_name.replace("_model.pkl", "_model_arrays.npz"))
+        ensemble.save(array_path)
+        written[file_name] = array_path
+    return written
+
+
+if __name__ == "__main__":
+    print(export_models())
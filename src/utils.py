@@ -1,16 +1,44 @@
+import math
 import os
+import shutil
 import sys
 
 import numpy as np 
 import pandas as pd
 import dill
 import pickle
-from sklearn.metrics import r2_score
-from sklearn.model_selection import GridSearchCV
+from sklearn.metrics import f1_score, roc_auc_score
 
 from src.exception import CustomException
+from src.artifact_bundle import BUNDLE_SUFFIX, is_bundle, read_bundle, write_bundle
+from src.components.hyperparameter_search import SuccessiveHalvingSearch
+
+def available_cores():
+    """
+    Returns the number of cores this process may use, honouring CPU affinity and a cgroup v2 CPU quota.
+    """
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as file_obj:
+            quota, period = file_obj.read().split()
+        if quota != "max":
+            cores = min(cores, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cores
+
 
 def save_object(file_path, obj):
+    """
+    Pickles obj to file_path; a path ending in .bundle gets a memory-mappable artifact bundle.
+    """
+    if file_path.endswith(BUNDLE_SUFFIX):
+        write_bundle(file_path, obj)
+        return
+
     try:
         dir_path = os.path.dirname(file_path)
 
@@ -22,41 +50,192 @@ def save_object(file_path, obj):
     except Exception as e:
         raise CustomException(e, sys)
     
-def evaluate_models(X_train, y_train,X_test,y_test,models,param):
+def evaluate_models(X_train, y_train,X_test,y_test,models,param,scoring="roc_auc",n_jobs=-1):
+    """
+    Tunes each model with successive halving and scores the tuned model on the test set.
+
+    The tuned, fitted estimators replace the entries of models in place.
+    """
     try:
         report = {}
 
-        for i in range(len(list(models))):
-            model = list(models.values())[i]
-            para=param[list(models.keys())[i]]
+        for model_name, model in list(models.items()):
+            search = SuccessiveHalvingSearch(
+                model, param[model_name], scoring=scoring, cv=3, n_jobs=n_jobs,
+                early_stopping_rounds=20,
+                fold_cache_dir=os.path.join("artifacts", "search_folds"),
+            )
+            search.fit(X_train, y_train)
+            models[model_name] = search.best_estimator_
+
+            y_test_proba = search.best_estimator_.predict_proba(X_test)[:, 1]
+            y_test_pred = search.best_estimator_.predict(X_test)
+
+            report[model_name] = {
+                "best_params": search.best_params_,
+                f"cv_{scoring}": search.best_score_,
+                "test_roc_auc": roc_auc_score(y_test, y_test_proba),
+                "test_f1": f1_score(y_test, y_test_pred, average="weighted"),
+                "search_seconds": search.search_seconds_,
+            }
+
+        return report
+
+    except Exception as e:
+        raise CustomException(e, sys)
+    
+def load_object(file_path):
+    """
+    Loads a pickle file, or an artifact bundle directory with its arrays memory-mapped.
+    """
+    if is_bundle(file_path):
+        return read_bundle(file_path)
 
-            gs = GridSearchCV(model,para,cv=3)
-            gs.fit(X_train,y_train)
+    try:
+        with open(file_path, "rb") as file_obj:
+            return pickle.load(file_obj)
 
-            model.set_params(**gs.best_params_)
-            model.fit(X_train,y_train)
+    except Exception as e:
+        raise CustomException(e, sys)
 
-            #model.fit(X_train, y_train)  # Train model
 
-            y_train_pred = model.predict(X_train)
+def table_columns(file_path):
+    """
+    Returns the column names of a CSV, Parquet or Feather table without reading its data.
+    """
+    try:
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".parquet":
+            import pyarrow.parquet as pq
+            return pq.read_schema(file_path).names
+        if extension == ".feather":
+            import pyarrow.feather as feather
+            return feather.read_table(file_path, memory_map=True).schema.names
+        return list(pd.read_csv(file_path, nrows=0).columns)
 
-            y_test_pred = model.predict(X_test)
+    except Exception as e:
+        raise CustomException(e, sys)
 
-            train_model_score = r2_score(y_train, y_train_pred)
 
-            test_model_score = r2_score(y_test, y_test_pred)
+def read_table(file_path, columns=None):
+    """
+    Reads a CSV, Parquet or Feather table, optionally only the given columns.
 
-            report[list(models.keys())[i]] = test_model_score
+    columns may be a list of names or a predicate called with each column name.
+    """
+    try:
+        if callable(columns):
+            columns = [column for column in table_columns(file_path) if columns(column)]
 
-        return report
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".parquet":
+            return pd.read_parquet(file_path, columns=columns)
+        if extension == ".feather":
+            return pd.read_feather(file_path, columns=columns)
+        return pd.read_csv(file_path, usecols=columns)
 
     except Exception as e:
         raise CustomException(e, sys)
-    
-def load_object(file_path):
+
+
+def iter_table(file_path, chunk_rows):
+    """
+    Yields a CSV or Parquet table as DataFrames of up to chunk_rows rows, without reading it whole.
+    """
     try:
-        with open(file_path, "rb") as file_obj:
-            return pickle.load(file_obj)
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".parquet":
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_rows):
+                yield batch.to_pandas()
+        elif extension == ".feather":
+            raise ValueError("Feather tables are read whole; use read_table")
+        else:
+            yield from pd.read_csv(file_path, chunksize=chunk_rows)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def write_table(df, file_path):
+    """
+    Writes a table in the format given by the file extension (.csv, .parquet or .feather).
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".parquet":
+            df.to_parquet(file_path, index=False)
+        elif extension == ".feather":
+            df.reset_index(drop=True).to_feather(file_path)
+        else:
+            df.to_csv(file_path, index=False, header=True)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+CSR_COMPONENTS = ("data", "indices", "indptr", "shape")
+
+
+def save_matrix(file_path, matrix):
+    """
+    Saves a feature matrix or label vector: dense arrays as .npy, sparse matrices as a .csr directory.
+
+    A .csr directory holds the data, indices and indptr arrays of the CSR matrix (and
+    its shape) as separate .npy files, so load_matrix can memory-map all of them.
+    file_path is given without extension; the path actually written is returned.
+    """
+    try:
+        from scipy import sparse
+
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        layouts = [f"{file_path}.npy", f"{file_path}.csr", f"{file_path}.npz"]
+        if sparse.issparse(matrix):
+            written = f"{file_path}.csr"
+            matrix = sparse.csr_matrix(matrix)
+            shutil.rmtree(written, ignore_errors=True)
+            os.makedirs(written)
+            for name in CSR_COMPONENTS:
+                np.save(os.path.join(written, f"{name}.npy"), np.asarray(getattr(matrix, name)))
+        else:
+            written = f"{file_path}.npy"
+            np.save(written, np.ascontiguousarray(matrix))
+
+        # Don't leave a copy in another layout behind for load_matrix to pick up
+        for stale in layouts:
+            if stale == written:
+                continue
+            if os.path.isdir(stale):
+                shutil.rmtree(stale)
+            elif os.path.exists(stale):
+                os.remove(stale)
+        return written
 
     except Exception as e:
-        raise CustomException(e, sys)
\ No newline at end of file
+        raise CustomException(e, sys)
+
+
+def load_matrix(file_path, mmap_mode="r"):
+    """
+    Loads a matrix written by save_matrix. Dense .npy files and the arrays of a .csr directory
+    are memory-mapped by default; .npz files from older runs are read into memory.
+    """
+    try:
+        from scipy import sparse
+
+        if file_path.endswith(".csr"):
+            data, indices, indptr, shape = [
+                np.load(os.path.join(file_path, f"{name}.npy"), mmap_mode=mmap_mode) for name in CSR_COMPONENTS
+            ]
+            matrix = sparse.csr_matrix((data, indices, indptr), shape=tuple(int(size) for size in shape), copy=False)
+            # Like np.memmap, remember the file so it can be handed to other processes as is
+            matrix.filename = file_path
+            return matrix
+        if file_path.endswith(".npz"):
+            return sparse.load_npz(file_path)
+        return np.load(file_path, mmap_mode=mmap_mode)
+
+    except Exception as e:
+        raise CustomException(e, sys)
@@ -0,0 +1,104 @@
+import gzip
+import hashlib
+
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+HTML_MEDIA_TYPE = "text/html; charset=utf-8"
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 512
+# Static pages are compressed once, so they get the slowest, smallest settings;
+# per-request pages trade a little size for much less CPU
+STATIC_LEVELS = {"br": 11, "gzip": 9}
+DYNAMIC_LEVELS = {"br": 4, "gzip": 6}
+
+
+def available_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def compress(body, encoding, level):
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    # mtime=0 keeps the output, and so the ETag, identical across processes and restarts
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def choose_encoding(accept_encoding):
+    """
+    Picks the best content coding the client accepts from an Accept-Encoding header, or None.
+    """
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    for encoding in available_encodings():
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+class PrecompressedPage:
+    """
+    A fixed response body stored with each of its compressed variants and their ETags.
+
+    The page is rendered and compressed once; serving it is a header lookup and,
+    for a client that already holds the current version, a bodiless 304.
+    """
+
+    def __init__(self, body, media_type=HTML_MEDIA_TYPE, max_age=3600):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.media_type = media_type
+        self.cache_control = f"public, max-age={max_age}"
+        self.variants = {None: body}
+        for encoding in available_encodings():
+            self.variants[encoding] = compress(body, encoding, STATIC_LEVELS[encoding])
+
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        # Each representation gets its own strong ETag
+        self.etags = {
+            encoding: f'"{digest}-{encoding}"' if encoding else f'"{digest}"' for encoding in self.variants
+        }
+
+    def response(self, request):
+        encoding = choose_encoding(request.headers.get("accept-encoding"))
+        headers = {
+            "ETag": self.etags[encoding],
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if "*" in tags or tags & set(self.etags.values()):
+                return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(self.variants[encoding], media_type=self.media_type, headers=headers)
+
+
+def compressed_response(request, body, media_type=HTML_MEDIA_TYPE):
+    """
+    Builds a response for a per-request body, compressed when the client accepts it.
+    """
+    body = body.encode("utf-8") if isinstance(body, str) else body
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = choose_encoding(request.headers.get("accept-encoding")) if len(body) >= MIN_COMPRESS_BYTES else None
+    if encoding:
+        body = compress(body, encoding, DYNAMIC_LEVELS[encoding])
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=media_type, headers=headers)
@@ -0,0 +1,130 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from src.components.data_transformation import DataTransformation
+from src.pipeline.compiled_encoder import CompiledEncoder
+from src.pipeline.predict_pipeline import PredictPipeline
+from src.utils import load_object, read_table
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHIPPED_MODEL = os.path.join(REPO_ROOT, "artifacts", "models", "lgbm_model.pkl")
+N_ROWS = 500
+
+
+def shipped_artifacts():
+    preprocessor_path = os.path.join(REPO_ROOT, "artifacts", "preprocessor.pkl")
+    test_paths = sorted(glob.glob(os.path.join(REPO_ROOT, "artifacts", "test.*")))
+    if os.path.exists(preprocessor_path) and test_paths:
+        return preprocessor_path, test_paths[0]
+    return None
+
+
+def synthetic_artifacts(workspace):
+    from benchmarks.synthetic_data import generate_applicants
+    from src.components.data_ingestion import DataIngestion
+    from src.utils import write_table
+
+    cwd = os.getcwd()
+    os.chdir(workspace)
+    try:
+        write_table(generate_applicants(3000, seed=7), os.path.join("notebook", "data", "Loan_Default.csv"))
+        train_path, test_path = DataIngestion().initiate_data_ingestion()
+        data_transformation = DataTransformation()
+        data_transformation.data_transformation_config.imputer_n_jobs = 1
+        data_transformation.data_transformation_config.features_dir = ""
+        _, _, _, _, preprocessor_path = data_transformation.initiate_data_transformation(train_path, test_path)
+        return os.path.join(workspace, preprocessor_path), os.path.join(workspace, test_path)
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture(scope="module")
+def artifacts(tmp_path_factory):
+    """
+    The shipped preprocessor and test rows, or ones fitted on synthetic data when artifacts/ has none.
+    """
+    preprocessor_path, test_path = shipped_artifacts() or synthetic_artifacts(str(tmp_path_factory.mktemp("artifacts")))
+    preprocessor = load_object(preprocessor_path)
+    # Raw column names, as in the source data and the batch endpoint's input
+    rows = read_table(test_path).head(N_ROWS)
+    return preprocessor_path, preprocessor, CompiledEncoder(preprocessor), rows
+
+
+def expected_transform(preprocessor, rows):
+    features = DataTransformation().col_rename(rows.copy())[list(preprocessor.feature_names_in_)]
+    expected = preprocessor.transform(features)
+    return expected.toarray() if sparse.issparse(expected) else expected
+
+
+def as_records(rows):
+    return [
+        {name: (None if pd.isna(value) else value) for name, value in record.items()}
+        for record in rows.astype(object).to_dict(orient="records")
+    ]
+
+
+def complete_rows(preprocessor, rows):
+    features = DataTransformation().col_rename(rows.copy())[list(preprocessor.feature_names_in_)]
+    return rows[features.notna().all(axis=1).to_numpy()]
+
+
+def test_complete_rows_encode_exactly_like_transform(artifacts):
+    _, preprocessor, encoder, rows = artifacts
+    rows = complete_rows(preprocessor, rows)
+    assert len(rows) > 0
+
+    actual, fallback_rows = encoder.encode_many(as_records(rows))
+
+    assert fallback_rows == []
+    np.testing.assert_array_equal(actual, expected_transform(preprocessor, rows))
+
+
+def test_keys_are_normalised_like_col_rename(artifacts):
+    _, preprocessor, encoder, rows = artifacts
+    rows = complete_rows(preprocessor, rows).head(50)
+    raw_records = as_records(rows)
+    renamed_records = [
+        {DataTransformation.rename_column(name): value for name, value in record.items()} for record in raw_records
+    ]
+    assert any(name not in renamed_records[0] for name in raw_records[0])
+
+    raw, _ = encoder.encode_many(raw_records)
+    renamed, _ = encoder.encode_many(renamed_records)
+
+    np.testing.assert_array_equal(raw, renamed)
+    np.testing.assert_array_equal(raw, expected_transform(preprocessor, rows))
+
+
+def test_unknown_categories_encode_like_handle_unknown_ignore(artifacts):
+    _, preprocessor, encoder, rows = artifacts
+    rows = complete_rows(preprocessor, rows).head(50).astype(object)
+    renamed = {DataTransformation.rename_column(name): name for name in rows.columns}
+    for i, column in enumerate(encoder.categorical_columns[:5]):
+        rows.iloc[i::5, rows.columns.get_loc(renamed[column])] = f"unseen_{column}"
+
+    actual, fallback_rows = encoder.encode_many(as_records(rows))
+
+    assert fallback_rows == []
+    np.testing.assert_array_equal(actual, expected_transform(preprocessor, rows))
+
+
+def test_rows_with_missing_values_fall_back_to_transform(artifacts):
+    preprocessor_path, preprocessor, encoder, rows = artifacts
+    features = DataTransformation().col_rename(rows.copy())[list(preprocessor.feature_names_in_)]
+    has_missing = np.flatnonzero(features.isna().any(axis=1).to_numpy())
+    assert len(has_missing) > 0
+
+    records = as_records(rows)
+    _, fallback_rows = encoder.encode_many(records)
+    assert fallback_rows == has_missing.tolist()
+
+    # The serving path fills the fallback rows with the full preprocessor's output
+    pipeline = PredictPipeline(model_path=SHIPPED_MODEL, preprocessor_path=preprocessor_path)
+    pipeline.load()
+    assert pipeline.artifacts.encoder is not None
+    np.testing.assert_array_equal(pipeline._transform_records(records), expected_transform(preprocessor, rows))
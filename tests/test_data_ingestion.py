@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_data import generate_applicants
+from src.components.data_ingestion import DataIngestion
+from src.utils import read_table
+
+
+def streaming_ingestion(tmp_path, source, artifact_format, **config):
+    tmp_path.mkdir(parents=True, exist_ok=True)
+    source_path = tmp_path / "source.csv"
+    source.to_csv(source_path, index=False)
+    data_ingestion = DataIngestion()
+    ingestion_config = data_ingestion.ingestion_config
+    ingestion_config.source_data_path = str(source_path)
+    ingestion_config.streaming = True
+    ingestion_config.chunk_size = 1000
+    ingestion_config.train_data_path = str(tmp_path / f"train.{artifact_format}")
+    ingestion_config.test_data_path = str(tmp_path / f"test.{artifact_format}")
+    ingestion_config.raw_data_path = str(tmp_path / f"data.{artifact_format}")
+    ingestion_config.split_thresholds_path = str(tmp_path / "split_thresholds.json")
+    for name, value in config.items():
+        setattr(ingestion_config, name, value)
+    train_path, test_path = data_ingestion.initiate_data_ingestion()
+    return read_table(ingestion_config.raw_data_path), read_table(train_path), read_table(test_path)
+
+
+@pytest.mark.parametrize("artifact_format", ["parquet", "feather"])
+def test_streaming_ingestion_stores_the_compacted_dtypes(tmp_path, artifact_format):
+    source = generate_applicants(4000, seed=3)
+    # A text column that is entirely missing in the first chunk reads as float64 there
+    source.loc[:999, "loan_limit"] = np.nan
+
+    raw, _, _ = streaming_ingestion(tmp_path, source, artifact_format)
+
+    expected = DataIngestion().compact_dtypes(pd.read_csv(tmp_path / "source.csv"))
+    assert isinstance(raw["loan_limit"].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(raw, expected, check_categorical=False)
+
+
+def test_stratified_split_depends_on_the_key_not_the_row_order(tmp_path):
+    source = generate_applicants(4000, seed=3)
+
+    raw, _, test = streaming_ingestion(tmp_path / "sorted", source, "parquet", stratify_column="Status")
+    _, _, shuffled_test = streaming_ingestion(
+        tmp_path / "shuffled", source.sample(frac=1, random_state=0), "parquet", stratify_column="Status"
+    )
+
+    assert set(test["ID"]) == set(shuffled_test["ID"])
+    for label in (0, 1):
+        share = (test["Status"] == label).sum() / (raw["Status"] == label).sum()
+        assert share == pytest.approx(0.2, abs=0.005)
+
+
+def test_appended_rows_leave_existing_rows_in_their_partition(tmp_path):
+    source = generate_applicants(6000, seed=3)
+
+    _, _, test = streaming_ingestion(tmp_path, source.head(4000), "parquet", stratify_column="Status")
+    _, train_after, test_after = streaming_ingestion(tmp_path, source, "parquet", stratify_column="Status")
+
+    existing = set(source["ID"].head(4000))
+    assert set(test["ID"]) == set(test_after["ID"]) & existing
+    assert not set(test["ID"]) & set(train_after["ID"])
@@ -0,0 +1,34 @@
+import pickle
+
+import numpy as np
+
+from src.components.indexed_imputer import IndexedKNNImputer
+
+
+def training_data(n_rows=2000, n_features=6, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, n_features))
+    X[rng.random(X.shape) < 0.1] = np.nan
+    return X
+
+
+def test_pickle_holds_the_donors_once_and_trees_are_rebuilt_on_load():
+    X = training_data()
+    imputer = IndexedKNNImputer(max_cached_patterns=8).fit(X)
+
+    payload = pickle.dumps(imputer)
+    loaded = pickle.loads(payload)
+
+    assert len(payload) < 2 * imputer.donors_.nbytes
+    assert loaded.trees_.keys() == imputer.trees_.keys()
+    np.testing.assert_array_equal(loaded.transform(X), imputer.transform(X))
+
+
+def test_transform_scans_patterns_without_a_tree_and_builds_none():
+    X = training_data()
+    with_trees = IndexedKNNImputer(max_cached_patterns=64).fit(X)
+    without_trees = IndexedKNNImputer(max_cached_patterns=0, scan_chunk_rows=7).fit(X)
+
+    assert without_trees.trees_ == {}
+    np.testing.assert_array_equal(without_trees.transform(X), with_trees.transform(X))
+    assert without_trees.trees_ == {}
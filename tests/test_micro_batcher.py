@@ -0,0 +1,44 @@
+import asyncio
+
+from src.pipeline.micro_batcher import MicroBatcher, MicroBatcherConfig
+
+
+def run_batch(score_batch, records):
+    async def main():
+        batcher = MicroBatcher(score_batch, MicroBatcherConfig(max_batch_size=len(records), max_wait_ms=50))
+        await batcher.start()
+        try:
+            return await asyncio.wait_for(
+                asyncio.gather(*(batcher.submit(record) for record in records), return_exceptions=True), 5
+            )
+        finally:
+            await batcher.stop()
+
+    return asyncio.run(main())
+
+
+def test_each_caller_gets_its_own_result():
+    assert run_batch(lambda records: [record * 2 for record in records], [1, 2, 3]) == [2, 4, 6]
+
+
+def test_missing_results_fail_every_caller_instead_of_leaving_them_waiting():
+    results = run_batch(lambda records: [0] * (len(records) - 1), [1, 2, 3])
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_stop_fails_the_records_of_a_batch_still_being_filled():
+    async def main():
+        batcher = MicroBatcher(lambda records: records, MicroBatcherConfig(max_batch_size=10, max_wait_ms=10000))
+        await batcher.start()
+        pending = [asyncio.ensure_future(batcher.submit(record)) for record in (1, 2)]
+        # Let the collector take both records and wait for more
+        await asyncio.sleep(0.05)
+        assert batcher._queue.empty()
+
+        await batcher.stop()
+        return await asyncio.wait_for(asyncio.gather(*pending, return_exceptions=True), 5)
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,37 @@
+import pytest
+
+from src.pipeline.releases import ReleaseConfig, ReleaseStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ReleaseStore(ReleaseConfig(releases_dir=str(tmp_path / "releases"), write_bundles=False))
+
+
+def publish(store, tmp_path, version):
+    model_path, preprocessor_path = tmp_path / f"{version}_model.pkl", tmp_path / f"{version}_preprocessor.pkl"
+    model_path.write_bytes(f"model {version}".encode())
+    preprocessor_path.write_bytes(f"preprocessor {version}".encode())
+    return store.publish(str(model_path), str(preprocessor_path), version=version)
+
+
+def test_repeated_rollbacks_step_back_through_the_history(store, tmp_path):
+    for version in ("v1", "v2", "v3"):
+        publish(store, tmp_path, version)
+
+    assert store.rollback() == "v2"
+    assert store.rollback() == "v1"
+    assert store.current_version() == "v1"
+    with pytest.raises(ValueError):
+        store.rollback()
+    assert store.current_version() == "v1"
+
+
+def test_rollback_after_a_new_activation_returns_to_the_release_it_replaced(store, tmp_path):
+    for version in ("v1", "v2"):
+        publish(store, tmp_path, version)
+    assert store.rollback() == "v1"
+
+    publish(store, tmp_path, "v3")
+    assert store.activation_stack() == ["v1", "v3"]
+    assert store.rollback() == "v1"
@@ -0,0 +1,37 @@
+from src.components.data_transformation import DataTransformation
+from src.components.model_training import ModelTrainer
+from src.pipeline.train_pipeline import estimator_params, hash_values
+
+
+def transformation_key(**config):
+    data_transformation = DataTransformation()
+    for name, value in config.items():
+        setattr(data_transformation.data_transformation_config, name, value)
+    return hash_values(estimator_params(data_transformation.get_data_transformer_object()))
+
+
+def test_imputer_execution_settings_leave_transformation_key_unchanged():
+    key = transformation_key()
+    assert transformation_key(imputer_n_jobs=4) == key
+    assert transformation_key(imputer_chunk_size=500) == key
+    assert transformation_key(imputer_n_jobs=1, imputer_chunk_size=100) == key
+
+
+def test_imputer_parameters_change_transformation_key():
+    assert transformation_key(imputer_mode="indexed_exact") != transformation_key()
+
+
+def test_nested_estimators_are_hashed_by_class_name():
+    params = estimator_params(DataTransformation().get_data_transformer_object())
+    assert params["num_pipeline__imputer"] == "ParallelKNNImputer"
+    assert not any(name.endswith(("__n_jobs", "__chunk_size")) for name in params)
+    assert "n_jobs" not in repr(params)
+
+
+def test_model_n_jobs_leaves_training_key_unchanged():
+    model = ModelTrainer().get_models()["LGBM"]
+    key = hash_values(estimator_params(model))
+    model.set_params(n_jobs=2)
+    assert hash_values(estimator_params(model)) == key
+    model.set_params(num_leaves=15)
+    assert hash_values(estimator_params(model)) != key
@@ -0,0 +1,32 @@
+import os
+
+import numpy as np
+from scipy import sparse
+
+from src.utils import load_matrix, save_matrix
+
+
+def test_sparse_matrices_are_memory_mapped(tmp_path):
+    matrix = sparse.random(200, 30, density=0.1, format="csr", random_state=0)
+    base_path = str(tmp_path / "X_train")
+    np.save(f"{base_path}.npy", np.zeros(3))
+
+    path = save_matrix(base_path, matrix)
+
+    assert path == f"{base_path}.csr"
+    assert not os.path.exists(f"{base_path}.npy")
+    loaded = load_matrix(path)
+    assert loaded.filename == path
+    assert not loaded.data.flags.writeable and not loaded.indices.flags.writeable
+    np.testing.assert_array_equal(loaded.toarray(), matrix.toarray())
+
+
+def test_dense_matrix_replaces_a_sparse_copy(tmp_path):
+    base_path = str(tmp_path / "X_train")
+    save_matrix(base_path, sparse.eye(4, format="csr"))
+
+    path = save_matrix(base_path, np.eye(4))
+
+    assert path == f"{base_path}.npy"
+    assert not os.path.exists(f"{base_path}.csr")
+    np.testing.assert_array_equal(load_matrix(path), np.eye(4))